@@ -0,0 +1,100 @@
+"""Docstring: in-memory index of Specify agents for matching key.csv creator names."""
+import difflib
+import logging
+from collections import defaultdict
+
+FUZZY_CUTOFF = 0.8
+
+# at a 0.8 cutoff two strings that share no bigram can still match only when their lengths
+# add up to at most 5: every matching block is then one character long and needs a gap
+# before the next, which caps the matched characters at 2
+SHORT_PAIR_LENGTH = 5
+
+
+class NameIndex:
+    """Distinct names with a bigram index, giving the same answer as
+    difflib.get_close_matches(query, names, n=1, cutoff) over the full list.
+
+    A candidate needs a length within the cutoff's bound and, unless the pair is very short,
+    at least one shared bigram; only candidates are scored with difflib.
+    """
+
+    def __init__(self, names, cutoff=FUZZY_CUTOFF):
+        self.cutoff = cutoff
+        self.names = sorted(set(names))
+        self.bigrams = defaultdict(set)
+        self.by_length = defaultdict(list)
+        for name in self.names:
+            self.by_length[len(name)].append(name)
+            for bigram in self._bigrams(name):
+                self.bigrams[bigram].add(name)
+
+    @staticmethod
+    def _bigrams(name):
+        return {name[i:i + 2] for i in range(len(name) - 1)}
+
+    def _length_window(self, length):
+        # 2 * min / (len_a + len_b) >= cutoff bounds the other string's length; the slack keeps
+        # float rounding from dropping a pair that lands exactly on the cutoff
+        low = length * self.cutoff / (2 - self.cutoff) - 1e-9
+        high = length * (2 - self.cutoff) / self.cutoff + 1e-9
+        return low, high
+
+    def candidates(self, query):
+        low, high = self._length_window(len(query))
+        found = set()
+        for bigram in self._bigrams(query):
+            found.update(self.bigrams.get(bigram, ()))
+        for length in range(0, SHORT_PAIR_LENGTH - len(query) + 1):
+            found.update(self.by_length.get(length, ()))
+        return [name for name in found if low <= len(name) <= high]
+
+    def best_match(self, query):
+        matches = difflib.get_close_matches(query, self.candidates(query), n=1, cutoff=self.cutoff)
+        return matches[0] if matches else None
+
+
+class AgentIndex:
+    """Agents loaded once, matched the way IzImporter.find_agent_id_from_string always has:
+    the closest first name and the closest last name are picked independently, then the
+    first agent (in query order) carrying both is returned. Results are memoized per input.
+    """
+
+    def __init__(self, agents):
+        self.logger = logging.getLogger(f'Client.{self.__class__.__name__}')
+        agent_ids = {}
+        first_names = []
+        last_names = []
+        for agent_id, first_name, last_name in agents:
+            first_name = first_name.lower() if first_name else ''
+            last_name = last_name.lower() if last_name else ''
+            first_names.append(first_name)
+            last_names.append(last_name)
+            agent_ids.setdefault((first_name, last_name), agent_id)
+        self.agent_ids = agent_ids
+        self.first_names = NameIndex(first_names)
+        self.last_names = NameIndex(last_names)
+        self.memo = {}
+
+    @classmethod
+    def from_database(cls, db_utils):
+        sql = "SELECT AgentID, FirstName, LastName FROM casiz.agent"
+        cursor = db_utils.get_cursor()
+        cursor.execute(sql)
+        agents = cursor.fetchall()
+        cursor.close()
+        return cls(agents)
+
+    def find_agent_id(self, input_string):
+        if input_string in self.memo:
+            return self.memo[input_string]
+
+        agent_id = None
+        names = input_string.strip().split()
+        if len(names) >= 2:
+            matched_firstname = self.first_names.best_match(names[0].lower())
+            matched_lastname = self.last_names.best_match(names[-1].lower())
+            if matched_firstname and matched_lastname:
+                agent_id = self.agent_ids.get((matched_firstname, matched_lastname))
+        self.memo[input_string] = agent_id
+        return agent_id
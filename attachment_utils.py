@@ -24,6 +24,22 @@ class AttachmentUtils:
         logging.debug(f"Got collectionObjectId: {coid}")
         return coid
 
+    def get_attachmentid_from_attachment_location(self, attachment_location):
+        sql = """
+         SELECT at.AttachmentID
+         FROM attachment AS at
+         WHERE at.AttachmentLocation = %s
+         """
+        return self.db_utils.get_one_record(sql, (str(attachment_location),))
+
+    def is_attachment_linked(self, attachment_id, collection_object_id):
+        sql = """
+         SELECT cat.CollectionObjectAttachmentID
+         FROM collectionobjectattachment AS cat
+         WHERE cat.AttachmentID = %s AND cat.CollectionObjectID = %s
+         """
+        return self.db_utils.get_one_record(sql, (attachment_id, collection_object_id)) is not None
+
     def get_attachmentid_from_filepath(self, orig_filepath):
         sql = """
          SELECT at.AttachmentID
@@ -36,6 +52,27 @@ class AttachmentUtils:
             logging.debug(f"Got AttachmentId: {aid}")
         return aid
 
+    def get_attachmentids_from_filepaths(self, orig_filepaths, chunk_size=500):
+        """Bulk version of get_attachmentid_from_filepath: chunked IN (...) queries on OrigFilename.
+           Returns {orig_filepath: AttachmentID} for the paths that have an attachment."""
+        unique_filepaths = [str(filepath) for filepath in dict.fromkeys(orig_filepaths) if filepath is not None]
+        # the db collation is case insensitive, so map what comes back onto the paths we asked for
+        folded = {filepath.casefold(): filepath for filepath in unique_filepaths}
+        found = {}
+        for start in range(0, len(unique_filepaths), chunk_size):
+            chunk = unique_filepaths[start:start + chunk_size]
+            placeholders = ", ".join(["%s"] * len(chunk))
+            sql = f"""
+             SELECT at.OrigFilename, at.AttachmentID
+             FROM attachment AS at
+             WHERE at.OrigFilename IN ({placeholders})
+             """
+            for orig_filename, aid in self.db_utils.get_records(sql, chunk):
+                key = folded.get(str(orig_filename).casefold())
+                if key is not None:
+                    found.setdefault(key, aid)
+        return found
+
     @staticmethod
     def truncate(value, max_length, field_name):
         if value is not None and max_length is not None and len(value) > max_length:
@@ -54,7 +91,11 @@ class AttachmentUtils:
     def create_attachment(self, attachment_location,
                           original_filename, file_created_datetime, guid, image_type,
                           agent_id,
-                          properties):
+                          properties, cursor=None):
+        """Inserts an attachment row and returns its generated AttachmentID.
+
+        With a cursor the insert joins the caller's transaction and is not committed here.
+        """
 
 
         # parsing title
@@ -101,10 +142,16 @@ class AttachmentUtils:
             agent_id
         )
 
+        if cursor is not None:
+            cursor.execute(sql, params)
+            return cursor.lastrowid
+
         cursor = self.db_utils.get_cursor()
         cursor.execute(sql, params)
+        attachment_id = cursor.lastrowid
         self.db_utils.commit()
         cursor.close()
+        return attachment_id
 
     def create_collection_object_attachment(self, attachment_id, collection_object_id, ordinal, agent_id):
         sql = """
@@ -128,6 +175,62 @@ class AttachmentUtils:
         self.db_utils.commit()
         cursor.close()
 
+    def link_attachment_to_collection_object(self, attachment_id, collection_object_id, agent_id, cursor=None):
+        """Links an attachment to a collection object at the next free ordinal.
+
+        The ordinal is computed inside the INSERT ... SELECT, so there is no separate
+        MAX(ordinal) round-trip. With a cursor the insert joins the caller's transaction; its
+        gap locks can deadlock with a link to a neighbouring collection object, so run that
+        transaction with db_utils.run_in_transaction.
+        """
+        sql = """
+        INSERT INTO collectionobjectattachment (
+            collectionmemberid, ordinal, remarks, timestampcreated, timestampmodified,
+            version, AttachmentID, CollectionObjectID, CreatedByAgentID, ModifiedByAgentID
+        )
+        SELECT 4, COALESCE(MAX(ordinal) + 1, 0), NULL, %s, %s, 0, %s, %s, %s, NULL
+        FROM collectionobjectattachment
+        WHERE CollectionObjectID = %s
+        """
+        params = (
+            time_utils.get_pst_time_now_string(),
+            time_utils.get_pst_time_now_string(),
+            attachment_id,
+            collection_object_id,
+            agent_id,
+            collection_object_id
+        )
+        if cursor is not None:
+            cursor.execute(sql, params)
+            return
+
+        cursor = self.db_utils.get_cursor()
+        cursor.execute(sql, params)
+        self.db_utils.commit()
+        cursor.close()
+
+    def create_attachment_for_collection_object(self, collection_object_id, attachment_location,
+                                                original_filename, file_created_datetime, guid, image_type,
+                                                agent_id, properties):
+        """Creates the attachment and its collectionobjectattachment link in one transaction.
+           Returns the new AttachmentID; on error nothing is written."""
+        with self.db_utils.transaction():
+            cursor = self.db_utils.get_cursor()
+            try:
+                attachment_id = self.create_attachment(attachment_location=attachment_location,
+                                                       original_filename=original_filename,
+                                                       file_created_datetime=file_created_datetime,
+                                                       guid=guid,
+                                                       image_type=image_type,
+                                                       agent_id=agent_id,
+                                                       properties=properties,
+                                                       cursor=cursor)
+                self.link_attachment_to_collection_object(attachment_id, collection_object_id, agent_id,
+                                                          cursor=cursor)
+            finally:
+                cursor.close()
+        logging.debug(f"Created attachment {attachment_id} for collection object {collection_object_id}")
+        return attachment_id
 
     def get_attachment_id(self, uuid):
         sql = "SELECT attachmentid FROM attachment WHERE guid = %s"
@@ -0,0 +1,90 @@
+"""Benchmark: Pillow (in-process) versus ImageMagick (subprocess) tiff to jpg conversion.
+
+Converts every tiff under the fixture folders with each backend and reports the time per
+file. --synthetic adds generated multi-page tiffs of the given size, since the checked in
+fixtures are small. Backends whose tools aren't installed are skipped.
+
+usage (from the repo root):
+    python benchmarks/conversion_backend_benchmark.py --synthetic 10 --size 4000x3000
+"""
+import argparse
+import glob
+import os
+import shutil
+import sys
+import tempfile
+import time
+from uuid import uuid4
+
+from PIL import Image
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from image_conversion import PillowConversionBackend, SubprocessConversionBackend
+
+FIXTURE_DIRS = ['tests/test_images', 'tests/iz_importer_tests/iz_test_images']
+
+
+def find_tiffs(dirs):
+    tiffs = []
+    for directory in dirs:
+        for pattern in ('*.tif', '*.tiff', '*.TIF', '*.TIFF'):
+            tiffs.extend(glob.glob(os.path.join(directory, '**', pattern), recursive=True))
+    return sorted(set(tiffs))
+
+
+def make_synthetic_tiffs(directory, count, width, height):
+    paths = []
+    for i in range(count):
+        page = Image.effect_noise((width, height), 64).convert('RGB')
+        thumbnail = page.resize((width // 8, height // 8))
+        path = os.path.join(directory, f"CAS{i:07d}.tif")
+        # a thumbnail page first, the way some scanners write them
+        thumbnail.save(path, save_all=True, append_images=[page], compression='tiff_lzw')
+        paths.append(path)
+    return paths
+
+
+def run_backend(backend, tiffs, out_dir):
+    start = time.perf_counter()
+    for tiff in tiffs:
+        work_dir = os.path.join(out_dir, str(uuid4()))
+        os.mkdir(work_dir)
+        name = os.path.splitext(os.path.basename(tiff))[0]
+        backend.convert(tiff, os.path.join(work_dir, name + ".jpg"))
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument('--synthetic', type=int, default=0, help='number of generated tiffs to add')
+    parser.add_argument('--size', default='3000x2000', help='generated tiff size, WIDTHxHEIGHT')
+    args = parser.parse_args()
+
+    scratch = tempfile.mkdtemp(prefix='conversion_benchmark_')
+    try:
+        tiffs = find_tiffs(FIXTURE_DIRS)
+        if args.synthetic:
+            width, height = (int(x) for x in args.size.lower().split('x'))
+            tiffs += make_synthetic_tiffs(scratch, args.synthetic, width, height)
+        if not tiffs:
+            print("No tiffs found")
+            return
+
+        backends = [PillowConversionBackend()]
+        if shutil.which('convert'):
+            backends.append(SubprocessConversionBackend())
+        else:
+            print("ImageMagick `convert` not installed, skipping the subprocess backend")
+
+        print(f"{len(tiffs)} tiffs")
+        for backend in backends:
+            out_dir = os.path.join(scratch, backend.name)
+            os.mkdir(out_dir)
+            elapsed = run_backend(backend, tiffs, out_dir)
+            print(f"{backend.name:<12} {elapsed:8.3f}s  {1000 * elapsed / len(tiffs):8.1f} ms/file")
+    finally:
+        shutil.rmtree(scratch)
+
+
+if __name__ == '__main__':
+    main()
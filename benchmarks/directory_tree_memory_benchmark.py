@@ -0,0 +1,119 @@
+"""Benchmark: memory and time of the DirectoryTree path index versus the anytree tree it replaced.
+
+Generates a synthetic share (--dirs folders of --files files each, nested --depth deep),
+indexes it with both implementations, and reports tracemalloc's retained size, build time
+and the time to produce every file path. The anytree version is reproduced here as it was;
+it is skipped when anytree isn't installed.
+
+usage (from the repo root):
+    python benchmarks/directory_tree_memory_benchmark.py --dirs 500 --files 200
+    python benchmarks/directory_tree_memory_benchmark.py --root /Volumes/images/izg/iz
+"""
+import argparse
+import gc
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from directory_tree import DirectoryTree
+
+try:
+    from anytree import Node
+except ImportError:
+    Node = None
+
+
+class AnytreeDirectoryTree:
+    """the anytree-based DirectoryTree, kept only for comparison"""
+
+    def __init__(self, directories):
+        self.root_node = None
+        for directory in directories:
+            if self.root_node is None:
+                self.root_node = self._build_tree(directory)
+                self.root_node.name = directory
+            else:
+                new_root_node = self._build_tree(directory)
+                new_root_node.name = directory
+                new_root_node.parent = self.root_node
+
+    def _build_tree(self, root_path):
+        root_node = Node(os.path.basename(root_path))
+        for item in os.listdir(root_path):
+            item_path = os.path.join(root_path, item)
+            if os.path.isdir(item_path):
+                self._build_tree(item_path).parent = root_node
+            else:
+                Node(item, parent=root_node)
+        return root_node
+
+    def get_node_path(self, node):
+        if node.is_root:
+            return str(node.name)
+        return f"{self.get_node_path(node.parent)}/{node.name}"
+
+    def process_files(self, func):
+        for node in self.root_node.descendants:
+            if node.is_leaf:
+                func(self.get_node_path(node))
+
+
+def make_share(root, dirs, files, depth):
+    for d in range(dirs):
+        nested = os.path.join(root, *[f"level{level}_{d % (level + 2)}" for level in range(depth - 1)],
+                              f"CAS batch {d:05d}")
+        os.makedirs(nested, exist_ok=True)
+        for f in range(files):
+            open(os.path.join(nested, f"CASIZ{d:05d}{f:04d}_dorsal.jpg"), 'w').close()
+
+
+def measure(name, build, roots):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    tree = build(roots)
+    build_seconds = time.perf_counter() - start
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    paths = []
+    start = time.perf_counter()
+    tree.process_files(paths.append)
+    walk_seconds = time.perf_counter() - start
+    print(f"{name:<10} files {len(paths):>9}  retained {retained / 2 ** 20:8.1f} MiB  "
+          f"peak {peak / 2 ** 20:8.1f} MiB  build {build_seconds:6.2f}s  process_files {walk_seconds:6.2f}s")
+    return retained
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument('--dirs', type=int, default=200, help='generated folders')
+    parser.add_argument('--files', type=int, default=100, help='generated files per folder')
+    parser.add_argument('--depth', type=int, default=3, help='folder nesting depth')
+    parser.add_argument('--root', action='append', help='index an existing folder instead (repeatable)')
+    args = parser.parse_args()
+
+    tmp_dir = None
+    roots = args.root
+    if not roots:
+        tmp_dir = tempfile.mkdtemp(prefix="dirtree_bench_")
+        roots = [os.path.join(tmp_dir, "share")]
+        make_share(roots[0], args.dirs, args.files, args.depth)
+    try:
+        index_bytes = measure("index", DirectoryTree, roots)
+        if Node is None:
+            print("anytree not installed, skipping the anytree comparison")
+            return
+        anytree_bytes = measure("anytree", AnytreeDirectoryTree, roots)
+        print(f"index retains {anytree_bytes / max(index_bytes, 1):.1f}x less memory")
+    finally:
+        if tmp_dir is not None:
+            shutil.rmtree(tmp_dir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+"""Benchmark: ImageClient requests over the pooled keep-alive session versus a new
+connection per request, against a local stand-in for the image server.
+
+The stand-in answers "/" with an X-Timestamp header and "getImageRecord" with a 404,
+which is what check_image_db_if_filename_imported sees for a file that is not imported.
+--connect-delay adds a pause per new TCP connection to approximate the TLS handshake
+and round-trip cost of the real server.
+
+usage (from the repo root):
+    python benchmarks/image_client_session_benchmark.py -n 500 --connect-delay 0.005
+"""
+import argparse
+import os
+import socket
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import server_host_settings
+from image_client import ImageClient
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    connect_delay = 0.0
+    connections = 0
+    connections_lock = threading.Lock()
+
+    def setup(self):
+        with StandInHandler.connections_lock:
+            StandInHandler.connections += 1
+        if self.connect_delay:
+            time.sleep(self.connect_delay)
+        super().setup()
+        # headers and body go out as separate writes; without this, delayed ACKs stall keep-alive
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def do_GET(self):
+        if self.path.startswith("/getImageRecord"):
+            body = b"not found"
+            self.send_response(404)
+        else:
+            body = b"ok"
+            self.send_response(200)
+            self.send_header("X-Timestamp", str(int(time.time())))
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class BenchConfig:
+    MAILING_LIST = []
+
+
+def time_requests(label, count, fetch):
+    StandInHandler.connections = 0
+    start = time.perf_counter()
+    for i in range(count):
+        fetch(i)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {elapsed:8.3f}s  {count / elapsed:9.1f} req/s  "
+          f"{StandInHandler.connections:6d} connections")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument('-n', '--requests', type=int, default=500)
+    parser.add_argument('--connect-delay', type=float, default=0.0,
+                        help='seconds of extra setup cost per new connection')
+    args = parser.parse_args()
+
+    StandInHandler.connect_delay = args.connect_delay
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    server_host_settings.SERVER_NAME = "127.0.0.1"
+    server_host_settings.SERVER_PORT = server.server_address[1]
+    server_host_settings.SERVER_PREFIX = "http"
+
+    client = ImageClient(config=BenchConfig())
+    url = client.build_url("getImageRecord")
+
+    def unpooled(i):
+        requests.get(url, params={'file_string': f"CAS{i:07d}.jpg"}, timeout=10)
+
+    def pooled(i):
+        client.check_image_db_if_filename_imported("Botany", f"CAS{i:07d}.jpg", exact=True)
+
+    print(f"{args.requests} getImageRecord requests, connect delay {args.connect_delay}s")
+    baseline = time_requests("new connection per request", args.requests, unpooled)
+    session = time_requests("ImageClient pooled session", args.requests, pooled)
+    print(f"speedup: {baseline / session:.2f}x")
+
+    client.close()
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
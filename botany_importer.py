@@ -1,10 +1,11 @@
 
 from importer import Importer
+from file_manifest import REJECTED
 import time_utils
 import os
-import re
 import logging
 from dir_tools import DirTools
+from dir_walker import DEFAULT_SCAN_WORKERS, DEFAULT_SCAN_QUEUE_SIZE
 from uuid import uuid4
 from time_utils import get_pst_time_now_string
 # I:\botany\PLANT FAMILIES
@@ -30,9 +31,12 @@ class BotanyImporter(Importer):
         self.botany_importer_config = config
         self.existing_barcodes = existing_barcodes
         self.full_import = full_import
-        self.dir_tools = DirTools(self.build_filename_map, limit=None)
+        self.dir_tools = DirTools(self.build_filename_map, limit=None,
+                                  scan_workers=getattr(config, 'SCAN_WORKERS', DEFAULT_SCAN_WORKERS),
+                                  scan_queue_size=getattr(config, 'SCAN_QUEUE_SIZE', DEFAULT_SCAN_QUEUE_SIZE))
         self.paths = paths
         self.barcode_map = {}
+        self.collection_object_ids = {}
         self.logger.debug("Botany import mode")
         self.monitoring_tools = None
 
@@ -49,25 +53,44 @@ class BotanyImporter(Importer):
 
 
     def process_loaded_files(self):
+        # resolve every barcode up front instead of one query per barcode
+        self.collection_object_ids = self.get_collection_object_ids(self.barcode_map.keys())
+        # and check every file against the image db in bulk instead of per barcode
+        self.prefetch_imagedb_imported_filenames([filepath for filepaths in self.barcode_map.values()
+                                                  for filepath in filepaths])
+        prepared = []
         for barcode in self.barcode_map.keys():
             filename_list = []
             for cur_filepath in self.barcode_map[barcode]:
                 filename_list.append(cur_filepath)
-            self.process_barcode(barcode, filename_list)
+            import_args = self.prepare_barcode(barcode, filename_list)
+            if import_args is not None:
+                prepared.append(import_args)
+        # with every barcode filtered first, conversions can run ahead of the uploads
+        self.import_prepared(prepared)
 
 
     def process_barcode(self, barcode, filepath_list):
+        import_args = self.prepare_barcode(barcode, filepath_list)
+        if import_args is not None:
+            self.import_to_imagedb_and_specify(**import_args)
+
+    def prepare_barcode(self, barcode, filepath_list):
+        """filters a barcode's files; returns the import_to_imagedb_and_specify arguments
+           for the ones left to import, or None if there is nothing to import"""
         if barcode is None:
             self.logger.debug(f"No barcode; skipping")
             return
         self.logger.debug(f"Barcode: {barcode}")
-        sql = f'''select CollectionObjectID from collectionobject where CatalogNumber="{barcode}";'''
-        collection_object_id = self.specify_db_connection.get_one_record(sql)
+        if barcode in self.collection_object_ids:
+            collection_object_id = self.collection_object_ids[barcode]
+        else:
+            collection_object_id = self.get_collection_object_ids([barcode])[barcode]
         self.logger.debug(f"retrieving id for: {collection_object_id}")
         if collection_object_id is None and not self.existing_barcodes:
             self.logger.debug(f"No record found for catalog number {barcode}, creating skeleton.")
             self.create_skeleton(barcode)
-            collection_object_id = self.specify_db_connection.get_one_record(sql)
+            collection_object_id = self.get_collection_object_ids([barcode])[barcode]
             self.logger.warning(f"Skeletons temporarily disabled in botany")
             return
         #  we can have multiple filepaths per barcode in the case of barcode-a, barcode-b etc.
@@ -86,23 +109,25 @@ class BotanyImporter(Importer):
 
         if not self.existing_barcodes or (self.existing_barcodes and collection_object_id is not None):
 
-            self.import_to_imagedb_and_specify(filepath_list=filepath_list,
-                                               collection_object_id=collection_object_id,
-                                               agent_id=agent_id,
-                                               force_redacted=self.force_redacted,
-                                               skip_redacted_check=self.skip_redacted_check,
-                                               id=barcode,
-                                               )
+            return dict(filepath_list=filepath_list,
+                        collection_object_id=collection_object_id,
+                        agent_id=agent_id,
+                        force_redacted=self.force_redacted,
+                        skip_redacted_check=self.skip_redacted_check,
+                        id=barcode,
+                        )
+        return None
 
 
     def build_filename_map(self, full_path):
 
+        if self.is_unchanged_in_manifest(full_path):
+            return
         if not self.check_for_valid_image(full_path):
+            self.record_manifest_outcome(full_path, REJECTED)
             return
         filename = os.path.basename(full_path)
-        matched = re.match(self.botany_importer_config.IMAGE_SUFFIX, filename.lower())
-        is_match = bool(matched)
-        if not is_match:
+        if not self.file_classifier.matches_name(filename.lower()):
             self.logger.debug(f"Rejected; no match: {filename}")
             return
         barcode = self.get_first_digits_from_filepath(filename)
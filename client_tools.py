@@ -15,6 +15,10 @@ from botany_purger import BotanyPurger
 from PIC_undo_batch import PicturaeUndoBatch
 from PIC_database_updater import UpdatePICFields
 from BOT_database_updater import UpdateBotDbFields
+from file_manifest import FileManifest, MANIFEST_MODES
+from specify_db import SpecifyDb
+from attachment_utils import AttachmentUtils
+from importer import DEFAULT_ATTACHMENT_LOOKUP_CHUNK_SIZE
 args = None
 logger = None
 
@@ -68,14 +72,44 @@ def parse_command_line():
                                                                             'existing data when updating',
                                                                             default=False)
 
+    parser.add_argument('-mm', '--manifest_mode', choices=MANIFEST_MODES, help='before importing, rebuild '
+                                                                               '(clear) the file manifest or '
+                                                                               'verify it against the disk '
+                                                                               'and Specify',
+                                                                               default=None)
+
     return parser.parse_args()
 
 
+def run_manifest_mode(config, mode):
+    """clears (rebuild) or verifies the collection's file manifest ahead of an import. verify
+       re-stats every entry and re-checks the imported ones against Specify's attachments"""
+    manifest_path = getattr(config, 'MANIFEST_PATH', None)
+    if not manifest_path:
+        print(f"No MANIFEST_PATH configured, ignoring manifest mode {mode}")
+        return
+    manifest = FileManifest(manifest_path)
+    try:
+        if mode == 'rebuild':
+            dropped = manifest.rebuild()
+            print(f"Manifest cleared, {dropped} entries dropped; this run re-checks every file")
+        else:
+            attachment_utils = AttachmentUtils(SpecifyDb(config))
+            chunk_size = getattr(config, 'ATTACHMENT_LOOKUP_CHUNK_SIZE', DEFAULT_ATTACHMENT_LOOKUP_CHUNK_SIZE)
+            checked, dropped = manifest.verify(
+                still_imported=lambda paths: attachment_utils.get_attachmentids_from_filepaths(paths, chunk_size))
+            print(f"Manifest verified: {checked} entries checked, {dropped} stale entries dropped")
+    finally:
+        manifest.close()
+
+
 def main(args):
     # clearing import logs
     if args.subcommand == 'search':
         image_client = ImageClient()
     elif args.subcommand == 'import':
+        if args.manifest_mode:
+            run_manifest_mode(get_config(config=args.collection), args.manifest_mode)
         if args.collection == "Botany":
             bot_config = get_config(config="Botany")
             # get paths here
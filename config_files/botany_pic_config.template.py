@@ -33,6 +33,62 @@ PROJECT_NAME = "name of digitization project"
 
 UPDATE_CSV_PREFIX = f"{sla}path{sla}to{sla}update{sla}directory{sla}"
 
+# number of files imported concurrently (conversion, upload and specify insert);
+# 1 imports one file at a time
+IMPORT_WORKERS = 1
+
+# keep-alive connection pool to the image server: number of host pools kept,
+# and the maximum number of open connections per host
+HTTP_POOL_CONNECTIONS = 4
+HTTP_POOL_MAXSIZE = 10
+
+# filenames per bulk "already imported?" request to the image server
+BULK_LOOKUP_CHUNK_SIZE = 500
+
+# tiff/dng to jpg conversion: 'pillow' (in-process) or 'imagemagick' (convert subprocess)
+CONVERSION_BACKEND = 'pillow'
+
+# processes converting tiff/dng ahead of the uploader (0 converts inline), and the most
+# disk the not-yet-uploaded jpgs may take up in the importer's temp folder
+CONVERSION_WORKERS = 0
+CONVERSION_TEMP_BUDGET_MB = 2048
+
+# pooled Specify connections used by import workers; keep >= IMPORT_WORKERS
+DB_POOL_SIZE = 5
+
+# load csv records per chunk of sheets with one executemany per table, committed or rolled back
+# as a whole, instead of inserting and committing each record; sheets per chunk. New taxa are
+# created before the chunk is written and are not rolled back with it.
+BULK_RECORD_UPLOAD = False
+BULK_RECORD_CHUNK_SIZE = 200
+
+# entries kept in the per-run cache of single-value lookups (geography, agent, taxon ids);
+# 0 turns it off. Counters are added to the batch report.
+LOOKUP_CACHE_SIZE = 0
+
+# load the taxon tree and vtaxon2 redaction flags once per run and answer the taxonomy
+# importer's name, parent and redaction lookups in memory
+PRELOAD_TAXON_INDEX = False
+
+# TNRS name resolution: sqlite file caching each resolved name across runs (None keeps results
+# for the run only), names per request, concurrent requests, request timeout in seconds and
+# attempts per request. TNRS_OFFLINE answers from the cache only and never calls TNRS.
+TNRS_CACHE_PATH = None
+TNRS_CHUNK_SIZE = 200
+TNRS_WORKERS = 4
+TNRS_TIMEOUT = 60
+TNRS_RETRIES = 3
+TNRS_OFFLINE = False
+
+# sqlite file recording files already imported or rejected; unchanged ones are skipped
+# on later runs. None disables it. See client_tools.py --manifest_mode to rebuild/verify.
+MANIFEST_PATH = None
+
+# threads listing share folders during the scan, and how many listed folders may wait
+# for the importer before the listers pause
+SCAN_WORKERS = 8
+SCAN_QUEUE_SIZE = 256
+
 # summary statistics, figures to configure html report
 MAILING_LIST = ['email_address']
 
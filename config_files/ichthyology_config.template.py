@@ -20,6 +20,60 @@ IMAGE_DIRECTORY_PREFIX = f"{sla}letter_drives{sla}n_drive"
 SCAN_DIR = f"ichthyology{sla}images{sla}"
 ICH_SCAN_FOLDERS = ["AutomaticSpecifyImport"]
 
+# number of files imported concurrently (conversion, upload and specify insert);
+# 1 imports one file at a time
+IMPORT_WORKERS = 1
+
+# keep-alive connection pool to the image server: number of host pools kept,
+# and the maximum number of open connections per host
+HTTP_POOL_CONNECTIONS = 4
+HTTP_POOL_MAXSIZE = 10
+
+# filenames per bulk "already imported?" request to the image server
+BULK_LOOKUP_CHUNK_SIZE = 500
+
+# tiff/dng to jpg conversion: 'pillow' (in-process) or 'imagemagick' (convert subprocess)
+CONVERSION_BACKEND = 'pillow'
+
+# processes converting tiff/dng ahead of the uploader (0 converts inline), and the most
+# disk the not-yet-uploaded jpgs may take up in the importer's temp folder
+CONVERSION_WORKERS = 0
+CONVERSION_TEMP_BUDGET_MB = 2048
+
+# pooled Specify connections used by import workers; keep >= IMPORT_WORKERS
+DB_POOL_SIZE = 5
+
+# sqlite file recording files already imported or rejected; unchanged ones are skipped
+# on later runs. None disables it. See client_tools.py --manifest_mode to rebuild/verify.
+MANIFEST_PATH = None
+
+# tab separated log of each file's outcome (imported/rejected); None disables it
+OUTCOME_LOG_PATH = None
+# outcome log rows buffered before a write, and the longest a row may wait
+OUTCOME_LOG_BUFFER_ROWS = 1000
+OUTCOME_LOG_FLUSH_SECONDS = 30
+# gzip the outcome log to <path>.<n>.gz once it passes this size; 0 keeps one file
+OUTCOME_LOG_ROTATE_MB = 100
+# outcome rows echoed to stdout: 'all', 'rejected' or 'none'
+OUTCOME_LOG_PRINT = 'all'
+
+# files with these extensions are accepted as images without reading their headers;
+# anything else is checked with filetype
+TRUSTED_IMAGE_EXTENSIONS = ['tif', 'tiff', 'jpg', 'jpeg']
+
+# link files whose content (md5) is already in the image db instead of uploading them again;
+# hashes are cached in MANIFEST_PATH when it is set. HASH_WORKERS files are hashed at a time.
+DEDUPE_BY_MD5 = False
+HASH_WORKERS = 4
+
+# threads listing share folders during the scan, and how many listed folders may wait
+# for the importer before the listers pause
+SCAN_WORKERS = 8
+SCAN_QUEUE_SIZE = 256
+
+# catalog numbers per query when resolving CollectionObjectIDs up front
+CATALOG_LOOKUP_CHUNK_SIZE = 1000
+
 # summary statistics, figures to configure html report
 MAILING_LIST = []
 
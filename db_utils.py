@@ -1,9 +1,17 @@
 import logging
+import threading
 import traceback
 import time
-from mysql.connector import errorcode
+from contextlib import contextmanager
+from mysql.connector import errorcode, pooling
 import mysql.connector
 
+DEFAULT_POOL_SIZE = 5
+DEFAULT_LOCK_RETRIES = 3
+LOCK_RETRY_DELAY_SECONDS = 1
+# InnoDB rolls the whole transaction back on these, so it can be run again from the start
+RETRYABLE_LOCK_ERRORS = (errorcode.ER_LOCK_DEADLOCK, errorcode.ER_LOCK_WAIT_TIMEOUT)
+
 class DatabaseInconsistentError(Exception):
     pass
 
@@ -16,8 +24,30 @@ class DataInvariantException(Exception):
     pass
 
 
+def run_in_transaction(db, func, attempts=DEFAULT_LOCK_RETRIES):
+    """Runs func() in db.transaction() and returns its result.
+
+    If the transaction is chosen as a deadlock victim (1213) or times out waiting for a lock
+    (1205) it is run again, up to attempts times. Statements inside a transaction aren't
+    retried by retry_with_backoff, so this is the retry for them. Called inside an outer
+    transaction, func just joins it and the outer caller owns the retry.
+    """
+    if db.in_transaction():
+        return func()
+    for attempt in range(1, attempts + 1):
+        try:
+            with db.transaction():
+                return func()
+        except mysql.connector.Error as e:
+            if e.errno not in RETRYABLE_LOCK_ERRORS or attempt == attempts:
+                raise
+            db.logger.warning(f"Transaction rolled back ({e}), attempt {attempt} of {attempts}")
+            time.sleep(LOCK_RETRY_DELAY_SECONDS * attempt)
+
+
 class DbUtils:
-    def __init__(self, database_user, database_password, database_port, database_host, database_name):
+    def __init__(self, database_user, database_password, database_port, database_host, database_name,
+                 pool_size=DEFAULT_POOL_SIZE):
         self.database_user = database_user
         self.database_password = database_password
         self.database_port = database_port
@@ -25,6 +55,12 @@ class DbUtils:
         self.database_name = database_name
         self.logger = logging.getLogger(f'Client.{self.__class__.__name__}')
         self.cnx = None
+        # pooled connections back transaction(); self.cnx stays the connection for everything else
+        self.pool_size = min(pool_size, pooling.CNX_POOL_MAXSIZE)
+        self.pool = None
+        self.pool_lock = threading.Lock()
+        self.pool_slots = threading.BoundedSemaphore(self.pool_size)
+        self.thread_state = threading.local()
 
 
     @staticmethod
@@ -33,6 +69,10 @@ class DbUtils:
 
         def decorator(func):
             def wrapper(*args, **kwargs):
+                # inside a transaction a retry can't replay the earlier statements, so fail fast
+                # and let transaction() roll back
+                if args[0].in_transaction():
+                    return func(*args, **kwargs)
                 logger = args[0].logger
                 start_time = time.time()
                 delay = initial_delay
@@ -58,6 +98,77 @@ class DbUtils:
         return decorator
 
 
+    def in_transaction(self):
+        return getattr(self.thread_state, 'transaction_cnx', None) is not None
+
+    def get_pool(self):
+        if self.pool is None:
+            with self.pool_lock:
+                if self.pool is None:
+                    self.logger.debug(f"Creating pool of {self.pool_size} connections to {self.database_host}")
+                    self.pool = pooling.MySQLConnectionPool(
+                        pool_name=f"{self.database_name}_{id(self)}",
+                        pool_size=self.pool_size,
+                        user=self.database_user,
+                        password=self.database_password,
+                        host=self.database_host,
+                        port=self.database_port,
+                        database=self.database_name
+                    )
+        return self.pool
+
+    @contextmanager
+    def pooled_connection(self, reconnect_attempts=3, reconnect_delay=5):
+        """Checks a connection out of the pool for the calling thread.
+
+        Threads block here while all pool_size connections are in use. A connection that has
+        gone away is reconnected by ping() before it is handed out.
+        """
+        self.pool_slots.acquire()
+        cnx = None
+        try:
+            cnx = self.get_pool().get_connection()
+            cnx.ping(reconnect=True, attempts=reconnect_attempts, delay=reconnect_delay)
+            yield cnx
+        finally:
+            if cnx is not None:
+                try:
+                    cnx.close()  # hands it back to the pool
+                except mysql.connector.Error as e:
+                    self.logger.warning(f"Error returning connection to pool: {e}")
+            self.pool_slots.release()
+
+    @contextmanager
+    def transaction(self):
+        """Runs everything in the block on one pooled connection and commits once at the end.
+
+        Inside the block get_cursor(), get_one_record(), get_records() and execute() use the
+        transaction's connection, and commit() is deferred to the end of the block. Any
+        exception rolls the whole block back. Nested blocks join the outer transaction.
+        Each thread gets its own connection, so worker threads can run transactions at once.
+
+            with db.transaction():
+                db.execute(sql_a, params_a)
+                db.execute(sql_b, params_b)
+        """
+        if self.in_transaction():
+            yield self
+            return
+
+        with self.pooled_connection() as cnx:
+            self.thread_state.transaction_cnx = cnx
+            try:
+                yield self
+                cnx.commit()
+            except BaseException:
+                try:
+                    cnx.rollback()
+                except mysql.connector.Error as e:
+                    self.logger.error(f"Rollback failed: {e}")
+                raise
+            finally:
+                self.thread_state.transaction_cnx = None
+
     @retry_with_backoff()
     def connect(self):
         """Attempts to establish a database connection with logging but without redundant retry logic."""
@@ -166,6 +277,8 @@ class DbUtils:
 
     def get_cursor(self, buffered=False):
         """Gets a database cursor, ensuring connection is available."""
+        if self.in_transaction():
+            return self.thread_state.transaction_cnx.cursor(buffered=buffered)
         try:
             # or not self.cnx.is_connected()
             if self.cnx is None:
@@ -183,6 +296,17 @@ class DbUtils:
 
         self.logger.debug(f"SQL: {sql}")
 
+        if self.in_transaction():
+            cursor = self.get_cursor(buffered=True)
+            try:
+                if params:
+                    cursor.execute(sql, params=tuple(params))
+                else:
+                    cursor.execute(sql)
+            finally:
+                cursor.close()
+            return True
+
         try:
             if self.cnx is None or not self.cnx.is_connected():
                 self.connect()
@@ -209,4 +333,13 @@ class DbUtils:
         return False
 
     def commit(self):
+        # inside transaction() the commit happens once, when the block exits
+        if self.in_transaction():
+            return
         self.cnx.commit()
+
+    def rollback(self):
+        if self.in_transaction():
+            self.thread_state.transaction_cnx.rollback()
+            return
+        self.cnx.rollback()
@@ -2,14 +2,18 @@ import os
 import botany_importer
 import logging
 import sys
+from contextlib import closing
 from time import sleep
+from dir_walker import ParallelWalker, DEFAULT_SCAN_WORKERS, DEFAULT_SCAN_QUEUE_SIZE
 
 class DirTools:
-    def __init__(self, callback, limit=None):
+    def __init__(self, callback, limit=None, scan_workers=DEFAULT_SCAN_WORKERS,
+                 scan_queue_size=DEFAULT_SCAN_QUEUE_SIZE):
         self.logger = logging.getLogger(f'Client.' + self.__class__.__name__)
         self.callback = callback
         self.processed_num = 0
         self.processed_limit = limit
+        self.walker = ParallelWalker(workers=scan_workers, queue_size=scan_queue_size)
 
     def get_full_path(self, filepath, filename):
         if filepath is None:
@@ -30,21 +34,23 @@ class DirTools:
         if isinstance(path_names, str):
             path_names = [path_names]
         for path in path_names:
-            for root, d_names, f_names in os.walk(path):
-                for cur_file in f_names:
-                    if self.processed_limit is not None and self.processed_num > self.processed_limit:
-                        return
-                    self.process_file(root, cur_file)
+            # directories are listed in the background while callbacks run here
+            with closing(self.walker.walk(path)) as listings:
+                for root, d_names, f_names in listings:
+                    for cur_file in f_names:
+                        if self.processed_limit is not None and self.processed_num > self.processed_limit:
+                            return
+                        self.process_file(root, cur_file)
 
 
 
     def process_directory(self, dirpath):
-        for file in os.listdir(dirpath):
-            full_path = os.path.join(dirpath, file)
-            if not os.path.isdir(full_path):
-                if self.processed_limit is not None and self.processed_num > self.processed_limit:
-                    return
-                self.process_file(dirpath, file)
+        with os.scandir(dirpath) as entries:
+            file_names = [entry.name for entry in entries if not entry.is_dir()]
+        for file in file_names:
+            if self.processed_limit is not None and self.processed_num > self.processed_limit:
+                return
+            self.process_file(dirpath, file)
 
 
     def process_file_or_directory(self,file_list):
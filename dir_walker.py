@@ -0,0 +1,83 @@
+"""Docstring: threaded os.scandir walker for the network shares scanned by the importers."""
+import logging
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_SCAN_WORKERS = 8
+DEFAULT_SCAN_QUEUE_SIZE = 256
+
+
+class ParallelWalker:
+    """Lists directories on a thread pool and streams them back to the caller.
+
+    On SMB/NFS every listdir/isdir is a round trip, so directories are listed concurrently and
+    file/dir type comes from the scandir DirEntry instead of a stat per entry. walk() is a
+    generator: listings arrive through a queue of at most queue_size entries, so the caller's
+    callbacks run on the calling thread while the walk continues, and a slow consumer holds
+    the listers back instead of letting results pile up. Order is not os.walk order.
+    """
+
+    def __init__(self, workers=DEFAULT_SCAN_WORKERS, queue_size=DEFAULT_SCAN_QUEUE_SIZE,
+                 follow_symlinks=False, join=os.path.join):
+        self.logger = logging.getLogger(f'Client.{self.__class__.__name__}')
+        self.workers = max(1, workers)
+        self.queue_size = max(1, queue_size)
+        # like os.walk(followlinks=...): a symlinked directory is only descended when True
+        self.follow_symlinks = follow_symlinks
+        self.join = join
+
+    def _list_dir(self, dir_path, results, stop):
+        subdirs = []
+        files = []
+        error = None
+        try:
+            with os.scandir(dir_path) as entries:
+                for entry in entries:
+                    if stop.is_set():
+                        return
+                    try:
+                        is_dir = entry.is_dir()
+                    except OSError:
+                        is_dir = False
+                    if not is_dir:
+                        files.append(entry.name)
+                    elif self.follow_symlinks or not entry.is_symlink():
+                        subdirs.append(entry.name)
+        except OSError as e:
+            error = e
+        item = (dir_path, subdirs, files, error)
+        while not stop.is_set():
+            try:
+                results.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def walk(self, roots):
+        """yields (dir_path, subdir_names, file_names) for every directory under roots"""
+        if isinstance(roots, str):
+            roots = [roots]
+        results = queue.Queue(maxsize=self.queue_size)
+        stop = threading.Event()
+        executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='scan')
+        pending = 0
+        try:
+            for root in roots:
+                executor.submit(self._list_dir, root, results, stop)
+                pending += 1
+            while pending:
+                dir_path, subdirs, files, error = results.get()
+                pending -= 1
+                if error is not None:
+                    self.logger.warning(f"Can't list {dir_path}, skipping: {error}")
+                    continue
+                for name in subdirs:
+                    executor.submit(self._list_dir, self.join(dir_path, name), results, stop)
+                    pending += 1
+                yield dir_path, subdirs, files
+        finally:
+            # also reached when the caller stops early; listers blocked on the queue give up
+            stop.set()
+            executor.shutdown(wait=True, cancel_futures=True)
@@ -1,21 +1,108 @@
 import os, pickle
-from anytree import Node, RenderTree
+import logging
+from dir_walker import ParallelWalker, DEFAULT_SCAN_WORKERS, DEFAULT_SCAN_QUEUE_SIZE
 from get_configs import get_config
 
 iz_importer_config = get_config(config="IZ")
 
+DECODER_RING_FILENAME = 'decoder_ring.tsv'
 
 
-class DirectoryTree():
+class PathNode:
+    """Lightweight handle on one directory or file in a DirectoryTree.
+
+    Nodes are only created on request (get_node_from_path, children, parent); the tree itself
+    stores plain tables, not one object per file.
+    """
+    __slots__ = ('tree', 'dir_id', 'filename')
+
+    def __init__(self, tree, dir_id, filename=None):
+        self.tree = tree
+        self.dir_id = dir_id
+        self.filename = filename
+
+    @property
+    def is_dir(self):
+        return self.filename is None
+
+    @property
+    def name(self):
+        if self.filename is not None:
+            return self.filename
+        if self.dir_id in self.tree.root_ids:
+            return self.tree.dir_paths[self.dir_id]
+        return self.tree.dir_names[self.dir_id]
+
+    @property
+    def path(self):
+        return self.tree.get_node_path(self)
+
+    @property
+    def parent(self):
+        if self.filename is not None:
+            return PathNode(self.tree, self.dir_id)
+        parent_id = self.tree.dir_parents[self.dir_id]
+        return None if parent_id < 0 else PathNode(self.tree, parent_id)
+
+    @property
+    def is_root(self):
+        return self.filename is None and self.tree.dir_parents[self.dir_id] < 0
+
+    @property
+    def children(self):
+        if self.filename is not None:
+            return ()
+        subdirs = self.tree.dir_subdirs[self.dir_id] or {}
+        return tuple(PathNode(self.tree, sub_id) for sub_id in subdirs.values()) + \
+            tuple(PathNode(self.tree, self.dir_id, name) for name in self.tree.dir_files[self.dir_id])
+
+    @property
+    def is_leaf(self):
+        return self.filename is not None or \
+            (not self.tree.dir_subdirs[self.dir_id] and not self.tree.dir_files[self.dir_id])
+
+    def __eq__(self, other):
+        return isinstance(other, PathNode) and self.tree is other.tree and \
+            (self.dir_id, self.filename) == (other.dir_id, other.filename)
+
+    def __hash__(self):
+        return hash((self.dir_id, self.filename))
+
+    def __repr__(self):
+        return f"PathNode({self.path!r})"
+
 
-    def __init__(self, directories, pickle_for_debug=False):
+class DirectoryTree():
+    """Index of every file under a set of scan folders.
+
+    Directories live in parallel tables indexed by a directory id (full path, name, parent id,
+    name -> id map of subdirectories) and each directory keeps its file names as one tuple. A
+    path is rebuilt by a table lookup rather than by walking parent nodes, a child directory
+    is a dict lookup, and a file lookup builds a set for that one directory on first use.
+    Each scan folder is its own root; paths come out as `<scan folder>/<sub>/<file>`.
+
+    Folders are listed with a ParallelWalker. If on_file is given it is called with each
+    file's path as soon as its folder has been listed, so work on the first files starts
+    while the rest of the share is still being walked.
+    """
+
+    def __init__(self, directories, pickle_for_debug=False, on_file=None,
+                 scan_workers=DEFAULT_SCAN_WORKERS, scan_queue_size=DEFAULT_SCAN_QUEUE_SIZE):
+        self.logger = logging.getLogger(f'Client.{self.__class__.__name__}')
         self.pickle_file = 'directory_tree.pickle'
+        self.on_file = on_file
+        # the anytree version followed symlinked folders, so this does too
+        self.walker = ParallelWalker(workers=scan_workers, queue_size=scan_queue_size, follow_symlinks=True,
+                                     join=lambda dir_path, name: f"{dir_path}/{name}")
         if pickle_for_debug:
             if os.path.exists(self.pickle_file):
                 print("RESTORING FROM PICKLE")
                 # load the directory tree from the pickle file
                 with open(self.pickle_file, 'rb') as f:
-                    self.root_node = pickle.load(f)
+                    self.__dict__.update(pickle.load(f))
+                self.dir_file_sets = {}
+                if on_file is not None:
+                    self.process_files(on_file)
             else:
                 # build the directory tree by scanning the directory
                 print("GENERATING PICKLE")
@@ -24,80 +111,131 @@ class DirectoryTree():
 
                 # save the directory tree to a pickle file
                 with open(self.pickle_file, 'wb') as f:
-                    pickle.dump(self.root_node, f)
+                    pickle.dump(self._tables(), f)
         else:
             self._build_root_node(directories)
 
-    def _build_root_node(self,directories):
-        self.root_node = None
+    def _tables(self):
+        return {key: self.__dict__[key] for key in
+                ('dir_paths', 'dir_names', 'dir_parents', 'dir_subdirs', 'dir_files', 'root_ids')}
+
+    def _build_root_node(self, directories):
+        self.dir_paths = []
+        self.dir_names = []
+        self.dir_parents = []
+        # None instead of an empty dict for directories without subdirectories
+        self.dir_subdirs = []
+        self.dir_files = []
+        self.root_ids = []
+        self.dir_file_sets = {}
         for directory in directories:
-            if self.root_node is None:
-                self.root_node = self._build_tree(directory)
-                self.root_node.name = directory
-            else:
-                self.add_directory(directory)
-    def _build_tree(self, root_path):
-        # create a node for the root directory
-        root_node = Node(os.path.basename(root_path))
-
-        # traverse the directory structure recursively
-        for item in os.listdir(root_path):
-            item_path = os.path.join(root_path, item)
-            if os.path.isdir(item_path):
-                # recursively traverse subdirectories
-                subdirectory_node = self._build_tree(item_path)
-                subdirectory_node.parent = root_node
-            else:
-                # create a leaf node for each file
-                Node(item, parent=root_node)
+            self.add_directory(directory)
 
-        return root_node
+    @property
+    def root_node(self):
+        return PathNode(self, self.root_ids[0]) if self.root_ids else None
+
+    def _new_dir(self, path, name, parent_id):
+        dir_id = len(self.dir_paths)
+        self.dir_paths.append(path)
+        self.dir_names.append(name)
+        self.dir_parents.append(parent_id)
+        self.dir_subdirs.append(None)
+        self.dir_files.append(())
+        return dir_id
+
+    def _build_tree(self, root_path):
+        root_id = self._new_dir(root_path, os.path.basename(root_path), -1)
+        # ids of folders the walker has been asked for but hasn't returned yet
+        waiting = {root_path: root_id}
+        for dir_path, subdirs, files in self.walker.walk([root_path]):
+            dir_id = waiting.pop(dir_path)
+            if subdirs:
+                self.dir_subdirs[dir_id] = {}
+                for name in subdirs:
+                    sub_path = f"{dir_path}/{name}"
+                    sub_id = self._new_dir(sub_path, name, dir_id)
+                    self.dir_subdirs[dir_id][name] = sub_id
+                    waiting[sub_path] = sub_id
+            self.dir_files[dir_id] = tuple(files)
+            if self.on_file is not None:
+                for name in files:
+                    self.on_file(f"{dir_path}/{name}")
+        return root_id
 
     def add_directory(self, root_path):
-        # build a subtree rooted at the new root path
-        new_root_node = self._build_tree(root_path)
-        new_root_node.name = root_path
-        new_root_node.parent = self.root_node
+        self.root_ids.append(self._build_tree(root_path))
 
     def get_node_path(self, node):
-        if node.is_root:
-            return str(node.name)
-        else:
-            parent_path = self.get_node_path(node.parent)
-            return f"{parent_path}/{node.name}"
+        if node.filename is None:
+            return self.dir_paths[node.dir_id]
+        return f"{self.dir_paths[node.dir_id]}/{node.filename}"
 
     def print_tree(self):
-        for pre, _, node in RenderTree(self.root_node):
-            print(f'{pre}{node.name}')
+        for root_id in self.root_ids:
+            stack = [(root_id, 0)]
+            while stack:
+                dir_id, depth = stack.pop()
+                print(f"{'    ' * depth}{self.dir_paths[dir_id] if depth == 0 else self.dir_names[dir_id]}")
+                for name in self.dir_files[dir_id]:
+                    print(f"{'    ' * (depth + 1)}{name}")
+                subdirs = self.dir_subdirs[dir_id] or {}
+                stack.extend((sub_id, depth + 1) for sub_id in reversed(list(subdirs.values())))
+
+    def iter_file_paths(self):
+        """yields the full path of every file, one directory at a time"""
+        for dir_id, dir_path in enumerate(self.dir_paths):
+            for name in self.dir_files[dir_id]:
+                yield f"{dir_path}/{name}"
 
     def process_files(self, func):
-        for node in self.root_node.descendants:
-            # for node in self.self.iz_importer_config.IZ_SCAN_FOLDERS
-            if not node.is_leaf:
-                continue
-            func(self.get_node_path(node))
+        for full_path in self.iter_file_paths():
+            func(full_path)
 
-    def get_node_from_path(self, full_path):
-        path_parts = os.path.normpath(full_path).split(os.sep)
+    def _has_file(self, dir_id, name):
+        file_set = self.dir_file_sets.get(dir_id)
+        if file_set is None:
+            file_set = frozenset(self.dir_files[dir_id])
+            self.dir_file_sets[dir_id] = file_set
+        return name in file_set
 
-        node = self.root_node
-        for part in path_parts:
-            node = next((child for child in node.children if child.name == part), None)
-            if node is None:
-                return None
+    def get_node_from_path(self, full_path):
+        norm_path = os.path.normpath(full_path)
+        for root_id in self.root_ids:
+            norm_root = os.path.normpath(self.dir_paths[root_id])
+            if norm_path == norm_root:
+                return PathNode(self, root_id)
+            prefix = norm_root if norm_root.endswith(os.sep) else norm_root + os.sep
+            if not norm_path.startswith(prefix):
+                continue
 
-        return node
+            dir_id = root_id
+            path_parts = norm_path[len(prefix):].split(os.sep)
+            for part in path_parts[:-1]:
+                dir_id = (self.dir_subdirs[dir_id] or {}).get(part)
+                if dir_id is None:
+                    return None
+            last = path_parts[-1]
+            sub_id = (self.dir_subdirs[dir_id] or {}).get(last)
+            if sub_id is not None:
+                return PathNode(self, sub_id)
+            if self._has_file(dir_id, last):
+                return PathNode(self, dir_id, last)
+            return None
+        return None
 
     def find_closest_decoder_ring(self, full_path):
+        """path of the nearest decoder_ring.tsv beside full_path or in a folder above it, else None"""
         node = self.get_node_from_path(full_path)
+        if node is None or node.is_root:
+            return None
 
-        while node.parent is not None:
-            for child in node.parent.children:
-                if child.name == 'decoder_ring.tsv':
-                    return child.path
-            node = node.parent
-
-        return node
+        dir_id = node.dir_id if node.filename is not None else self.dir_parents[node.dir_id]
+        while dir_id >= 0:
+            if self._has_file(dir_id, DECODER_RING_FILENAME):
+                return f"{self.dir_paths[dir_id]}/{DECODER_RING_FILENAME}"
+            dir_id = self.dir_parents[dir_id]
+        return None
 
 
 if __name__ == '__main__':
@@ -105,17 +243,3 @@ if __name__ == '__main__':
     print(f"Joe test: {DIR}")
     ring = DirectoryTree(iz_importer_config['IZ_CORE_SCAN_FOLDERS'])
     ring.print_tree()
-    #
-    # def search_file(self, filename):
-    #     # Traverse the tree from the given filename to the root node, checking for the target file along the way
-    #     path = os.path.dirname(filename)
-    #     while path != '/':
-    #         full_path = os.path.join(path, filename)
-    #         if os.path.exists(full_path):
-    #             return full_path
-    #         else:
-    #             node = next(node for node in self.root.descendants if node.path == path)
-    #             path = os.path.dirname(node.path)
-    #
-    #     # If the target file was not found, return None
-    #     return None
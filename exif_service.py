@@ -0,0 +1,253 @@
+"""Docstring: long-lived exiftool processes for IZ metadata reads and writes.
+
+MetadataTools starts a new exiftool (a perl interpreter) per call. ExifService keeps a small
+pool of `exiftool -stay_open True` processes instead, so each read or write is a round trip
+over their pipes, and a whole folder can be read with one request.
+"""
+import errno
+import html
+import logging
+import os
+import queue
+import selectors
+import shutil
+import subprocess
+import threading
+import time
+from cas_metadata_tools import EXIFConstants, MetadataTools
+
+DEFAULT_EXIF_TIMEOUT = 20
+# a batched read gets DEFAULT_EXIF_TIMEOUT plus this much per file in it
+BATCH_TIMEOUT_PER_FILE = 2
+
+# same output format MetadataTools.read_exif_tags parses
+READ_ARGS = ['-a', '-g', '-G']
+COMMON_ARGS = ['-charset', 'filename=utf8']
+
+
+class ExifToolError(Exception):
+    pass
+
+
+def has_line_break(text):
+    return "\n" in text or "\r" in text
+
+
+def escape_value(value):
+    """a tag value for an -E (HTML entity) write; the argfile takes one argument per line,
+       so line breaks have to be sent as entities"""
+    return html.escape(str(value), quote=False).replace("\r", "&#xd;").replace("\n", "&#xa;")
+
+
+def parse_exiftool_output(text):
+    """parses `exiftool -a -g -G` output into {path: {'Group:Tag': value}}.
+       A single-file response has no ======== header, so its tags come back under None."""
+    results = {}
+    current = results.setdefault(None, {})
+    for line in text.split("\n"):
+        if line.startswith("======== "):
+            current = results.setdefault(line[len("======== "):].strip(), {})
+            continue
+        if ": " in line and "]" in line:
+            group, key_value = line.split("]", 1)
+            key, value = key_value.split(":", 1)
+            formatted_group = group.replace('[', '').strip()
+            formatted_key = key.replace(' ', '').strip()
+            if value.strip():
+                current[formatted_group + ':' + formatted_key] = value.strip()
+    if not results[None]:
+        del results[None]
+    return results
+
+
+class ExifToolProcess:
+    """one `exiftool -stay_open True -@ -` process; not thread safe, ExifService hands them out"""
+
+    def __init__(self, timeout=DEFAULT_EXIF_TIMEOUT):
+        self.logger = logging.getLogger(f'Client.{self.__class__.__name__}')
+        self.timeout = timeout
+        self.sequence = 0
+        self.proc = None
+        self.start()
+
+    def start(self):
+        self.proc = subprocess.Popen(['exiftool', '-stay_open', 'True', '-@', '-'],
+                                     stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                     env=os.environ.copy())
+        self.buffers = {self.proc.stdout.fileno(): b"", self.proc.stderr.fileno(): b""}
+
+    def _read_until(self, markers, deadline):
+        """reads stdout and stderr until each ends with its marker; returns (stdout, stderr)"""
+        selector = selectors.DefaultSelector()
+        pending = {}
+        for stream, marker in zip((self.proc.stdout, self.proc.stderr), markers):
+            pending[stream.fileno()] = marker
+            selector.register(stream.fileno(), selectors.EVENT_READ)
+        done = {}
+        try:
+            while pending:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError(os.strerror(errno.ETIMEDOUT))
+                for key, _ in selector.select(timeout=remaining):
+                    fd = key.fd
+                    chunk = os.read(fd, 65536)
+                    if not chunk:
+                        raise ExifToolError("exiftool exited unexpectedly")
+                    self.buffers[fd] += chunk
+                    marker = pending.get(fd)
+                    if marker is not None and marker in self.buffers[fd]:
+                        output, self.buffers[fd] = self.buffers[fd].split(marker, 1)
+                        done[fd] = output
+                        del pending[fd]
+                        selector.unregister(fd)
+        finally:
+            selector.close()
+        return done[self.proc.stdout.fileno()], done[self.proc.stderr.fileno()]
+
+    def execute(self, args, timeout=None):
+        """runs one exiftool command, within timeout seconds (self.timeout by default);
+           returns (stdout, stderr) decoded"""
+        if self.proc is None or self.proc.poll() is not None:
+            self.start()
+        if any(has_line_break(arg) for arg in args):
+            # each argfile line is one argument; a line break would split it
+            raise ValueError("exiftool arguments can't contain line breaks")
+        self.sequence += 1
+        ready = f"{{ready{self.sequence}}}"
+        command = COMMON_ARGS + list(args) + ['-echo4', ready, f'-execute{self.sequence}']
+        try:
+            self.proc.stdin.write(("\n".join(command) + "\n").encode('utf-8'))
+            self.proc.stdin.flush()
+            stdout, stderr = self._read_until((ready.encode() + b"\n", ready.encode() + b"\n"),
+                                              time.monotonic() + (timeout or self.timeout))
+        except (TimeoutError, ExifToolError, OSError):
+            # the pipe is out of step now; the next call starts a fresh process
+            self.kill()
+            raise
+        return MetadataTools.safe_decode(stdout), MetadataTools.safe_decode(stderr)
+
+    def kill(self):
+        if self.proc is not None:
+            self.proc.kill()
+            self.proc.wait()
+            self.proc = None
+
+    def close(self):
+        if self.proc is None:
+            return
+        try:
+            self.proc.stdin.write(b"-stay_open\nFalse\n")
+            self.proc.stdin.flush()
+            self.proc.wait(timeout=5)
+        except (OSError, subprocess.TimeoutExpired):
+            self.kill()
+        self.proc = None
+
+
+class ExifService:
+    """Pool of persistent exiftool processes with the same read/write semantics as MetadataTools.
+
+    Processes are started lazily up to `workers` and handed out one caller at a time, so the
+    service can be shared by threads. read_tags_batch() reads many files in one request.
+    """
+
+    def __init__(self, workers=2, timeout=DEFAULT_EXIF_TIMEOUT, batch_size=200):
+        self.logger = logging.getLogger(f'Client.{self.__class__.__name__}')
+        self.workers = max(1, workers)
+        self.timeout = timeout
+        self.batch_size = max(1, batch_size)
+        self.idle = queue.Queue()
+        self.started = 0
+        self.lock = threading.Lock()
+        self.processes = []
+
+    @staticmethod
+    def available():
+        return shutil.which('exiftool') is not None
+
+    def _acquire(self):
+        try:
+            return self.idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self.lock:
+            if self.started < self.workers:
+                self.started += 1
+                process = ExifToolProcess(timeout=self.timeout)
+                self.processes.append(process)
+                return process
+        return self.idle.get()
+
+    def _execute(self, args, timeout=None):
+        process = self._acquire()
+        try:
+            return process.execute(args, timeout=timeout)
+        finally:
+            self.idle.put(process)
+
+    def read_tags(self, path):
+        """all tags of one file, like MetadataTools.read_exif_tags"""
+        if has_line_break(path):
+            # can't go through the argfile
+            return MetadataTools(path).read_exif_tags()
+        stdout, stderr = self._execute(READ_ARGS + [path])
+        if stderr.strip():
+            raise ValueError(f"ExifTool error: {stderr.strip()}")
+        parsed = parse_exiftool_output(stdout)
+        return parsed.get(None) or parsed.get(path) or {}
+
+    def read_tags_batch(self, paths):
+        """reads many files in requests of batch_size; returns {path: tags}.
+           Files exiftool couldn't read are left out; read them with read_tags for the error.
+           Each request's timeout grows with the number of files in it."""
+        results = {}
+        paths = list(paths)
+        for start in range(0, len(paths), self.batch_size):
+            # names with line breaks can't go through the argfile; read_tags handles them
+            chunk = [path for path in paths[start:start + self.batch_size] if not has_line_break(path)]
+            if not chunk:
+                continue
+            stdout, stderr = self._execute(READ_ARGS + chunk,
+                                           timeout=self.timeout + BATCH_TIMEOUT_PER_FILE * len(chunk))
+            if stderr.strip():
+                self.logger.debug(f"ExifTool batch warnings: {stderr.strip()}")
+            parsed = parse_exiftool_output(stdout)
+            if len(chunk) == 1 and None in parsed:
+                parsed = {chunk[0]: parsed[None]}
+            for path in chunk:
+                if path in parsed:
+                    results[path] = parsed[path]
+        return results
+
+    def write_tags(self, path, exif_dict, overwrite_blank=False):
+        """writes tags in place, like MetadataTools.write_exif_tags"""
+        valid_dict = EXIFConstants.check_dict_valid(dict=exif_dict)
+        if any(value is False for value in valid_dict.values()):
+            raise ValueError(f"Invalid keys in exif_dict, check exif constants:{valid_dict}")
+
+        if has_line_break(path):
+            MetadataTools(path=path).write_exif_tags(exif_dict=exif_dict, overwrite_blank=overwrite_blank)
+            return
+
+        # multi-line values (e.g. notes from key.csv) go as HTML entities, which -E decodes
+        escape = any(value is not None and has_line_break(str(value)) for value in exif_dict.values())
+        encode = escape_value if escape else str
+        if overwrite_blank:
+            valid_args = [f"-{key}={encode(value)}" if value is not None else f"-{key}= "
+                          for key, value in exif_dict.items()]
+        else:
+            valid_args = [f"-{key}={encode(value)}" for key, value in exif_dict.items() if value is not None]
+        if not valid_args:
+            return
+        stdout, stderr = self._execute(["-overwrite_original"] + (["-E"] if escape else []) + valid_args + [path])
+        if stderr.strip():
+            self.logger.warning(f"ExifTool write to {path}: {stderr.strip()}")
+
+    def close(self):
+        with self.lock:
+            processes, self.processes = self.processes, []
+            self.started = 0
+        for process in processes:
+            process.close()
+        self.idle = queue.Queue()
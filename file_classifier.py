@@ -0,0 +1,79 @@
+"""Docstring: one-pass file classification (extension, MIME type, image validity) for the importers."""
+import logging
+import os
+import re
+from collections import namedtuple
+import filetype
+
+MIME_TYPES = {
+    'tif': 'image/tiff',
+    'tiff': 'image/tiff',
+    'jpg': 'image/jpeg',
+    'jpeg': 'image/jpeg',
+    'gif': 'image/gif',
+    'png': 'image/png',
+    'pdf': 'application/pdf',
+}
+
+# filetype doesn't recognise every tiff, so these were always accepted without a header match
+DEFAULT_TRUSTED_EXTENSIONS = ('tif', 'tiff')
+
+FileClass = namedtuple('FileClass', ['extension', 'mime_type', 'valid'])
+
+
+class FileClassifier:
+    """Classifies files for an importer; built once from the collection config.
+
+    The IMAGE_SUFFIX pattern is compiled once. classify() gets the extension and MIME type from a
+    single lowercase of the name, and reads the file header (filetype.is_image) only when the
+    extension isn't one of trusted_extensions.
+    """
+
+    def __init__(self, name_pattern=None, match_anywhere=False, trusted_extensions=DEFAULT_TRUSTED_EXTENSIONS):
+        self.logger = logging.getLogger(f'Client.{self.__class__.__name__}')
+        self.name_regex = re.compile(name_pattern) if name_pattern else None
+        # match_anywhere: the pattern may match past the start of the name, like '^.*' + pattern
+        self.match_anywhere = match_anywhere
+        self.trusted_extensions = frozenset(extension.lower().lstrip('.') for extension in trusted_extensions)
+
+    @classmethod
+    def from_config(cls, config, match_anywhere=False):
+        return cls(name_pattern=getattr(config, 'IMAGE_SUFFIX', None), match_anywhere=match_anywhere,
+                   trusted_extensions=getattr(config, 'TRUSTED_IMAGE_EXTENSIONS', DEFAULT_TRUSTED_EXTENSIONS))
+
+    def rules(self):
+        """the settings that decide what this classifier accepts, for fingerprinting"""
+        return (self.name_regex.pattern if self.name_regex else None, self.match_anywhere,
+                tuple(sorted(self.trusted_extensions)))
+
+    @staticmethod
+    def extension(filepath):
+        """lowercase extension of the file name without the dot, '' if there is none"""
+        filename = os.path.basename(filepath)
+        if "." not in filename:
+            return ''
+        return filename.rsplit(".", 1)[1].lower()
+
+    def mime_type(self, filepath):
+        return MIME_TYPES.get(self.extension(filepath))
+
+    def matches_name(self, name):
+        """True if name matches the collection's IMAGE_SUFFIX (always True without one)"""
+        if self.name_regex is None:
+            return True
+        if self.match_anywhere:
+            return self.name_regex.search(name) is not None
+        return self.name_regex.match(name) is not None
+
+    def classify(self, filepath):
+        extension = self.extension(filepath)
+        if "." not in os.path.basename(filepath):
+            self.logger.debug(f"Rejected; no . : {os.path.basename(filepath)}")
+            return FileClass(extension, None, False)
+        mime_type = MIME_TYPES.get(extension)
+        if extension in self.trusted_extensions:
+            return FileClass(extension, mime_type, True)
+        if not filetype.is_image(filepath):
+            self.logger.debug(f"Not identified as a file, looks like: {filetype.guess(filepath)}")
+            return FileClass(extension, mime_type, False)
+        return FileClass(extension, mime_type, True)
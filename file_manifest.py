@@ -0,0 +1,169 @@
+"""Docstring: persistent record of what happened to each file on the scanned shares, so nightly
+   runs can skip files that haven't changed since they were imported or rejected.
+"""
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+IMPORTED = 'imported'
+REJECTED = 'rejected'
+
+# outcomes that stay true for as long as the file itself is unchanged
+FINAL_OUTCOMES = (IMPORTED, REJECTED)
+
+MANIFEST_MODES = ('rebuild', 'verify')
+
+
+class FileManifest:
+    """SQLite table of path -> (size, mtime, context, outcome), plus a table of content hashes.
+
+    A file is skipped when its size and mtime match the row, the row's outcome is final, and
+    the caller's context string matches. Context covers inputs outside the file that can
+    change the outcome, e.g. the IZ key.csv that governs a folder.
+
+    rebuild() empties the manifest so the next run checks every file again. verify()
+    re-stats every row and drops the ones whose file changed or went away, and given a
+    still_imported lookup, the imported rows whose attachment has since been removed.
+
+    get_md5()/record_md5() cache each file's md5 under the same (size, mtime) check, so an
+    unchanged file is never read again to hash it. rebuild() leaves the hashes alone.
+    """
+
+    def __init__(self, manifest_path, commit_every=500):
+        self.logger = logging.getLogger(f'Client.{self.__class__.__name__}')
+        self.manifest_path = manifest_path
+        self.commit_every = commit_every
+        self.pending_writes = 0
+        self.skipped = 0
+        self.lock = threading.Lock()
+        # workers record outcomes from their own threads; every access goes through self.lock
+        self.cnx = sqlite3.connect(manifest_path, check_same_thread=False)
+        self.cnx.execute("PRAGMA journal_mode=WAL")
+        self.cnx.execute("PRAGMA synchronous=NORMAL")
+        self.cnx.execute("""CREATE TABLE IF NOT EXISTS files (
+                                path TEXT PRIMARY KEY,
+                                size INTEGER NOT NULL,
+                                mtime_ns INTEGER NOT NULL,
+                                context TEXT NOT NULL DEFAULT '',
+                                outcome TEXT NOT NULL,
+                                updated REAL NOT NULL)""")
+        self.cnx.execute("""CREATE TABLE IF NOT EXISTS hashes (
+                                path TEXT PRIMARY KEY,
+                                size INTEGER NOT NULL,
+                                mtime_ns INTEGER NOT NULL,
+                                md5 TEXT NOT NULL)""")
+        self.cnx.commit()
+
+    @staticmethod
+    def _stat(full_path, stat_result=None):
+        if stat_result is not None:
+            return stat_result
+        try:
+            return os.stat(full_path)
+        except OSError:
+            return None
+
+    def should_skip(self, full_path, context=None, stat_result=None):
+        """True if full_path is unchanged since it was last recorded with a final outcome"""
+        stat_result = self._stat(full_path, stat_result)
+        if stat_result is None:
+            return False
+        with self.lock:
+            row = self.cnx.execute("SELECT size, mtime_ns, context, outcome FROM files WHERE path = ?",
+                                   (full_path,)).fetchone()
+        if row is None:
+            return False
+        size, mtime_ns, row_context, outcome = row
+        unchanged = (size == stat_result.st_size and mtime_ns == stat_result.st_mtime_ns
+                     and row_context == (context or '') and outcome in FINAL_OUTCOMES)
+        if unchanged:
+            self.skipped += 1
+        return unchanged
+
+    def record(self, full_path, outcome, context=None, stat_result=None):
+        stat_result = self._stat(full_path, stat_result)
+        if stat_result is None:
+            return
+        with self.lock:
+            self.cnx.execute("INSERT OR REPLACE INTO files (path, size, mtime_ns, context, outcome, updated) "
+                             "VALUES (?, ?, ?, ?, ?, ?)",
+                             (full_path, stat_result.st_size, stat_result.st_mtime_ns, context or '',
+                              outcome, time.time()))
+            self._written()
+
+    def get_md5(self, full_path, stat_result=None):
+        """the cached md5 of full_path, or None if there is none for its current size and mtime"""
+        stat_result = self._stat(full_path, stat_result)
+        if stat_result is None:
+            return None
+        with self.lock:
+            row = self.cnx.execute("SELECT size, mtime_ns, md5 FROM hashes WHERE path = ?",
+                                   (full_path,)).fetchone()
+        if row is None or row[0] != stat_result.st_size or row[1] != stat_result.st_mtime_ns:
+            return None
+        return row[2]
+
+    def record_md5(self, full_path, md5, stat_result=None):
+        stat_result = self._stat(full_path, stat_result)
+        if stat_result is None:
+            return
+        with self.lock:
+            self.cnx.execute("INSERT OR REPLACE INTO hashes (path, size, mtime_ns, md5) VALUES (?, ?, ?, ?)",
+                             (full_path, stat_result.st_size, stat_result.st_mtime_ns, md5))
+            self._written()
+
+    def forget(self, full_path):
+        with self.lock:
+            self.cnx.execute("DELETE FROM files WHERE path = ?", (full_path,))
+            self._written()
+
+    def _written(self):
+        # caller holds self.lock
+        self.pending_writes += 1
+        if self.pending_writes >= self.commit_every:
+            self.cnx.commit()
+            self.pending_writes = 0
+
+    def rebuild(self):
+        """empties the manifest; returns the number of rows dropped"""
+        with self.lock:
+            dropped = self.cnx.execute("DELETE FROM files").rowcount
+            self.cnx.commit()
+            self.pending_writes = 0
+        self.logger.info(f"Manifest {self.manifest_path} cleared, dropped {dropped} rows")
+        return dropped
+
+    def verify(self, still_imported=None):
+        """drops rows whose file is gone or has changed; returns (checked, dropped).
+           still_imported(paths) returns the paths that are still imported on the server; the
+           remaining imported rows, e.g. of purged or undone attachments, are dropped too."""
+        with self.lock:
+            rows = self.cnx.execute("SELECT path, size, mtime_ns, outcome FROM files").fetchall()
+        stale = []
+        imported = []
+        for full_path, size, mtime_ns, outcome in rows:
+            stat_result = self._stat(full_path)
+            if stat_result is None or stat_result.st_size != size or stat_result.st_mtime_ns != mtime_ns:
+                stale.append((full_path,))
+            elif outcome == IMPORTED:
+                imported.append(full_path)
+        if still_imported is not None and imported:
+            found = set(still_imported(imported))
+            stale.extend((full_path,) for full_path in imported if full_path not in found)
+        with self.lock:
+            self.cnx.executemany("DELETE FROM files WHERE path = ?", stale)
+            self.cnx.commit()
+            self.pending_writes = 0
+        self.logger.info(f"Manifest {self.manifest_path} verified {len(rows)} rows, dropped {len(stale)}")
+        return len(rows), len(stale)
+
+    def close(self):
+        with self.lock:
+            if self.cnx is None:
+                return
+            self.cnx.commit()
+            self.cnx.close()
+            self.cnx = None
+        self.logger.info(f"Manifest skipped {self.skipped} unchanged files")
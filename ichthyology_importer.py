@@ -1,9 +1,11 @@
 from importer import Importer
+from file_manifest import REJECTED
 import os
 import re
 import logging
 from get_configs import get_config
 from dir_tools import DirTools
+from dir_walker import DEFAULT_SCAN_WORKERS, DEFAULT_SCAN_QUEUE_SIZE
 from time_utils import get_pst_time_now_string
 
 logging.basicConfig(level=logging.DEBUG)
@@ -21,8 +23,12 @@ class IchthyologyImporter(Importer):
 
         super().__init__(ich_importer_config, "Ichthyology")
         self.catalog_number_map = {}
+        self.collection_object_ids = {}
 
-        dir_tools = DirTools(self.build_filename_map)
+        dir_tools = DirTools(self.build_filename_map,
+                             scan_workers=getattr(ich_importer_config, 'SCAN_WORKERS', DEFAULT_SCAN_WORKERS),
+                             scan_queue_size=getattr(ich_importer_config, 'SCAN_QUEUE_SIZE',
+                                                     DEFAULT_SCAN_QUEUE_SIZE))
 
         self.full_import = full_import
 
@@ -69,7 +75,10 @@ class IchthyologyImporter(Importer):
         return f'{number}', collection
 
     def build_filename_map(self, full_path):
+        if self.is_unchanged_in_manifest(full_path):
+            return
         if not self.check_for_valid_image(full_path):
+            self.record_manifest_outcome(full_path, REJECTED)
             return
         filename = os.path.basename(full_path)
 
@@ -88,20 +97,39 @@ class IchthyologyImporter(Importer):
             self.catalog_number_map[final_number].append(full_path)
 
     def process_loaded_files(self):
+        # resolve every catalog number up front instead of one query per number
+        self.collection_object_ids = self.get_collection_object_ids(self.catalog_number_map.keys())
+        # and check every file against the image db in bulk instead of per catalog number
+        self.prefetch_imagedb_imported_filenames([filepath for filepaths in self.catalog_number_map.values()
+                                                  for filepath in filepaths])
+        prepared = []
         for catalog_number in self.catalog_number_map.keys():
             filepath_list = []
 
             for cur_filepath in self.catalog_number_map[catalog_number]:
                 filepath_list.append(cur_filepath)
-            self.process_catalog_number(catalog_number, filepath_list)
+            import_args = self.prepare_catalog_number(catalog_number, filepath_list)
+            if import_args is not None:
+                prepared.append(import_args)
+        # with every catalog number filtered first, conversions can run ahead of the uploads
+        self.import_prepared(prepared)
 
     def process_catalog_number(self, catalog_number, filepath_list):
+        import_args = self.prepare_catalog_number(catalog_number, filepath_list)
+        if import_args is not None:
+            self.import_to_imagedb_and_specify(**import_args)
+
+    def prepare_catalog_number(self, catalog_number, filepath_list):
+        """filters a catalog number's files; returns the import_to_imagedb_and_specify arguments
+           for the ones left to import, or None if there is nothing to import"""
         if catalog_number is None:
             print(f"No catalog number; skipping")
             return
         print(f"Catalog number: {catalog_number}")
-        sql = f"select collectionobjectid  from collectionobject where catalognumber='{catalog_number}'"
-        collection_object_id = self.specify_db_connection.get_one_record(sql)
+        if catalog_number in self.collection_object_ids:
+            collection_object_id = self.collection_object_ids[catalog_number]
+        else:
+            collection_object_id = self.get_collection_object_ids([catalog_number])[catalog_number]
         if collection_object_id is None:
             print(f"No record found for catalog number {catalog_number}, skipping.")
             return
@@ -109,11 +137,11 @@ class IchthyologyImporter(Importer):
         filepath_list = self.remove_imagedb_imported_filenames_from_list(filepath_list)
         filepath_list = self.clean_duplicate_image_barcodes(filepath_list)
         # TODO: hardcoded user ID
-        self.import_to_imagedb_and_specify(filepath_list=filepath_list,
-                                           collection_object_id=collection_object_id,
-                                           agent_id=68835,
-                                           skip_redacted_check=True,
-                                           id=catalog_number)
+        return dict(filepath_list=filepath_list,
+                    collection_object_id=collection_object_id,
+                    agent_id=68835,
+                    skip_redacted_check=True,
+                    id=catalog_number)
 
 #         If I find a .jpg, import it.
 # If I find a .tif, see if there’s already a corresponding .jpg imported. If not,
@@ -1,6 +1,9 @@
 import json
+import hashlib
 
 import requests, hmac
+from requests.adapters import HTTPAdapter
+import threading
 import time
 import sys
 import server_host_settings
@@ -15,6 +18,13 @@ from urllib.parse import quote
 
 TIME_FORMAT = "%Y-%m-%d %H:%M:%S%z"
 
+# defaults for the keep-alive connection pool, overridable per collection config
+DEFAULT_HTTP_POOL_CONNECTIONS = 4
+DEFAULT_HTTP_POOL_MAXSIZE = 10
+
+# number of filenames sent per bulk "already imported?" request
+DEFAULT_BULK_LOOKUP_CHUNK_SIZE = 500
+
 
 class UploadFailureException(Exception):
     pass
@@ -37,8 +47,12 @@ class ImageClient:
         self.logger = logging.getLogger(f'Client.{self.__class__.__name__}')
 
         self.ptc_timezone = timezone(timedelta(hours=-8), name="PST")
-        self.update_time_delta()
         self.config = config
+        self.session = None
+        self.session_lock = threading.Lock()
+        # flips to False the first time the server shows it has no bulk lookup route
+        self.bulk_lookup_supported = True
+        self.update_time_delta()
 
         if config.MAILING_LIST:
             if hasattr(config, 'ACTIVE_REPORT_PATH'):
@@ -54,6 +68,33 @@ class ImageClient:
 
             self.monitoring_tools = MonitoringTools(config=config, report_path=report_path, active=active)
 
+    def get_session(self):
+        """Returns the shared keep-alive session, creating it on first use.
+
+        HTTP_POOL_CONNECTIONS is the number of hosts whose pools are kept and HTTP_POOL_MAXSIZE
+        is the connection limit per host. The pool blocks when a host's limit is reached, so
+        concurrent importers sharing this client never open more than that many sockets.
+        """
+        if self.session is None:
+            with self.session_lock:
+                if self.session is None:
+                    pool_connections = getattr(self.config, 'HTTP_POOL_CONNECTIONS', DEFAULT_HTTP_POOL_CONNECTIONS)
+                    pool_maxsize = getattr(self.config, 'HTTP_POOL_MAXSIZE', DEFAULT_HTTP_POOL_MAXSIZE)
+                    adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize,
+                                          pool_block=True)
+                    session = requests.Session()
+                    session.mount('http://', adapter)
+                    session.mount('https://', adapter)
+                    self.session = session
+        return self.session
+
+    def close(self):
+        """closes the pooled connections held by this client"""
+        with self.session_lock:
+            if self.session is not None:
+                self.session.close()
+                self.session = None
+
     def request_with_retries(self, method, url, params=None, data=None, json=None, files=None,
                              max_duration=10800, retry_interval=0):
         """
@@ -99,9 +140,9 @@ class ImageClient:
 
             try:
                 if method.upper() == "GET":
-                    r = requests.get(url, params=params, timeout=10)
+                    r = self.get_session().get(url, params=params, timeout=10)
                 elif method.upper() == "POST":
-                    r = requests.post(url, data=data, json=json, files=new_files, timeout=10)
+                    r = self.get_session().post(url, data=data, json=json, files=new_files, timeout=10)
                 else:
                     self.logger.error(f"Unsupported HTTP method: {method}. Exiting.")
                     return None  # Break the loop immediately if method is invalid
@@ -146,7 +187,7 @@ class ImageClient:
                 'token': self.generate_token(data['store'])
             }
             delete_url = self.build_url("filedelete")
-            delete_response = requests.post(url=delete_url, data=delete_data)
+            delete_response = self.get_session().post(url=delete_url, data=delete_data, timeout=10)
 
             if delete_response.status_code == 200:
                 self.logger.info(f"File deleted at {data['store']}")
@@ -214,12 +255,13 @@ class ImageClient:
             print(f"Deletion failed, aborted: {r.status_code}:{r.text}")
             raise DeleteFailureException
 
-    def get_internal_filename(self, original_path, collection, return_list=False):
-        """Retrieve the internal filename from the server based on the original file path."""
+    def get_internal_filename(self, original_path, collection, return_list=False, search_type='path'):
+        """Retrieve the internal filename from the server based on the original file path
+           (or, with search_type='md5', on the md5 of the original file)."""
         params = {
             'file_string': quote(original_path),
             'coll': collection,
-            'search_type': 'path',  # Query by file path
+            'search_type': search_type,  # Query by file path
             'token': self.generate_token(quote(original_path))
         }
 
@@ -246,7 +288,7 @@ class ImageClient:
         return None
 
 
-    def upload_to_image_server(self, full_path, redacted, collection, original_path=None, id=None):
+    def upload_to_image_server(self, full_path, redacted, collection, original_path=None, id=None, orig_md5=None):
         if full_path is None or redacted is None or collection is None:
             errstring = f"Bad input failures to upload to image server: {full_path} {redacted} {collection}"
             print(errstring, file=sys.stderr, flush=True)
@@ -271,6 +313,9 @@ class ImageClient:
             'notes': None,
             'datetime': datetime_now.strftime(TIME_FORMAT)
         }
+        if orig_md5 is not None:
+            # md5 of the file as scanned, before any conversion; lets later runs find duplicates
+            data['orig_md5'] = orig_md5
 
         url = self.build_url("fileupload")
         self.logger.debug(f"Attempting upload of local converted file {local_filename} to {url}")
@@ -328,6 +373,88 @@ class ImageClient:
 
         return self.decode_response(params)
 
+    def check_image_db_if_filenames_imported(self, collection, filenames, exact=True, search_type='filename',
+                                             chunk_size=None, per_file_fallback=True):
+        """Bulk version of check_image_db_if_filename_imported.
+
+        Sends the names (or paths, with search_type='path') to the getImageRecordsBulk route in
+        chunks and returns the set of those already in the image db. Servers without the bulk
+        route answer 405, or 404 without a JSON list; the client then remembers that and checks
+        one file at a time, or returns None with per_file_fallback=False, for callers that would
+        rather check lazily.
+        """
+        if chunk_size is None:
+            chunk_size = getattr(self.config, 'BULK_LOOKUP_CHUNK_SIZE', DEFAULT_BULK_LOOKUP_CHUNK_SIZE)
+        unique_filenames = list(dict.fromkeys(filenames))
+        imported = set()
+
+        for start in range(0, len(unique_filenames), chunk_size):
+            chunk = unique_filenames[start:start + chunk_size]
+            found = None
+            if self.bulk_lookup_supported:
+                found = self._bulk_lookup_chunk(collection, chunk, exact, search_type)
+            if found is None and not per_file_fallback and not self.bulk_lookup_supported:
+                return None
+            if found is None:
+                found = {filename for filename in chunk
+                         if self._check_single_imported(collection, filename, exact, search_type)}
+            imported.update(found)
+
+        return imported
+
+    def _check_single_imported(self, collection, filename, exact, search_type):
+        if search_type == 'filename':
+            return self.check_image_db_if_filename_imported(collection, filename, exact=exact)
+        params = {
+            'file_string': quote(filename),
+            'coll': collection,
+            'exact': exact,
+            'search_type': search_type,
+            'token': self.generate_token(quote(filename))
+        }
+        return self.decode_response(params)
+
+    def _bulk_lookup_chunk(self, collection, chunk, exact, search_type):
+        """returns the imported subset of chunk, or None if the server can't answer in bulk"""
+        quoted = {quote(filename): filename for filename in chunk}
+        # the token is signed over a digest of the whole chunk rather than a single filename
+        digest = hashlib.md5("\n".join(quoted.keys()).encode()).hexdigest()
+        data = {
+            'file_string': digest,
+            'file_strings': json.dumps(list(quoted.keys())),
+            'coll': collection,
+            'exact': exact,
+            'search_type': search_type,
+            'token': self.generate_token(digest)
+        }
+        r = self.request_with_retries(url=self.build_url("getImageRecordsBulk"), data=data, method="POST")
+        if r is None:
+            self.logger.error(f"Bulk lookup of {len(chunk)} files failed, checking one at a time")
+            return None
+        # like getImageRecord, the route may answer 404 when none of the files are imported;
+        # only a 405 or a 404 without a JSON list means the route itself is missing
+        body = self._json_list(r) if r.status_code in (200, 404) else None
+        if r.status_code == 405 or (r.status_code == 404 and body is None):
+            self.logger.warning("Image server has no bulk lookup route, checking one file at a time")
+            self.bulk_lookup_supported = False
+            return None
+        if body is None:
+            self.logger.error(f"Bulk lookup failed: {r.status_code}:{r.text}, checking one at a time")
+            return None
+
+        found = {quoted.get(name, name) for name in body}
+        self.logger.debug(f"Bulk checked {len(chunk)} files - {len(found)} already imported")
+        return found
+
+    @staticmethod
+    def _json_list(response):
+        """the response body as a list, or None if it isn't a JSON list"""
+        try:
+            body = response.json()
+        except ValueError:
+            return None
+        return body if isinstance(body, list) else None
+
     def write_exif_image_metadata(self, exif_dict, collection, filename):
 
         data = {'filename': filename,
@@ -0,0 +1,399 @@
+"""Docstring: conversion backends used by Importer.convert_to_jpg to turn TIFF and DNG
+   originals into the jpgs that are uploaded to the image server.
+"""
+import collections
+import logging
+import multiprocessing
+import os
+import shutil
+import subprocess
+import threading
+import struct
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from PIL import Image, ImageSequence, UnidentifiedImageError
+
+JPG_QUALITY = 99
+
+# tiff tags that describe the file layout, or metadata carried separately, rather than the picture;
+# they are not copied into the jpg's EXIF
+TIFF_LAYOUT_TAGS = {254, 255, 256, 257, 258, 259, 262, 266, 273, 277, 278, 279, 284, 317, 320, 322, 323, 324,
+                    325, 338, 339, 340, 341, 530, 532, 700, 33723, 34377, 34665, 34675, 34853}
+EXIF_IFD = 0x8769
+GPS_IFD = 0x8825
+TIFF_XMP_TAG = 700
+ORIENTATION_TAG = 0x0112
+# transposes that reverse the one Pillow applies on load for each EXIF orientation
+UNDO_ORIENTATION = {
+    2: Image.Transpose.FLIP_LEFT_RIGHT,
+    3: Image.Transpose.ROTATE_180,
+    4: Image.Transpose.FLIP_TOP_BOTTOM,
+    5: Image.Transpose.TRANSPOSE,
+    6: Image.Transpose.ROTATE_90,
+    7: Image.Transpose.TRANSVERSE,
+    8: Image.Transpose.ROTATE_270,
+}
+TIFF_IPTC_TAG = 33723
+
+_pixel_limit_lock = threading.Lock()
+_pixel_limit_users = 0
+_saved_pixel_limit = None
+
+
+@contextmanager
+def unlimited_image_pixels():
+    """lifts Pillow's decompression bomb limit while a conversion reads its source.
+       Scans are trusted local files and routinely exceed it; everywhere else the limit stays."""
+    global _pixel_limit_users, _saved_pixel_limit
+    with _pixel_limit_lock:
+        if _pixel_limit_users == 0:
+            _saved_pixel_limit = Image.MAX_IMAGE_PIXELS
+            Image.MAX_IMAGE_PIXELS = None
+        _pixel_limit_users += 1
+    try:
+        yield
+    finally:
+        with _pixel_limit_lock:
+            _pixel_limit_users -= 1
+            if _pixel_limit_users == 0:
+                Image.MAX_IMAGE_PIXELS = _saved_pixel_limit
+
+
+class ConvertException(Exception):
+    pass
+
+
+class SubprocessConversionBackend:
+    """converts with ImageMagick's `convert`, one process per file."""
+    name = 'imagemagick'
+
+    def __init__(self):
+        self.logger = logging.getLogger(f'Client.{self.__class__.__name__}')
+
+    def convert(self, source_path, jpg_dest):
+        """writes the largest page of source_path to jpg_dest, returns convert's stdout"""
+        work_dir = os.path.dirname(jpg_dest)
+        proc = subprocess.Popen(['convert', '-quality', str(JPG_QUALITY), source_path, jpg_dest],
+                                stdout=subprocess.PIPE)
+        output = proc.communicate(timeout=60)[0]
+
+        # multi-page tiffs come out as name-0.jpg, name-1.jpg ...; keep the largest
+        only_files = [f for f in os.listdir(work_dir) if os.path.isfile(os.path.join(work_dir, f))]
+        if len(only_files) == 0:
+            raise ConvertException(f"No files produced from conversion")
+        if len(only_files) > 2:
+            self.logger.info("multi-file case")
+        sizes = {f: os.path.getsize(os.path.join(work_dir, f)) for f in only_files}
+        top = max(sizes, key=sizes.get)
+        os.replace(os.path.join(work_dir, top), jpg_dest)
+        for file in only_files:
+            if file != top and os.path.exists(os.path.join(work_dir, file)):
+                os.remove(os.path.join(work_dir, file))
+        return output
+
+
+class PillowConversionBackend:
+    """converts in-process with Pillow; multi-page tiffs are reduced to their largest frame."""
+    name = 'pillow'
+
+    def __init__(self):
+        self.logger = logging.getLogger(f'Client.{self.__class__.__name__}')
+
+    @staticmethod
+    def largest_frame_index(image):
+        """returns the index of the frame with the largest pixel area"""
+        best_index = 0
+        best_area = -1
+        for index, frame in enumerate(ImageSequence.Iterator(image)):
+            area = frame.size[0] * frame.size[1]
+            if area > best_area:
+                best_index = index
+                best_area = area
+        return best_index
+
+    @staticmethod
+    def to_jpg_mode(frame):
+        if frame.mode in ('RGB', 'L', 'CMYK'):
+            return frame
+        if frame.mode in ('I;16', 'I;16B', 'I;16L', 'I'):
+            # scale 16 bit greyscale down to 8 bit the way ImageMagick does
+            return frame.convert('I').point(lambda value: value * (1 / 256)).convert('L')
+        if frame.mode in ('RGBA', 'LA', 'PA') or (frame.mode == 'P' and 'transparency' in frame.info):
+            # flatten onto white, matching ImageMagick's default background
+            rgba = frame.convert('RGBA')
+            background = Image.new('RGB', rgba.size, (255, 255, 255))
+            background.paste(rgba, mask=rgba.getchannel('A'))
+            return background
+        return frame.convert('RGB')
+
+    @staticmethod
+    def jpg_exif(source_exif):
+        """the source's EXIF without the tiff layout tags, with its Exif and GPS sub-IFDs"""
+        exif = Image.Exif()
+        for tag, value in source_exif.items():
+            if tag not in TIFF_LAYOUT_TAGS:
+                exif[tag] = value
+        for ifd in (EXIF_IFD, GPS_IFD):
+            sub_ifd = source_exif.get_ifd(ifd)
+            if sub_ifd:
+                exif.get_ifd(ifd).update(sub_ifd)
+        return exif
+
+    @staticmethod
+    def iptc_segment(iptc):
+        """an APP13 Photoshop segment holding raw IPTC data, the way ImageMagick writes it"""
+        if isinstance(iptc, (tuple, list)):
+            iptc = b"".join(struct.pack(">L", value) for value in iptc)
+        if len(iptc) % 2:
+            iptc += b"\x00"
+        # 8BIM resource 0x0404 with an empty, padded name
+        payload = b"Photoshop 3.0\x00" + b"8BIM\x04\x04\x00\x00" + struct.pack(">L", len(iptc)) + iptc
+        return b"\xff\xed" + struct.pack(">H", len(payload) + 2) + payload
+
+    def metadata_save_args(self, image):
+        """save() arguments carrying the current frame's ICC profile, EXIF (incl. Orientation), XMP
+           and IPTC, as `convert` does. Call before the frame is loaded, while Orientation is still set."""
+        save_args = {}
+        icc_profile = image.info.get('icc_profile')
+        if icc_profile:
+            save_args['icc_profile'] = icc_profile
+        source_exif = image.getexif()
+        exif = self.jpg_exif(source_exif)
+        if len(exif) or exif.get_ifd(EXIF_IFD) or exif.get_ifd(GPS_IFD):
+            save_args['exif'] = exif
+        xmp = image.info.get('xmp') or source_exif.get(TIFF_XMP_TAG)
+        if xmp:
+            save_args['xmp'] = xmp.encode('utf-8') if isinstance(xmp, str) else xmp
+        iptc = source_exif.get(TIFF_IPTC_TAG)
+        if iptc:
+            save_args['extra'] = self.iptc_segment(iptc)
+        return save_args
+
+    def convert(self, source_path, jpg_dest):
+        try:
+            with unlimited_image_pixels(), Image.open(source_path) as image:
+                n_frames = getattr(image, 'n_frames', 1)
+                if n_frames > 1:
+                    self.logger.info(f"multi-page case: {n_frames} frames in {source_path}")
+                image.seek(self.largest_frame_index(image))
+                metadata = self.metadata_save_args(image)
+                orientation = image.getexif().get(ORIENTATION_TAG)
+                frame = image.copy()
+                if orientation in UNDO_ORIENTATION and image.getexif().get(ORIENTATION_TAG) is None:
+                    # Pillow turned the pixels upright on load; store them as the file does, like
+                    # `convert`, so the copied Orientation tag still applies
+                    frame = frame.transpose(UNDO_ORIENTATION[orientation])
+        except (UnidentifiedImageError, OSError) as e:
+            raise ConvertException(f"Pillow can't read {source_path}: {e}") from e
+
+        save_args = {'quality': JPG_QUALITY, 'subsampling': 0, **metadata}
+        try:
+            self.to_jpg_mode(frame).save(jpg_dest, 'JPEG', **save_args)
+        except (OSError, ValueError) as e:
+            raise ConvertException(f"Pillow can't write {jpg_dest}: {e}") from e
+        return b""
+
+
+class ImageConverter:
+    """Picks a conversion backend per file.
+
+    DNG is first developed to a tiff by darktable-cli, which stays a subprocess. The tiff then
+    goes through the configured backend like any other. If the Pillow backend can't handle a
+    file and ImageMagick is installed, the file is retried with ImageMagick.
+    """
+    backends = {
+        PillowConversionBackend.name: PillowConversionBackend,
+        SubprocessConversionBackend.name: SubprocessConversionBackend,
+    }
+
+    def __init__(self, backend_name='pillow'):
+        self.logger = logging.getLogger(f'Client.{self.__class__.__name__}')
+        if backend_name not in self.backends:
+            raise ValueError(f"Unknown conversion backend {backend_name}, "
+                             f"choose from {list(self.backends.keys())}")
+        self.backend = self.backends[backend_name]()
+        self.fallback = None
+        if backend_name != SubprocessConversionBackend.name and shutil.which('convert'):
+            self.fallback = SubprocessConversionBackend()
+
+    def convert_dng_to_tiff(self, source_path, target_path):
+        proc = subprocess.Popen(['darktable-cli', '--import', source_path, target_path],
+                                stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        output, error = proc.communicate(timeout=60)
+        if proc.returncode != 0:
+            self.logger.error(f"Error in converting {source_path} to {target_path}: {error.decode('utf-8')}")
+            raise ConvertException(f"Error in converting {source_path} to {target_path}")
+
+    def convert(self, source_path, jpg_dest, extension):
+        """converts source_path to jpg_dest. jpg_dest's folder must hold nothing else,
+           since the ImageMagick backend looks there for multi-page output."""
+        temp_tiff_path = None
+        if extension == 'dng':
+            # next to jpg_dest's folder rather than in it, so it is never mistaken for output
+            temp_tiff_path = os.path.dirname(jpg_dest) + "_temp.tif"
+            self.convert_dng_to_tiff(source_path, temp_tiff_path)
+            source_path = temp_tiff_path
+        try:
+            try:
+                return self.backend.convert(source_path, jpg_dest)
+            except ConvertException as e:
+                if self.fallback is None:
+                    raise
+                self.logger.warning(f"{e}; retrying with {self.fallback.name}")
+                if os.path.exists(jpg_dest):
+                    os.remove(jpg_dest)
+                return self.fallback.convert(source_path, jpg_dest)
+        finally:
+            if temp_tiff_path is not None and os.path.exists(temp_tiff_path):
+                os.remove(temp_tiff_path)
+
+
+# one converter per pool process, built on first use
+_process_converter = None
+
+
+def convert_in_process(backend_name, source_path, jpg_dest, extension):
+    """ProcessPoolExecutor entry point for ConversionStage"""
+    global _process_converter
+    if _process_converter is None or _process_converter.backend.name != backend_name:
+        _process_converter = ImageConverter(backend_name)
+    return _process_converter.convert(source_path, jpg_dest, extension)
+
+
+class ConversionStage:
+    """Converts files on a process pool ahead of the uploader.
+
+    Files are queued with submit() and handed to the pool while the bytes reserved in the
+    temp folder stay under budget_bytes. A queued file reserves its source size, or 4x for a
+    dng to cover the intermediate tiff. Once converted it holds the jpg's real size until
+    release() is called after upload, or discard() for a file that won't be uploaded. A single
+    file larger than the budget still goes through when nothing else is reserved, so the queue
+    can't stall. jpg_dest's folder is only created once the file's conversion starts.
+    """
+    DNG_RESERVE_FACTOR = 4
+
+    def __init__(self, backend_name, workers, budget_bytes):
+        self.logger = logging.getLogger(f'Client.{self.__class__.__name__}')
+        self.backend_name = backend_name
+        self.workers = workers
+        self.budget_bytes = budget_bytes
+        self.reserved_bytes = 0
+        self.queued = collections.OrderedDict()
+        self.running = {}
+        # converting files nobody will collect; dropped as soon as they finish
+        self.discarded = set()
+        # re-entrant: add_done_callback runs the callback inline when the future is already done
+        self.lock = threading.RLock()
+        self.executor = None
+
+    def submit(self, source_path, jpg_dest, extension):
+        with self.lock:
+            if source_path in self.queued or source_path in self.running:
+                return
+            try:
+                reserve = os.path.getsize(source_path)
+            except OSError:
+                return
+            if extension == 'dng':
+                reserve *= self.DNG_RESERVE_FACTOR
+            self.queued[source_path] = (jpg_dest, extension, reserve)
+            self._start_queued()
+
+    def _start_queued(self):
+        # caller holds self.lock
+        while self.queued:
+            source_path, (jpg_dest, extension, reserve) = next(iter(self.queued.items()))
+            if self.reserved_bytes + reserve > self.budget_bytes and self.reserved_bytes > 0:
+                return
+            del self.queued[source_path]
+            if self.executor is None:
+                self.executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                    mp_context=multiprocessing.get_context('spawn'))
+            self.reserved_bytes += reserve
+            os.makedirs(os.path.dirname(jpg_dest), exist_ok=True)
+            future = self.executor.submit(convert_in_process, self.backend_name, source_path, jpg_dest, extension)
+            self.running[source_path] = [future, jpg_dest, reserve]
+            future.add_done_callback(lambda done, path=source_path: self._conversion_done(path))
+
+    def _conversion_done(self, source_path):
+        with self.lock:
+            entry = self.running.get(source_path)
+            if entry is None:
+                return
+            future, jpg_dest, reserve = entry
+            if future.cancelled() or source_path in self.discarded:
+                self._drop(source_path)
+                return
+            # swap the estimate for what the jpg really takes
+            actual = os.path.getsize(jpg_dest) if not future.exception() and os.path.exists(jpg_dest) else 0
+            self.reserved_bytes += actual - reserve
+            entry[2] = actual
+            self._start_queued()
+
+    def result(self, source_path):
+        """Returns (jpg_dest, output) for a file that went to the pool, waiting if needed.
+        Returns None if the file was never submitted or is still queued; the caller then
+        converts it inline. Conversion errors are re-raised here."""
+        with self.lock:
+            if source_path in self.queued:
+                del self.queued[source_path]
+                return None
+            entry = self.running.get(source_path)
+        if entry is None:
+            return None
+        future, jpg_dest, _ = entry
+        try:
+            output = future.result()
+        except Exception:
+            self.discard(source_path)
+            raise
+        return jpg_dest, output
+
+    def release(self, source_path):
+        """returns a file's reservation to the budget once its jpg is gone"""
+        with self.lock:
+            entry = self.running.pop(source_path, None)
+            if entry is not None:
+                self.reserved_bytes -= entry[2]
+            self.queued.pop(source_path, None)
+            self._start_queued()
+
+    def discard(self, source_path):
+        """Drops a file that won't be uploaded. A queued file is forgotten; a converting one is
+        cancelled, or removed with its jpg once done, and its reservation goes back to the budget."""
+        with self.lock:
+            self.queued.pop(source_path, None)
+            entry = self.running.get(source_path)
+            if entry is None:
+                return
+            future = entry[0]
+            if future.cancel():
+                # the done callback has dropped it already
+                return
+            if future.done():
+                self._drop(source_path)
+            else:
+                self.discarded.add(source_path)
+
+    def _drop(self, source_path):
+        # caller holds self.lock
+        self.discarded.discard(source_path)
+        entry = self.running.pop(source_path, None)
+        if entry is None:
+            return
+        future, jpg_dest, reserved = entry
+        self.reserved_bytes -= reserved
+        if os.path.exists(jpg_dest):
+            os.remove(jpg_dest)
+        work_dir = os.path.dirname(jpg_dest)
+        if os.path.isdir(work_dir) and not os.listdir(work_dir):
+            os.rmdir(work_dir)
+        self._start_queued()
+
+    def shutdown(self):
+        with self.lock:
+            self.queued.clear()
+            executor = self.executor
+            self.executor = None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
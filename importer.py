@@ -3,15 +3,12 @@ import datetime
 from uuid import uuid4
 import os, re
 from image_client import ImageClient
-from db_utils import InvalidFilenameError
+from db_utils import InvalidFilenameError, run_in_transaction
 import collections
-import filetype
 import logging
 import subprocess
 from specify_db import SpecifyDb
 import shutil
-from os import listdir
-from os.path import isfile, join
 import traceback
 import hashlib
 from image_client import DuplicateImageException
@@ -19,11 +16,24 @@ from specify_constants import SpecifyConstants
 import atexit
 from image_client import UploadFailureException
 import time
+from concurrent.futures import ThreadPoolExecutor
 from image_client import FileNotFoundException, DeleteFailureException
+from image_conversion import ImageConverter, ConversionStage, ConvertException
+from file_manifest import FileManifest, IMPORTED, REJECTED
+from outcome_log import OutcomeLog
+from file_classifier import FileClassifier
 
 
-class ConvertException(Exception):
-    pass
+# catalog numbers per IN (...) query when resolving CollectionObjectIDs
+DEFAULT_CATALOG_LOOKUP_CHUNK_SIZE = 1000
+# filepaths per IN (...) query when looking up existing attachment links
+DEFAULT_ATTACHMENT_LOOKUP_CHUNK_SIZE = 500
+
+OUTCOME_LOG_COLUMNS = ('outcome', 'filename', 'path')
+
+# bytes read per update when hashing; large reads let hashlib run without the GIL
+HASH_CHUNK_SIZE = 1024 * 1024
+DEFAULT_HASH_WORKERS = 4
 
 
 class TooSmallException(Exception):
@@ -35,6 +45,11 @@ class MissingPathException(Exception):
 
 
 class Importer:
+    # IMAGE_SUFFIX may match anywhere in a name rather than only at its start
+    image_suffix_anywhere = False
+    # reject rules written in code rather than config; change the entry when a rule changes,
+    # so files the manifest recorded as rejected under the old rule are checked again
+    manifest_reject_rules = ()
 
     def __init__(self, db_config_class, collection_name):
         self.db_config_class = db_config_class
@@ -44,8 +59,47 @@ class Importer:
         self.specify_db_connection = SpecifyDb(db_config_class)
         self.image_client = ImageClient(config=db_config_class)
         self.attachment_utils = AttachmentUtils(self.specify_db_connection)
+        self.file_classifier = FileClassifier.from_config(db_config_class, match_anywhere=self.image_suffix_anywhere)
+        self.manifest_rules = hashlib.md5(repr((self.file_classifier.rules(),
+                                                self.manifest_reject_rules)).encode()).hexdigest()[:12]
         self.duplicates_file = open(f'duplicates-{self.collection_name}.txt', 'w')
         self.TMP_JPG = f"./tmp_jpg_{str(uuid4())}"
+        conversion_backend = getattr(db_config_class, 'CONVERSION_BACKEND', 'pillow')
+        self.image_converter = ImageConverter(conversion_backend)
+        # optional process pool that converts tiff/dng ahead of the uploader
+        self.conversion_stage = None
+        conversion_workers = getattr(db_config_class, 'CONVERSION_WORKERS', 0)
+        if conversion_workers:
+            budget_mb = getattr(db_config_class, 'CONVERSION_TEMP_BUDGET_MB', 2048)
+            self.conversion_stage = ConversionStage(conversion_backend, conversion_workers,
+                                                    budget_mb * 1024 * 1024)
+        # number of concurrent import workers; 1 keeps the original sequential behaviour
+        self.import_workers = max(1, int(getattr(db_config_class, 'IMPORT_WORKERS', 1) or 1))
+        self.import_executor = None
+        self.pending_imports = []
+        # optional record of unchanged files that earlier runs already imported or rejected
+        self.manifest = None
+        # (casefolded OrigFilename, CollectionObjectID) links loaded by prefetch_specify_linked_filepaths
+        self.specify_links = set()
+        self.specify_link_paths = set()
+        # image db names loaded by prefetch_imagedb_imported_filenames, and the subset already imported
+        self.imagedb_checked_names = set()
+        self.imagedb_imported_names = set()
+        manifest_path = getattr(db_config_class, 'MANIFEST_PATH', None)
+        if manifest_path:
+            self.manifest = FileManifest(manifest_path)
+        # optional content-hash dedupe: files whose md5 is already in the image db are linked, not uploaded
+        self.dedupe_by_md5 = bool(getattr(db_config_class, 'DEDUPE_BY_MD5', False))
+        self.hash_workers = max(1, int(getattr(db_config_class, 'HASH_WORKERS', DEFAULT_HASH_WORKERS) or 1))
+        self.file_md5s = {}
+        # md5s already looked up in the image db, and the subset found there (or uploaded since)
+        self.imagedb_checked_md5s = set()
+        self.imagedb_known_md5s = set()
+        # optional buffered log of each file's final outcome
+        self.outcome_log = None
+        outcome_log_path = getattr(db_config_class, 'OUTCOME_LOG_PATH', None)
+        if outcome_log_path:
+            self.outcome_log = OutcomeLog.from_config(db_config_class, outcome_log_path, OUTCOME_LOG_COLUMNS)
         self.execute_at_exit()
 
     def split_filepath(self, filepath):
@@ -57,97 +111,192 @@ class Importer:
 
     def remove_tmp_jpg(self):
         """removes tmp folder after process termination"""
+        if self.conversion_stage is not None:
+            self.conversion_stage.shutdown()
         if os.path.exists(self.TMP_JPG):
             self.logger.info(f"Removing ./TMP folder at {self.TMP_JPG}")
             shutil.rmtree(self.TMP_JPG)
 
+    def close_manifest(self):
+        if self.manifest is not None:
+            self.manifest.close()
+
     def execute_at_exit(self):
         """executes any custom cleanup processes
            after importer exits with exit code."""
         atexit.register(self.remove_tmp_jpg)
+        atexit.register(self.close_manifest)
+        atexit.register(self.close_outcome_log)
+
+    def close_outcome_log(self):
+        if self.outcome_log is not None:
+            self.outcome_log.close()
+
+    def manifest_context(self, full_path):
+        """inputs besides the file itself that decide its outcome; collections add their own.
+           Includes a digest of the reject settings, so a config change re-checks rejected files."""
+        return self.manifest_rules
+
+    def is_unchanged_in_manifest(self, full_path):
+        """True if full_path was imported or rejected by an earlier run and hasn't changed since"""
+        if self.manifest is None:
+            return False
+        return self.manifest.should_skip(full_path, self.manifest_context(full_path))
+
+    def record_manifest_outcome(self, full_path, outcome):
+        if self.manifest is not None:
+            self.manifest.record(full_path, outcome, self.manifest_context(full_path))
+        if self.outcome_log is not None:
+            self.outcome_log.record((outcome, os.path.basename(full_path), full_path),
+                                    rejected=outcome == REJECTED)
 
     @staticmethod
     def get_file_md5(filename):
         with open(filename, 'rb') as f:
             md5_hash = hashlib.md5()
-            while chunk := f.read(8192):
+            while chunk := f.read(HASH_CHUNK_SIZE):
                 md5_hash.update(chunk)
         return md5_hash.hexdigest()
 
-    def _convert_dng_to_tiff(self, source_path, target_path):
-        proc = subprocess.Popen(['darktable-cli', '--import', source_path, target_path],
-                                stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        output, error = proc.communicate(timeout=60)
-        if proc.returncode != 0:
-            self.logger.error(f"Error in converting {source_path} to {target_path}: {error.decode('utf-8')}")
-            raise ConvertException(f"Error in converting {source_path} to {target_path}")
+    def _cached_file_md5(self, filepath):
+        stat_result = os.stat(filepath)
+        md5 = self.manifest.get_md5(filepath, stat_result) if self.manifest is not None else None
+        if md5 is None:
+            md5 = self.get_file_md5(filepath)
+            if self.manifest is not None:
+                self.manifest.record_md5(filepath, md5, stat_result)
+        return md5
+
+    def hash_files(self, filepath_list):
+        """{filepath: md5} for the readable files in the list, hashed HASH_WORKERS at a time.
+           With a manifest, unchanged files reuse the md5 recorded by an earlier run."""
+        pending = [filepath for filepath in dict.fromkeys(filepath_list) if filepath not in self.file_md5s]
+        if pending:
+            with ThreadPoolExecutor(max_workers=min(self.hash_workers, len(pending)),
+                                    thread_name_prefix="hash") as executor:
+                futures = {filepath: executor.submit(self._cached_file_md5, filepath) for filepath in pending}
+            for filepath, future in futures.items():
+                try:
+                    self.file_md5s[filepath] = future.result()
+                except OSError as e:
+                    self.logger.warning(f"Can't hash {filepath}: {e}")
+        return {filepath: self.file_md5s[filepath] for filepath in filepath_list if filepath in self.file_md5s}
+
+    def known_imagedb_md5s(self, md5s):
+        """the md5s that are in the image db. Each md5 is looked up once; upload_candidates checks
+           a whole batch, and link_md5_duplicates then reuses the answer."""
+        md5s = set(md5s)
+        unchecked = sorted(md5s - self.imagedb_checked_md5s)
+        if unchecked:
+            self.imagedb_known_md5s |= self.image_client.check_image_db_if_filenames_imported(
+                self.collection_name, unchecked, exact=True, search_type='md5')
+            self.imagedb_checked_md5s.update(unchecked)
+        return md5s & self.imagedb_known_md5s
+
+    def link_md5_duplicates(self, filepath_list, collection_object_id, agent_id):
+        """Dedupe stage run before upload when DEDUPE_BY_MD5 is set.
+
+        Files whose content is already in the image db (by orig_md5) get the existing attachment
+        linked to collection_object_id instead of being uploaded again, as do repeats of one file
+        within the list. Returns the filepaths that still need uploading.
+        """
+        if not self.dedupe_by_md5 or not filepath_list:
+            return filepath_list
+        hashes = self.hash_files(filepath_list)
+        known = self.known_imagedb_md5s(hashes.values())
+        keep_filepaths = []
+        seen = set()
+        for cur_filepath in filepath_list:
+            md5 = hashes.get(cur_filepath)
+            if md5 is None:
+                keep_filepaths.append(cur_filepath)
+                continue
+            if md5 in seen:
+                self.logger.info(f"Same content as an earlier file for {collection_object_id}, skipping: {cur_filepath}")
+                self.record_manifest_outcome(cur_filepath, IMPORTED)
+                continue
+            seen.add(md5)
+            if md5 not in known or not self._link_existing_md5(md5, cur_filepath, collection_object_id, agent_id):
+                keep_filepaths.append(cur_filepath)
+        return keep_filepaths
+
+    def _link_existing_md5(self, md5, cur_filepath, collection_object_id, agent_id):
+        internal_filename = self.image_client.get_internal_filename(md5, self.collection_name, search_type='md5')
+        if internal_filename is None:
+            return False
+
+        def link():
+            attachment_id = self.attachment_utils.get_attachmentid_from_attachment_location(internal_filename)
+            if attachment_id is not None and \
+                    not self.attachment_utils.is_attachment_linked(attachment_id, collection_object_id):
+                self.connect_existing_attachment_to_collection_object_id(attachment_id, collection_object_id,
+                                                                         agent_id)
+            return attachment_id
+
+        attachment_id = run_in_transaction(self.specify_db_connection, link)
+        if attachment_id is None:
+            self.logger.info(f"{cur_filepath} matches {internal_filename} in the image db, "
+                             f"but it has no attachment; uploading")
+            return False
+        self.logger.info(f"Linked existing attachment {attachment_id} with the same content as {cur_filepath}")
+        self.record_manifest_outcome(cur_filepath, IMPORTED)
+        return True
 
     def convert_to_jpg(self, image_filepath):
         basename = os.path.basename(image_filepath)
-        if not os.path.exists(self.TMP_JPG):
-            os.mkdir(self.TMP_JPG)
 
         file_name_no_extention, extention = self.split_filepath(basename)
         if extention not in ['tif', 'dng', 'tiff', 'jpeg']:
             self.logger.error(f"Bad filename, can't convert {image_filepath}")
             raise ConvertException(f"Bad filename, can't convert {image_filepath}")
 
-        if extention == 'dng':
-            temp_tiff_path = os.path.join('/tmp', file_name_no_extention + "_temp.tif")
-            self._convert_dng_to_tiff(image_filepath, temp_tiff_path)
-            image_filepath = temp_tiff_path
-
-        jpg_dest = os.path.join(self.TMP_JPG, file_name_no_extention + ".jpg")
-
-        proc = subprocess.Popen(['convert', '-quality', '99', image_filepath, jpg_dest],
-                                stdout=subprocess.PIPE)
-
-        output = proc.communicate(timeout=60)[0]
-        onlyfiles = [f for f in listdir(self.TMP_JPG) if isfile(join(self.TMP_JPG, f))]
-        if len(onlyfiles) == 0:
-            raise ConvertException(f"No files produced from conversion")
-        files_dict = {}
-        for file in onlyfiles:
-            files_dict[file] = os.path.getsize(os.path.join(self.TMP_JPG, file))
-        sort_orders = sorted(files_dict.items(), key=lambda x: x[1], reverse=True)
-        top = sort_orders[0][0]
-        target = os.path.join(self.TMP_JPG, file_name_no_extention + ".jpg")
-        os.rename(os.path.join(self.TMP_JPG, top), target)
-        if len(onlyfiles) > 2:
-            self.logger.info("multi-file case")
-
-        if extention == 'dng':
-            os.remove(temp_tiff_path)  # Remove the temporary TIFF file
+        target = self.new_conversion_target(file_name_no_extention)
+        output = self.image_converter.convert(image_filepath, target, extention)
 
         return target, output
 
+    def conversion_target(self, file_name_no_extention):
+        """jpg path for a conversion. Each conversion gets its own folder, so concurrent
+           conversions don't see each other's output and the jpg keeps the original's name."""
+        return os.path.join(self.TMP_JPG, str(uuid4()), file_name_no_extention + ".jpg")
+
+    def new_conversion_target(self, file_name_no_extention):
+        """conversion_target with its folder created"""
+        target = self.conversion_target(file_name_no_extention)
+        os.makedirs(os.path.dirname(target))
+        return target
+
+    def prefetch_conversions(self, filepath_list):
+        """Queues the files that need converting on the conversion stage, if one is configured.
+           Only queue files that are going to be uploaded; every queued file must end up either
+           converted by the upload (which releases it) or passed to discard_conversions."""
+        if self.conversion_stage is None:
+            return
+        for filepath in filepath_list:
+            file_name_no_extention, extention = self.split_filepath(filepath)
+            # same extensions convert_to_jpg accepts
+            if extention not in ['tif', 'dng', 'tiff']:
+                continue
+            # the stage creates the folder when the conversion starts
+            self.conversion_stage.submit(filepath, self.conversion_target(file_name_no_extention), extention)
+
+    def discard_conversions(self, filepath_list):
+        """drops queued or finished conversions the upload didn't use, freeing their temp space"""
+        if self.conversion_stage is None:
+            return
+        for filepath in filepath_list:
+            self.conversion_stage.discard(filepath)
+
     def get_mime_type(self, filepath):
-        mime_type = None
-        if filepath.lower().endswith('.tif') or filepath.lower().endswith('.tiff'):
-            mime_type = 'image/tiff'
-        if filepath.lower().endswith('.jpg') or filepath.lower().endswith('.jpeg'):
-            mime_type = 'image/jpeg'
-        if filepath.lower().endswith('.gif'):
-            mime_type = 'image/gif'
-        if filepath.lower().endswith('.png'):
-            mime_type = 'image/png'
-        if filepath.lower().endswith('.pdf'):
-            mime_type = 'application/pdf'
-        return mime_type
+        return self.file_classifier.mime_type(filepath)
 
     def connect_existing_attachment_to_collection_object_id(self,
                                                             attachment_id,
                                                             collection_object_id,
                                                             agent_id):
-        ordinal = self.attachment_utils.get_ordinal_for_collection_object_attachment(collection_object_id)
-        if ordinal is None:
-            ordinal = 0
-        else:
-            ordinal += 1
-        self.attachment_utils.create_collection_object_attachment(attachment_id,
-                                                                  collection_object_id,
-                                                                  ordinal,
-                                                                  agent_id)
+        self.attachment_utils.link_attachment_to_collection_object(attachment_id,
+                                                                   collection_object_id,
+                                                                   agent_id)
 
     def import_to_specify_database(self, filepath, attach_loc, collection_object_id, agent_id, properties):
 
@@ -157,7 +306,8 @@ class Importer:
 
         mime_type = self.get_mime_type(filepath)
 
-        self.attachment_utils.create_attachment(
+        return self.attachment_utils.create_attachment_for_collection_object(
+            collection_object_id=collection_object_id,
             attachment_location=attach_loc,
             original_filename=filepath,
             file_created_datetime=file_created_datetime,
@@ -167,11 +317,6 @@ class Importer:
             properties=properties
         )
 
-        #        attachment_id = self.attachment_utils.get_attachment_id(attachment_guid)
-        attachment_id = self.attachment_utils.get_attachment_id(str(attachment_guid))
-
-        self.connect_existing_attachment_to_collection_object_id(attachment_id, collection_object_id, agent_id)
-
     def get_first_digits_from_filepath(self, filepath, field_size=9):
         basename = os.path.basename(filepath)
         ints = re.findall(r'\d+', basename)
@@ -252,7 +397,13 @@ class Importer:
         if not jpg_found and valid_non_jpg_found:
             self.logger.debug(f"  Must create jpg for {filepath} from {valid_non_jpg_found}")
 
-            jpg_found, output = self.convert_to_jpg(valid_non_jpg_found)
+            prefetched = None
+            if self.conversion_stage is not None:
+                prefetched = self.conversion_stage.result(valid_non_jpg_found)
+            if prefetched is not None:
+                jpg_found, output = prefetched
+            else:
+                jpg_found, output = self.convert_to_jpg(valid_non_jpg_found)
             if not os.path.exists(jpg_found):
                 self.logger.error(f"  Conversion failure for {valid_non_jpg_found}; skipping.")
                 self.logger.debug(f"Imagemagik output: \n\n{output}\n\n")
@@ -261,11 +412,23 @@ class Importer:
 
         if jpg_found and os.path.getsize(jpg_found) < 1000:
             self.logger.info(f"This image is too small; {os.path.getsize(jpg_found)}, skipping.")
+            if deleteme is not None:
+                self.remove_converted_file(deleteme, filepath)
             raise TooSmallException
 
         return deleteme
 
-    import time
+    def remove_converted_file(self, converted_path, source_path=None):
+        """removes a converted jpg and its per-conversion folder inside TMP_JPG,
+           and returns its space to the conversion stage's budget"""
+        if os.path.exists(converted_path):
+            os.remove(converted_path)
+        work_dir = os.path.dirname(converted_path)
+        if os.path.abspath(work_dir) != os.path.abspath(self.TMP_JPG) and os.path.isdir(work_dir) \
+                and not os.listdir(work_dir):
+            os.rmdir(work_dir)
+        if self.conversion_stage is not None and source_path is not None:
+            self.conversion_stage.release(source_path)
 
     def upload_filepath_to_image_database(self, filepath, redacted=False, id=None):
         deleteme = self.convert_image_if_required(filepath)
@@ -278,65 +441,152 @@ class Importer:
         self.logger.debug(
             f"about to import to client:- {redacted}, {upload_me}, {self.collection_name}")
 
-        for attempt in range(2):  # Try twice
-            try:
-                url, attach_loc = self.image_client.upload_to_image_server(
-                    upload_me, redacted, self.collection_name, filepath, id=id
-                )
-                if deleteme is not None:
-                    os.remove(deleteme)
-                return (url, attach_loc)
-            except UploadFailureException as e:
-                self.logger.error(f"Upload attempt {attempt + 1} failed: {str(e)}")
-                last_exception = e  # Store the exception
-                time.sleep(10)  # Wait 10 seconds before retrying
-
-        # If the second attempt fails, re-throw the most recent exception
-        raise last_exception
-
-    def remove_specify_imported_and_id_linked_from_path(self, filepath_list, collection_object_id):
-        keep_filepaths = []
-        for cur_filepath in filepath_list:
-            sql = """
-                        SELECT at.AttachmentId
+        try:
+            for attempt in range(2):  # Try twice
+                try:
+                    url, attach_loc = self.image_client.upload_to_image_server(
+                        upload_me, redacted, self.collection_name, filepath, id=id,
+                        orig_md5=self.file_md5s.get(filepath)
+                    )
+                    return (url, attach_loc)
+                except UploadFailureException as e:
+                    self.logger.error(f"Upload attempt {attempt + 1} failed: {str(e)}")
+                    last_exception = e  # Store the exception
+                    time.sleep(10)  # Wait 10 seconds before retrying
+
+            # If the second attempt fails, re-throw the most recent exception
+            raise last_exception
+        finally:
+            # converted copies are dropped as soon as the upload is done with them
+            if deleteme is not None:
+                self.remove_converted_file(deleteme, filepath)
+
+    def get_collection_object_ids(self, catalog_numbers, chunk_size=None):
+        """Resolves catalog numbers to CollectionObjectIDs with chunked IN (...) queries.
+           Returns {catalog_number: CollectionObjectID} with None for numbers that have no record."""
+        if chunk_size is None:
+            chunk_size = getattr(self.db_config_class, 'CATALOG_LOOKUP_CHUNK_SIZE', DEFAULT_CATALOG_LOOKUP_CHUNK_SIZE)
+        unique_numbers = [number for number in dict.fromkeys(catalog_numbers) if number is not None]
+        resolved = dict.fromkeys(unique_numbers)
+        # the db collation is case insensitive, so map what comes back onto the keys we asked for
+        folded = {str(number).casefold().rstrip(): number for number in unique_numbers}
+        for start in range(0, len(unique_numbers), chunk_size):
+            chunk = unique_numbers[start:start + chunk_size]
+            placeholders = ", ".join(["%s"] * len(chunk))
+            sql = f"""SELECT CatalogNumber, CollectionObjectID FROM collectionobject
+                      WHERE CatalogNumber IN ({placeholders})"""
+            for catalog_number, collection_object_id in self.specify_db_connection.get_records(sql, chunk):
+                key = catalog_number if catalog_number in resolved else \
+                    folded.get(str(catalog_number).casefold().rstrip())
+                if key is not None and resolved[key] is None:
+                    resolved[key] = collection_object_id
+
+        missing = [number for number, collection_object_id in resolved.items() if collection_object_id is None]
+        if missing:
+            self.logger.warning(f"{len(missing)} of {len(resolved)} catalog numbers have no collection object")
+            self.logger.debug(f"Catalog numbers without a collection object: {missing}")
+        return resolved
+
+    def get_specify_linked_filepaths(self, filepath_list, collection_object_id=None, chunk_size=None):
+        """Returns the set of (casefolded OrigFilename, CollectionObjectID) attachment links for these
+           filepaths, optionally limited to one collection object, with chunked IN (...) queries."""
+        if chunk_size is None:
+            chunk_size = getattr(self.db_config_class, 'ATTACHMENT_LOOKUP_CHUNK_SIZE',
+                                 DEFAULT_ATTACHMENT_LOOKUP_CHUNK_SIZE)
+        unique_filepaths = [filepath for filepath in dict.fromkeys(filepath_list) if filepath is not None]
+        links = set()
+        for start in range(0, len(unique_filepaths), chunk_size):
+            chunk = unique_filepaths[start:start + chunk_size]
+            placeholders = ", ".join(["%s"] * len(chunk))
+            sql = f"""
+                        SELECT at.OrigFilename, cat.CollectionObjectID
                         FROM attachment AS at
                         JOIN collectionobjectattachment AS cat ON cat.AttachmentId = at.AttachmentId
-                        WHERE at.OrigFilename = %s AND cat.CollectionObjectID = %s
+                        WHERE at.OrigFilename IN ({placeholders})
                     """
-            params = (cur_filepath if cur_filepath is not None else None,
-                      collection_object_id if collection_object_id is not None else None)
+            params = list(chunk)
+            if collection_object_id is not None:
+                sql += " AND cat.CollectionObjectID = %s"
+                params.append(collection_object_id)
+            for orig_filename, linked_collection_object_id in \
+                    self.attachment_utils.db_utils.get_records(sql, params=params):
+                # the db collation is case insensitive
+                links.add((str(orig_filename).casefold(), linked_collection_object_id))
+        return links
+
+    def prefetch_specify_linked_filepaths(self, filepath_list):
+        """loads the attachment links of a whole batch of filepaths (across collection objects) so
+           remove_specify_imported_and_id_linked_from_path needs no query for them"""
+        self.specify_links = self.get_specify_linked_filepaths(filepath_list)
+        self.specify_link_paths = {filepath.casefold() for filepath in filepath_list if filepath is not None}
 
-            aid = self.attachment_utils.db_utils.get_one_record(sql, params=params)
+    def remove_specify_imported_and_id_linked_from_path(self, filepath_list, collection_object_id):
+        unfetched = [cur_filepath for cur_filepath in filepath_list
+                     if cur_filepath is not None and cur_filepath.casefold() not in self.specify_link_paths]
+        links = self.specify_links
+        if unfetched and collection_object_id is not None:
+            links = links | self.get_specify_linked_filepaths(unfetched, collection_object_id)
 
-            if aid is None:
+        keep_filepaths = []
+        for cur_filepath in filepath_list:
+            if cur_filepath is None or (cur_filepath.casefold(), collection_object_id) not in links:
                 keep_filepaths.append(cur_filepath)
             else:
-                logging.debug(f"Already has an attachment with attachment_id: {aid}, skipping")
+                logging.debug(f"Already has an attachment linked to {collection_object_id}: {cur_filepath}, skipping")
+                self.record_manifest_outcome(cur_filepath, IMPORTED)
         return keep_filepaths
 
-    #
     def remove_imagedb_imported_filepaths_from_list(self, filepath_list):
-        keep_filepaths = []
-        for cur_filepath in filepath_list:
-            if not self.image_client.check_image_db_if_filename_imported(self.collection_name,
-                                                                         cur_filepath,
-                                                                         exact=True):
-                keep_filepaths.append(cur_filepath)
-        return keep_filepaths
+        imported = self.image_client.check_image_db_if_filenames_imported(self.collection_name,
+                                                                          filepath_list,
+                                                                          exact=True)
+        for cur_filepath in imported:
+            self.record_manifest_outcome(cur_filepath, IMPORTED)
+        return [cur_filepath for cur_filepath in filepath_list if cur_filepath not in imported]
+
+    @staticmethod
+    def imagedb_jpg_name(filepath):
+        """the name a file is stored under in the image db once converted, or None if unparseable"""
+        try:
+            cur_file_base, cur_file_ext = os.path.basename(filepath).split(".")
+        except ValueError:
+            return None
+        return cur_file_base + ".jpg"
+
+    def prefetch_imagedb_imported_filenames(self, filepath_list):
+        """bulk-checks the image db names of a whole batch of filepaths (across collection objects)
+           so remove_imagedb_imported_filenames_from_list needs no request for them. Without the
+           bulk route nothing is prefetched, and each list is checked when it comes up."""
+        jpg_names = {self.imagedb_jpg_name(filepath) for filepath in filepath_list} - {None}
+        imported = self.image_client.check_image_db_if_filenames_imported(
+            self.collection_name, sorted(jpg_names), exact=True, per_file_fallback=False)
+        if imported is None:
+            self.imagedb_imported_names = set()
+            self.imagedb_checked_names = set()
+            return
+        self.imagedb_imported_names = imported
+        self.imagedb_checked_names = jpg_names
 
     def remove_imagedb_imported_filenames_from_list(self, filepath_list):
-        keep_filepaths = []
+        jpg_names = []
 
         for cur_filepath in filepath_list:
-            cur_filename = os.path.basename(cur_filepath)
-            try:
-                cur_file_base, cur_file_ext = cur_filename.split(".")
-            except ValueError as e:
-                self.logger.warning(f"Can't parse {cur_filename}, skipping.")
+            jpg_name = self.imagedb_jpg_name(cur_filepath)
+            if jpg_name is None:
+                self.logger.warning(f"Can't parse {os.path.basename(cur_filepath)}, skipping.")
                 continue
-            if not self.image_client.check_image_db_if_filename_imported(self.collection_name,
-                                                                         cur_file_base + ".jpg",
-                                                                         exact=True):
+            jpg_names.append((cur_filepath, jpg_name))
+
+        unchecked = [jpg_name for _, jpg_name in jpg_names if jpg_name not in self.imagedb_checked_names]
+        imported = self.imagedb_imported_names
+        if unchecked:
+            imported = imported | self.image_client.check_image_db_if_filenames_imported(self.collection_name,
+                                                                                        unchecked, exact=True)
+        keep_filepaths = []
+        for cur_filepath, jpg_name in jpg_names:
+            if jpg_name in imported:
+                self.record_manifest_outcome(cur_filepath, IMPORTED)
+            else:
                 keep_filepaths.append(cur_filepath)
         return keep_filepaths
 
@@ -344,6 +594,15 @@ class Importer:
     def import_single_file_to_image_db_and_specify(self, cur_filepath, collection_object_id, agent_id,
                                                    force_redacted, attachment_properties_map,
                                                    skip_redacted_check, id):
+        try:
+            return self._import_single_file(cur_filepath, collection_object_id, agent_id, force_redacted,
+                                            attachment_properties_map, skip_redacted_check, id)
+        finally:
+            # the upload releases a conversion it used; one it skipped or failed before is dropped here
+            self.discard_conversions([cur_filepath])
+
+    def _import_single_file(self, cur_filepath, collection_object_id, agent_id, force_redacted,
+                            attachment_properties_map, skip_redacted_check, id):
         # TODO: We need to rework this - this botany specific check needs to be moved up
         # to the botany importer, and we just pass in "is redacted" as a parameter, the
         # collection specific importer makes the call.
@@ -354,7 +613,10 @@ class Importer:
         elif force_redacted:
             is_redacted = True
         else:
-            is_redacted = self.attachment_utils.get_is_botany_collection_object_redacted(collection_object_id=collection_object_id)
+            # workers run on their own pooled connection; self.cnx belongs to the main thread
+            with self.specify_db_connection.transaction():
+                is_redacted = self.attachment_utils.get_is_botany_collection_object_redacted(
+                    collection_object_id=collection_object_id)
 
         try:
             (url, attach_loc) = self.upload_filepath_to_image_database(cur_filepath, redacted=is_redacted, id=id)
@@ -367,13 +629,20 @@ class Importer:
 
             attachment_properties_map[SpecifyConstants.ST_IS_PUBLIC] = is_public
 
-            self.import_to_specify_database(
+            # workers linking neighbouring collection objects can deadlock on the ordinal's gap
+            # locks; the image is already uploaded, so the link is retried rather than lost
+            run_in_transaction(self.specify_db_connection, lambda: self.import_to_specify_database(
                 filepath=cur_filepath,
                 attach_loc=attach_loc,
                 collection_object_id=collection_object_id,
                 agent_id=agent_id,
                 properties=attachment_properties_map
-            )
+            ))
+            self.record_manifest_outcome(cur_filepath, IMPORTED)
+            md5 = self.file_md5s.get(cur_filepath)
+            if md5 is not None:
+                # later files with the same content link to this upload
+                self.imagedb_known_md5s.add(md5)
             return attach_loc
 
         except TimeoutError:
@@ -408,10 +677,71 @@ class Importer:
                                       skip_redacted_check=False,
                                       id=None,
                                       attachment_properties_map=None):
+        """Imports every file in filepath_list for one collection object.
 
+        With IMPORT_WORKERS > 1 in the collection config the list is handed to the worker pool
+        and this returns immediately; call wait_for_pending_imports() once all objects are queued.
+        Files of one collection object are always imported in order by a single worker, so
+        attachment ordinals are assigned exactly as in the sequential case. To convert files
+        ahead of the uploads, import a whole batch through import_prepared instead.
+        """
         if attachment_properties_map is None:
             attachment_properties_map = {}
+
+        if self.import_workers <= 1:
+            self._import_filepath_list(filepath_list, collection_object_id, agent_id, force_redacted,
+                                       attachment_properties_map, skip_redacted_check, id)
+            return
+
+        if self.import_executor is None:
+            self.import_executor = ThreadPoolExecutor(max_workers=self.import_workers,
+                                                      thread_name_prefix=f"import-{self.collection_name}")
+        # bound the queue so the scan doesn't get too far ahead of the uploads
+        while len(self.pending_imports) >= self.import_workers * 2:
+            self._wait_for_oldest_import()
+
+        future = self.import_executor.submit(self._import_filepath_list, list(filepath_list),
+                                             collection_object_id, agent_id, force_redacted,
+                                             dict(attachment_properties_map), skip_redacted_check, id)
+        self.pending_imports.append((id, future))
+
+    def import_prepared(self, prepared):
+        """Imports a batch of collection objects in order, each given as the keyword arguments of
+        import_to_imagedb_and_specify, and waits for them to finish.
+
+        With a conversion stage, the files of the whole batch that will be uploaded are queued for
+        conversion first, so the stage works ahead through upcoming collection objects, within its
+        temp budget, whatever IMPORT_WORKERS is.
+        """
+        self.prefetch_conversions(self.upload_candidates(
+            [filepath for import_args in prepared for filepath in import_args['filepath_list']]))
+        for import_args in prepared:
+            self.import_to_imagedb_and_specify(**import_args)
+        self.wait_for_pending_imports()
+
+    def upload_candidates(self, filepath_list):
+        """the files of a batch that the md5 dedupe stage won't link to an existing image instead"""
+        if not self.dedupe_by_md5 or not filepath_list:
+            return filepath_list
+        hashes = self.hash_files(filepath_list)
+        known = self.known_imagedb_md5s(hashes.values())
+        candidates = []
+        seen = set()
         for cur_filepath in filepath_list:
+            md5 = hashes.get(cur_filepath)
+            if md5 in known or md5 in seen:
+                continue
+            if md5 is not None:
+                seen.add(md5)
+            candidates.append(cur_filepath)
+        return candidates
+
+    def _import_filepath_list(self, filepath_list, collection_object_id, agent_id, force_redacted,
+                              attachment_properties_map, skip_redacted_check, id):
+        kept_filepaths = self.link_md5_duplicates(filepath_list, collection_object_id, agent_id)
+        kept = set(kept_filepaths)
+        self.discard_conversions([cur_filepath for cur_filepath in filepath_list if cur_filepath not in kept])
+        for cur_filepath in kept_filepaths:
             try:
                 self.import_single_file_to_image_db_and_specify(cur_filepath, collection_object_id, agent_id,
                                                                 force_redacted, attachment_properties_map,
@@ -420,6 +750,22 @@ class Importer:
                 self.logger.error(f"Exception importing path at {cur_filepath}: {e}")
                 self.logger.error(traceback.format_exc())
 
+    def _wait_for_oldest_import(self):
+        id, future = self.pending_imports.pop(0)
+        try:
+            future.result()
+        except Exception as e:
+            self.logger.error(f"Exception importing files for {id}: {e}")
+            self.logger.error(traceback.format_exc())
+
+    def wait_for_pending_imports(self):
+        """blocks until every import queued by import_to_imagedb_and_specify has finished"""
+        while self.pending_imports:
+            self._wait_for_oldest_import()
+        if self.import_executor is not None:
+            self.import_executor.shutdown(wait=True)
+            self.import_executor = None
+
     def cleanup_incomplete_import(self, cur_filepath, collection):
         """
         Deletes attachment and image database record if one or more parts of the import
@@ -451,20 +797,7 @@ class Importer:
 
 
     def check_for_valid_image(self, full_path):
-        # self.logger.debug(f"Ich importer verify file: {full_path}")
-        if not filetype.is_image(full_path):
-            logging.debug(f"Not identified as a file, looks like: {filetype.guess(full_path)}")
-            if full_path.lower().endswith(".tif") or full_path.lower().endswith(".tiff"):
-                self.logger.info("Tiff file misidentified as not an image, overriding auto-recognition")
-            else:
-                return False
-
-        filename = os.path.basename(full_path)
-        if "." not in filename:
-            self.logger.debug(f"Rejected; no . : {filename}")
-
-            return False
-        return True
+        return self.file_classifier.classify(full_path).valid
 
 
 
@@ -525,6 +858,10 @@ class Importer:
             sql_delete_attachment = "DELETE FROM attachment WHERE attachmentid = %s"
             self.specify_db_connection.execute(sql_delete_attachment, params)
 
+            # so the next run imports the file again instead of skipping it as imported
+            if self.manifest is not None:
+                self.manifest.forget(full_path)
+
             return True
 
         except Exception as e:
@@ -3,10 +3,18 @@ import regex as re
 import csv
 import logging
 import warnings
+import atexit
 
 from datetime import datetime
 from importer import Importer
+from file_manifest import IMPORTED, REJECTED
 from directory_tree import DirectoryTree
+from dir_walker import DEFAULT_SCAN_WORKERS, DEFAULT_SCAN_QUEUE_SIZE
+from exif_service import ExifService, ExifToolError
+from image_client import DEFAULT_BULK_LOOKUP_CHUNK_SIZE
+from key_file_cache import KeyFileCache
+from outcome_log import OutcomeLog
+from agent_index import AgentIndex
 from cas_metadata_tools import MetadataTools, EXIFConstants, BaseConstants
 
 from get_configs import get_config
@@ -15,6 +23,8 @@ from specify_constants import SpecifyConstants
 logging.basicConfig(level=logging.WARNING)
 
 CASIZ_FILE_LOG = "file_log.tsv"
+CASIZ_FILE_LOG_COLUMNS = ('casiz', 'filename', 'CASIZ method', 'copyright method', 'copyright', 'rejected',
+                          'path on disk')
 starting_time_stamp = datetime.now()
 
 class FILENAME_BUILD_STATUS(BaseConstants):
@@ -24,13 +34,26 @@ class FILENAME_BUILD_STATUS(BaseConstants):
     ALREADY_PROCESSED = 'already_processed'
     NO_CASIZ_SOURCE = 'no_casiz_source'
     CANNOT_LOCATE_AGENT = 'cannot_locate_agent'
+    UNCHANGED = 'unchanged'
     SUCCESS = 'success'
 
+# build statuses that stay true while the file, its key.csv and the reject rules are unchanged
+MANIFEST_OUTCOMES = {
+    FILENAME_BUILD_STATUS.INVALID_PATH: REJECTED,
+    FILENAME_BUILD_STATUS.SKIPPED_FILE: REJECTED,
+    FILENAME_BUILD_STATUS.NO_CASIZ_SOURCE: REJECTED,
+    FILENAME_BUILD_STATUS.ALREADY_PROCESSED: IMPORTED,
+}
+
 class AgentNotFoundException(Exception):
     pass
 
 
 class IzImporter(Importer):
+    image_suffix_anywhere = True
+    # validate_path and _should_skip_file
+    manifest_reject_rules = ('reject crrf', 'skip .filename')
+
     class ItemMapping:
         def __init__(self):
             self.casiz_numbers = []
@@ -42,9 +65,9 @@ class IzImporter(Importer):
 
         self.iz_importer_config = get_config(config="IZ")
         self.AGENT_ID = self.iz_importer_config.AGENT_ID
-        self.log_file = open(CASIZ_FILE_LOG, "w+")
+        self.log_file = OutcomeLog.from_config(self.iz_importer_config, CASIZ_FILE_LOG, CASIZ_FILE_LOG_COLUMNS)
+        atexit.register(self.log_file.close)
         self.item_mappings = []
-        self._initialize_log_file()
         self.casiz_numbers = []
         self.title = ""
         self.copyright = None
@@ -55,11 +78,37 @@ class IzImporter(Importer):
         super().__init__(self.iz_importer_config, "Invertebrate Zoology")
         self.casiz_filepath_map = {}
 
+        # persistent exiftool processes; 0 or a missing exiftool falls back to MetadataTools per file
+        self.exif_service = None
+        exif_workers = getattr(self.iz_importer_config, 'EXIF_WORKERS', 0)
+        if exif_workers and ExifService.available():
+            self.exif_service = ExifService(workers=exif_workers,
+                                            batch_size=getattr(self.iz_importer_config, 'EXIF_BATCH_SIZE', 200))
+            atexit.register(self.exif_service.close)
+        # loaded on the first key.csv with a creator
+        self.agent_index = None
+        # key.csv locations, parsed keys and other per-folder results for this run
+        self.key_file_cache = KeyFileCache(recheck_seconds=getattr(self.iz_importer_config,
+                                                                   'KEY_FILE_RECHECK_SECONDS', 60))
+        # tags read ahead for the folder currently being mapped
+        self.exif_batch_directory = None
+        self.exif_batch = {}
+        # "already processed" answers read ahead for the folder currently being mapped
+        self.processed_batch_directory = None
+        self.processed_batch_paths = set()
+        self.specify_imported_paths = set()
+        self.image_db_imported_paths = set()
+        # mapped paths that had no Specify attachment, until this run imports them
+        self.unattached_paths = set()
+
     def import_files(self, IZ_SCAN_FOLDERS=None):
         if not IZ_SCAN_FOLDERS:
             IZ_SCAN_FOLDERS = self.iz_importer_config.IZ_SCAN_FOLDERS
-        self.directory_tree_core = DirectoryTree(IZ_SCAN_FOLDERS, pickle_for_debug=False)
-        self.directory_tree_core.process_files(self.build_filename_map)
+        # build_filename_map runs on each folder's files as soon as the walker has listed it
+        self.directory_tree_core = DirectoryTree(
+            IZ_SCAN_FOLDERS, pickle_for_debug=False, on_file=self.build_filename_map,
+            scan_workers=getattr(self.iz_importer_config, 'SCAN_WORKERS', DEFAULT_SCAN_WORKERS),
+            scan_queue_size=getattr(self.iz_importer_config, 'SCAN_QUEUE_SIZE', DEFAULT_SCAN_QUEUE_SIZE))
         print("Starting to process loaded core files...")
         self.process_loaded_files()
 
@@ -72,10 +121,10 @@ class IzImporter(Importer):
         logging.getLogger('Client.ImageClient').setLevel(logging.DEBUG)
         logging.getLogger('Client.IzImporter').setLevel(logging.DEBUG)
 
-    def _initialize_log_file(self):
-        self.log_file.write(f"casiz\tfilename\tCASIZ method\tcopyright method\tcopyright\trejected\tpath on disk\n")
-
     def process_loaded_files(self):
+        # one set of attachment-link queries for every casiz number instead of one per file
+        self.prefetch_specify_linked_filepaths(
+            list(dict.fromkeys(filepath for filepaths in self.casiz_filepath_map.values() for filepath in filepaths)))
         for casiz_number in self.casiz_filepath_map.keys():
             filepaths = self.casiz_filepath_map[casiz_number]
             filepath_list = [cur_filepath for cur_filepath in filepaths]
@@ -93,13 +142,20 @@ class IzImporter(Importer):
 
         filepath_list = self.remove_specify_imported_and_id_linked_from_path(filepath_list, collection_object_id)
         filepath_list.sort()
+        filepath_list = self.link_md5_duplicates(filepath_list, collection_object_id, self.AGENT_ID)
+        self.prefetch_conversions(filepath_list)
         attachment_properties_maps = {}
         for cur_filepath in filepath_list:
             if not os.path.exists(cur_filepath):
                 self.logger.warning(f"File not found - possibly moved after start of ingest: {cur_filepath}, skipping.")
                 continue
-            attachment_id = self.attachment_utils.get_attachmentid_from_filepath(cur_filepath)
+            if cur_filepath in self.unattached_paths:
+                attachment_id = None
+            else:
+                attachment_id = self.attachment_utils.get_attachmentid_from_filepath(cur_filepath)
             if attachment_id is not None:
+                # linked rather than uploaded, so its conversion is not needed
+                self.discard_conversions([cur_filepath])
                 self.connect_existing_attachment_to_collection_object_id(attachment_id, collection_object_id,
                                                                          self.AGENT_ID)
                 attachment_properties_maps[cur_filepath] = {'attachment_id': attachment_id}
@@ -119,17 +175,20 @@ class IzImporter(Importer):
                                                                              attachment_properties_map=attachment_properties_map,
                                                                              force_redacted=not is_public,
                                                                              id=casiz_number)
+                # a file filed under several casiz numbers links this attachment from now on
+                self.unattached_paths.discard(cur_filepath)
                 self.logger.debug(f"importing single file COMPLETE: {cur_filepath}")
                 attachment_properties_maps[cur_filepath] = attachment_properties_map.copy()
                 attachment_properties_maps[cur_filepath]['attach_loc'] = attach_loc
                 if attach_loc is None:
                     self.logger.error(f"Failed to upload image, aborting upload for {cur_filepath}")
+                    self.discard_conversions(filepath_list)
                     return attachment_properties_maps
                 self.image_client.write_exif_image_metadata(self._get_exif_mapping(attachment_properties_map),
                                                             self.collection_name, attach_loc)
 
-                md = MetadataTools(path=cur_filepath)
-                md.write_exif_tags(exif_dict=self._get_exif_mapping(attachment_properties_map), overwrite_blank=True)
+                self._write_exif_tags(cur_filepath, self._get_exif_mapping(attachment_properties_map),
+                                      overwrite_blank=True)
 
         return attachment_properties_maps
 
@@ -177,15 +236,27 @@ class IzImporter(Importer):
             id = "-"
         if conjunction:
             id = conjunction
-        print(
-            f"Logged: {id} copyright method: {copyright_method} copyright: '{copyright}' rejected:{rejected} filename: {filename} Path: {path}")
-        self.log_file.write(
-            f"{id}\t{filename}\t{casiznumber_method}\t{copyright_method}\t{copyright}\t{rejected}\t{path}\n")
+        self.log_file.record(
+            (id, filename, casiznumber_method, copyright_method, copyright, rejected, path),
+            rejected=rejected != "*",
+            message=f"Logged: {id} copyright method: {copyright_method} copyright: '{copyright}' rejected:{rejected} filename: {filename} Path: {path}")
     
     def extract_casiz_from_string(self, input_string):
+        casiz_numbers = self._casiz_numbers_from_string(input_string)
+        if casiz_numbers is None:
+            return []
+        self.casiz_numbers = casiz_numbers
+        if self.casiz_numbers:
+            return True
+        return False
+
+    def _casiz_numbers_from_string(self, input_string):
+        """casiz numbers found in input_string; None for an izacc string with no casiz-shaped number"""
         # Check if "izacc" appears in the text (case insensitive)
         has_izacc = re.search(r'(?i)\bizacc\b', input_string) is not None
-        
+        if has_izacc and not self._casiz_number_in_any_prefix(input_string):
+            return None
+
         matches = []
         pos = 0
         last_prefix_match_end = -1
@@ -239,11 +310,33 @@ class IzImporter(Importer):
                 if 3 <= valid_length <= 12:
                     matches.append(int(stripped_number_str))
         
-        if has_izacc and not any(self.iz_importer_config.CASIZ_NUMBER_REGEX.search(input_string, pos=0, endpos=m) for m in range(len(input_string))):
-            return []
-        self.casiz_numbers = list(set(matches))
-        if self.casiz_numbers:
+        return list(set(matches))
+
+    def _casiz_number_in_any_prefix(self, input_string):
+        """True if CASIZ_NUMBER_REGEX matches in input_string[:m] for some m < len(input_string).
+
+        A match in a prefix ending on a non-digit still matches in input_string[:-1], so one full
+        search covers those. What's left are numbers cut short by the prefix end itself: those end
+        inside a digit run, at most MAXIMUM_ID_DIGITS past its start, and begin no earlier than the
+        separators and CASIZ prefix in front of it, so each is checked in a small window.
+        """
+        casiz_regex = self.iz_importer_config.CASIZ_NUMBER_REGEX
+        length = len(input_string)
+        if length == 0:
+            return False
+        if casiz_regex.search(input_string, 0, length - 1):
             return True
+        for digit_run in re.finditer(r'\d+', input_string):
+            start = digit_run.start()
+            window_start = start
+            while window_start > 0 and (input_string[window_start - 1].isspace() or
+                                        input_string[window_start - 1] in '_#-'):
+                window_start -= 1
+            window_start = max(0, window_start - len('CASIZ'))
+            last_end = min(digit_run.end(), start + self.iz_importer_config.MAXIMUM_ID_DIGITS, length - 1)
+            for end in range(start + 1, last_end + 1):
+                if casiz_regex.search(input_string, window_start, end):
+                    return True
         return False
 
     def extract_copyright_from_string(self, copyright_string):
@@ -340,38 +433,65 @@ class IzImporter(Importer):
 
     def attempt_directory_match(self, full_path):
         directory = os.path.dirname(full_path)
-        directories = directory.split('/')
-        casiz_numbers = []
-        for cur_directory in reversed(directories):
-            match = self.extract_casiz_from_string(cur_directory)
-            if match:
-                casiz_numbers.extend(self.casiz_numbers)
+        # sibling files share every parent folder, so each folder is only parsed once
+        casiz_numbers = self.key_file_cache.memo('casiz', directory, self._directory_casiz_numbers)
+        self.casiz_numbers = list(casiz_numbers)
         if casiz_numbers:
-            self.casiz_numbers = list(set(casiz_numbers))
             return True
         else:
-            self.casiz_numbers = []
             return False
 
+    def _directory_casiz_numbers(self, directory):
+        casiz_numbers = []
+        for cur_directory in reversed(directory.split('/')):
+            matches = self._casiz_numbers_from_string(cur_directory)
+            if matches:
+                casiz_numbers.extend(matches)
+        return tuple(set(casiz_numbers))
+
 
     def attempt_filename_match(self, full_path):
         filename = os.path.basename(full_path)
         return self.extract_casiz_from_string(filename)
 
     def attempt_directory_copyright_extraction(self, directory_orig_case):
+        copyright = self.key_file_cache.memo('copyright', directory_orig_case, self._directory_copyright)
+        if copyright is not None:
+            self.copyright = copyright
+            return True
+        return False
+
+    def _directory_copyright(self, directory_orig_case):
         directories = directory_orig_case.split('/')
         for cur_directory in reversed(directories):
             copyright = self.extract_copyright_from_string(cur_directory)
             if copyright is not None:
-                self.copyright = copyright
-                return True
-        return False
+                return copyright
+        return None
 
     def include_by_extension(self, filepath: str) -> bool:
-        pattern = re.compile(f'^.*{self.iz_importer_config.IMAGE_SUFFIX}')
-        return bool(pattern.match(filepath))
+        return self.file_classifier.matches_name(filepath)
+
+    def manifest_context(self, full_path):
+        # a new or edited key.csv can change a file's outcome without touching the file
+        rules = super().manifest_context(full_path)
+        key_file_path = self.key_file_cache.find(os.path.dirname(full_path))
+        if key_file_path is None:
+            return rules
+        mtime_ns = self.key_file_cache.mtime_ns(key_file_path)
+        return rules if mtime_ns is None else f"{rules}|{key_file_path}:{mtime_ns}"
 
     def build_filename_map(self, full_path):
+        if self.is_unchanged_in_manifest(full_path.lower()):
+            return FILENAME_BUILD_STATUS.UNCHANGED, False
+        status, success = self._build_filename_map(full_path)
+        if status in MANIFEST_OUTCOMES:
+            self.record_manifest_outcome(full_path.lower(), MANIFEST_OUTCOMES[status])
+        elif status == FILENAME_BUILD_STATUS.REMOVED_FILE and self.manifest is not None:
+            self.manifest.forget(full_path.lower())
+        return status, success
+
+    def _build_filename_map(self, full_path):
         self._check_and_increment_counter()
 
         orig_case_full_path = full_path
@@ -446,18 +566,15 @@ class IzImporter(Importer):
         self.logger.debug(f"Clearing EXIF fields in: {full_path}")
         target_fields = self.iz_importer_config.CLEAR_EXIF_FIELDS
 
-        exif_tools = MetadataTools(full_path)
-        if not exif_tools:
-            return
-
-
         if self.logger.isEnabledFor(logging.DEBUG):
-            current = exif_tools.read_exif_tags()
+            current = self._read_exif_tags(full_path)
             for f in target_fields:
                 self.logger.debug(f"Old value for {f}: {current.get(f)}")
 
         blank_tags = {field: None for field in target_fields}
-        exif_tools.write_exif_tags(blank_tags, overwrite_blank=True)
+        self._write_exif_tags(full_path, blank_tags, overwrite_blank=True)
+        # tags read ahead for this file are stale now
+        self.exif_batch.pop(full_path, None)
 
     def _check_and_increment_counter(self):
         if 'counter' not in globals():
@@ -486,22 +603,97 @@ class IzImporter(Importer):
             return True
         return False
 
+    def _prefetch_already_processed(self, directory):
+        """loads which of the folder's files are already in Specify and in the image db,
+           with bulk queries, so _is_file_already_processed answers from sets. Files the manifest
+           will skip are left out. Without the image server's bulk route the image db is
+           checked lazily per file instead (image_db_imported_paths is None)."""
+        self.processed_batch_directory = directory
+        self.processed_batch_paths = {path for path in self._folder_candidate_paths(directory)
+                                      if not self.is_unchanged_in_manifest(path)}
+        self.specify_imported_paths = set()
+        self.image_db_imported_paths = set()
+        if not self.processed_batch_paths:
+            return
+        chunk_size = getattr(self.iz_importer_config, 'BULK_LOOKUP_CHUNK_SIZE', DEFAULT_BULK_LOOKUP_CHUNK_SIZE)
+        paths = sorted(self.processed_batch_paths)
+        self.specify_imported_paths = set(
+            self.attachment_utils.get_attachmentids_from_filepaths(paths, chunk_size=chunk_size))
+        self.image_db_imported_paths = None
+        if self.image_client.bulk_lookup_supported:
+            imported = self.image_client.check_image_db_if_filenames_imported(self.collection_name, paths,
+                                                                              exact=True, chunk_size=chunk_size,
+                                                                              per_file_fallback=False)
+            self.image_db_imported_paths = None if imported is None else set(imported)
+
     def _is_file_already_processed(self, full_path, orig_case_full_path):
+        directory = os.path.dirname(orig_case_full_path)
+        if directory != self.processed_batch_directory:
+            self._prefetch_already_processed(directory)
+
+        if full_path in self.processed_batch_paths:
+            in_specify = full_path in self.specify_imported_paths
+            if in_specify:
+                in_image_db = False
+            elif self.image_db_imported_paths is not None:
+                in_image_db = full_path in self.image_db_imported_paths
+            else:
+                in_image_db = self.image_client.check_image_db_if_filename_imported(self.collection_name,
+                                                                                   full_path, exact=True)
+        else:
+            # not seen when the folder was listed; ask about this file alone
+            in_specify = self.attachment_utils.get_attachmentid_from_filepath(full_path) is not None
+            in_image_db = not in_specify and \
+                self.image_client.check_image_db_if_filename_imported(self.collection_name, full_path, exact=True)
 
-        if self.attachment_utils.get_attachmentid_from_filepath(full_path) is not None:
+        if in_specify:
             self.log_file_status(filename=os.path.basename(full_path), path=full_path, rejected="Already imported")
             return True
-        if self.image_client.check_image_db_if_filename_imported(self.collection_name, full_path, exact=True):
+        if in_image_db:
             print(f"Already in image db {orig_case_full_path}")
             return True
 
+        self.unattached_paths.add(full_path)
         return False
 
+    def _read_exif_tags(self, full_path):
+        if self.exif_service is not None:
+            return self.exif_service.read_tags(full_path)
+        return MetadataTools(full_path).read_exif_tags()
+
+    def _write_exif_tags(self, full_path, exif_dict, overwrite_blank=False):
+        if self.exif_service is not None:
+            self.exif_service.write_tags(full_path, exif_dict, overwrite_blank=overwrite_blank)
+        else:
+            MetadataTools(path=full_path).write_exif_tags(exif_dict=exif_dict, overwrite_blank=overwrite_blank)
+
+    def _folder_candidate_paths(self, directory):
+        """the files in directory that build_filename_map will look at, as it will name them"""
+        try:
+            with os.scandir(directory) as entries:
+                names = [entry.name for entry in entries if entry.is_file()]
+        except OSError:
+            return []
+        return [os.path.join(directory, name).lower() for name in names
+                if not name.startswith('.') and self.include_by_extension(name.lower())]
+
     def _read_exif_metadata(self, full_path):
-        exif_tools = MetadataTools(full_path)
-        if exif_tools is not None:
-            return exif_tools.read_exif_tags()
-        return None
+        if self.exif_service is None:
+            return self._read_exif_tags(full_path)
+        # first file of a folder: read every image in it with one batched request
+        directory = os.path.dirname(full_path)
+        if directory != self.exif_batch_directory:
+            self.exif_batch_directory = directory
+            try:
+                self.exif_batch = self.exif_service.read_tags_batch(self._folder_candidate_paths(directory))
+            except (TimeoutError, ExifToolError, OSError) as e:
+                # one slow folder shouldn't stop the scan; its files are read one at a time
+                self.logger.warning(f"batched exif read of {directory} failed ({e}), reading files singly")
+                self.exif_batch = {}
+        tags = self.exif_batch.pop(full_path, None)
+        if tags is None:
+            tags = self._read_exif_tags(full_path)
+        return tags
 
     def get_casiz_ids(self, full_path, exif_metadata):
         if self.attempt_filename_match(full_path):
@@ -577,45 +769,14 @@ class IzImporter(Importer):
             }
 
     def find_agent_id_from_string(self, input_string, agents=None):
-        import difflib
-
-        def fuzzy_match(query, choices, cutoff=0.8):
-            matches = difflib.get_close_matches(query, choices, n=1, cutoff=cutoff)
-            return matches[0] if matches else None
-
-        # Split the input string into firstname and lastname
-        names = input_string.strip().split()
-        if len(names) < 2:
-            return None
-
-        firstname = names[0].lower()
-        lastname = names[-1].lower()
-
-        if agents is None:
-            # Get a list of possible agent names from the database
-            sql = "SELECT AgentID, FirstName, LastName FROM casiz.agent"
-            cursor = self.specify_db_connection.get_cursor()
-            cursor.execute(sql)
-            agents = cursor.fetchall()
-            cursor.close()
-
-        # Normalize agent names for comparison
-        agent_names = [(agent[0], agent[1].lower() if agent[1] else '', agent[2].lower() if agent[2] else '') for agent
-                       in agents]
-
-        # Find a fuzzy match for the firstname and lastname
-        possible_firstnames = [agent[1] for agent in agent_names]
-        possible_lastnames = [agent[2] for agent in agent_names]
-
-        matched_firstname = fuzzy_match(firstname, possible_firstnames)
-        matched_lastname = fuzzy_match(lastname, possible_lastnames)
-
-        if matched_firstname and matched_lastname:
-            for agent_id, fname, lname in agent_names:
-                if fname == matched_firstname and lname == matched_lastname:
-                    return agent_id
-
-        return None
+        """Fuzzy-matches a key.csv creator ("First Last") to an AgentID, or None.
+           The agent table is loaded into an AgentIndex once per run; passing agents
+           matches against that list instead."""
+        if agents is not None:
+            return AgentIndex(agents).find_agent_id(input_string)
+        if self.agent_index is None:
+            self.agent_index = AgentIndex.from_database(self.specify_db_connection)
+        return self.agent_index.find_agent_id(input_string)
 
     def _extract_year_from_date(self, date_str):
         if date_str is not None:
@@ -645,11 +806,13 @@ class IzImporter(Importer):
 
     def _read_file_key(self, image_path):
         directory = os.path.dirname(image_path)
-        key_file_path = IzImporter.find_key_file(directory)
+        key_file_path = self.key_file_cache.find(directory)
         if not key_file_path:
             self.log_file_status(filename=os.path.basename(image_path), path=image_path, rejected="Missing key.csv")
             return None
+        return self.key_file_cache.read(key_file_path, self._parse_key_file)
 
+    def _parse_key_file(self, key_file_path):
         # returned_dict:file_based_key_value
         column_mappings = {
             'copyrightdate': 'CopyrightDate',
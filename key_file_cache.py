@@ -0,0 +1,86 @@
+"""Docstring: per-run cache of IZ key.csv locations, parsed keys and other per-folder results."""
+import logging
+import os
+import threading
+import time
+
+KEY_FILE_NAME = 'key.csv'
+
+
+class KeyFileCache:
+    """Directory-scoped cache for IzImporter.
+
+    find() resolves the key.csv governing a folder. Each folder on the way up to the key (or to
+    the filesystem root) is checked once per run and remembered, so sibling and nested folders
+    reuse the walk. read() parses a key file once and re-parses only when its mtime changes;
+    the mtime is re-checked at most every recheck_seconds so a hot folder doesn't pay a stat per
+    image. memo() caches any other result that depends only on the folder path.
+    """
+
+    def __init__(self, recheck_seconds=60):
+        self.logger = logging.getLogger(f'Client.{self.__class__.__name__}')
+        self.recheck_seconds = recheck_seconds
+        self.key_paths = {}
+        # key path -> (mtime_ns, checked_at, parsed dict)
+        self.parsed = {}
+        self.memos = {}
+        self.lock = threading.Lock()
+        self.parses = 0
+
+    def find(self, directory):
+        """path of the nearest key.csv in directory or above it, else None"""
+        unresolved = []
+        key_path = None
+        # the filesystem root itself is never searched, matching IzImporter.find_key_file
+        while directory != os.path.dirname(directory):
+            if directory in self.key_paths:
+                key_path = self.key_paths[directory]
+                break
+            unresolved.append(directory)
+            candidate = os.path.join(directory, KEY_FILE_NAME)
+            if os.path.isfile(candidate):
+                key_path = candidate
+                break
+            directory = os.path.dirname(directory)
+        for cur_directory in unresolved:
+            self.key_paths[cur_directory] = key_path
+        return key_path
+
+    def read(self, key_path, parse):
+        """parse(key_path)'s result, cached until the file's mtime changes; callers get a copy"""
+        now = time.monotonic()
+        with self.lock:
+            entry = self.parsed.get(key_path)
+        if entry is not None and now - entry[1] < self.recheck_seconds:
+            return dict(entry[2])
+        try:
+            mtime_ns = os.stat(key_path).st_mtime_ns
+        except OSError:
+            mtime_ns = None
+        if entry is not None and entry[0] == mtime_ns:
+            with self.lock:
+                self.parsed[key_path] = (mtime_ns, now, entry[2])
+            return dict(entry[2])
+
+        result = parse(key_path)
+        with self.lock:
+            self.parses += 1
+            self.parsed[key_path] = (mtime_ns, now, result)
+        return dict(result)
+
+    def mtime_ns(self, key_path):
+        """the key file's mtime as of its last parse or stat, for fingerprints"""
+        entry = self.parsed.get(key_path)
+        if entry is not None and time.monotonic() - entry[1] < self.recheck_seconds:
+            return entry[0]
+        try:
+            return os.stat(key_path).st_mtime_ns
+        except OSError:
+            return None
+
+    def memo(self, kind, directory, compute):
+        """compute(directory), remembered per kind for the rest of the run"""
+        key = (kind, directory)
+        if key not in self.memos:
+            self.memos[key] = compute(directory)
+        return self.memos[key]
@@ -0,0 +1,84 @@
+"""Docstring: per-run, size-bounded cache of single-value Specify lookups for SqlCsvTools."""
+import logging
+import threading
+from collections import OrderedDict
+
+# get() result for a key that isn't cached; None is a cached "no match"
+MISSING = object()
+
+# caches shared by every SqlCsvTools on the same database, so an insert through one
+# instance invalidates what the others have cached for that table
+_shared_caches = {}
+_shared_lock = threading.Lock()
+
+
+class LookupCache:
+    """LRU cache of lookups keyed by (table, id_col, key_col, value).
+
+    No-match results are cached too. Once max_entries are held the least recently used
+    entry is evicted. invalidate(table) drops every entry for a table, and is called
+    whenever rows are written to it. hits, misses and evictions are counted for the run report.
+    """
+
+    def __init__(self, max_entries):
+        self.logger = logging.getLogger(f'Client.{self.__class__.__name__}')
+        self.max_entries = max(1, max_entries)
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @classmethod
+    def shared(cls, database_key, max_entries):
+        """the cache for database_key, created on first use"""
+        with _shared_lock:
+            cache = _shared_caches.get(database_key)
+            if cache is None:
+                cache = cls(max_entries)
+                _shared_caches[database_key] = cache
+            return cache
+
+    def get(self, key):
+        """cached value for key (possibly None), or MISSING"""
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key]
+            self.misses += 1
+            return MISSING
+
+    def put(self, key, value):
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, table=None):
+        """drops the entries for table (matched case-insensitively), or everything without one"""
+        with self.lock:
+            if table is None:
+                dropped = len(self.entries)
+                self.entries.clear()
+            else:
+                table = table.lower()
+                stale = [key for key in self.entries if key[0].lower() == table]
+                for key in stale:
+                    del self.entries[key]
+                dropped = len(stale)
+            if dropped:
+                self.invalidations += 1
+
+    def stats(self):
+        """counters for the run report"""
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {'lookup cache hits': self.hits,
+                    'lookup cache misses': self.misses,
+                    'lookup cache hit rate': f"{self.hits / lookups:.1%}" if lookups else "n/a",
+                    'lookup cache evictions': self.evictions,
+                    'lookup cache invalidations': self.invalidations}
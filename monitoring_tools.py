@@ -192,13 +192,15 @@ class MonitoringTools:
         with open(self.path, 'w') as file:
             file.writelines(html_content)
 
-    def add_summary_statistics(self, value_list):
+    def add_summary_statistics(self, value_list, extra_terms=None):
         """Adds the summary statistics to the report after the uploader information.
             args:
                 custom_terms: the list of custom values to add as summary terms.
+                extra_terms: optional dict of further term: value pairs, e.g. lookup cache counters.
         """
-        if value_list:
-            custom_terms = self.create_summary_term_list(value_list=value_list)
+        custom_terms = self.create_summary_term_list(value_list=value_list) if value_list else ""
+        if extra_terms:
+            custom_terms += "".join(f"<li>{term}: {value}</li>\n" for term, value in extra_terms.items())
 
         with open(self.path, "r") as file:
             html_content = file.readlines()
@@ -211,7 +213,7 @@ class MonitoringTools:
             # Insert the custom terms 2 lines below the uploader line
             insert_idx = uploader_idx + 2
             html_content.insert(insert_idx, f"<h2>Summary Statistics:</h2>\n")
-            if value_list:
+            if custom_terms:
                 html_content.insert(insert_idx + 1, f"<ul>{custom_terms}</ul>\n")
             else:
                 html_content.insert(insert_idx + 1, f"<ul></ul>\n")
@@ -272,13 +274,14 @@ class MonitoringTools:
         return msg
 
 
-    def send_monitoring_report(self, subject, image_dict: dict, value_list=None, remove=False):
+    def send_monitoring_report(self, subject, image_dict: dict, value_list=None, remove=False, extra_terms=None):
         """send_monitoring_report: completes the final steps after adding batch image paths to table.
                                     attaches custom graphs and images before sending email through smtp
             args:
                 subject: subject line of report email
                 image_dict: the dictionary of paths added/removed.
                 value_list: list of values for summary stats table. optional
+                extra_terms: dict of further summary stats, listed after value_list's terms. optional
                 remove: boolean. whether to report removals.
                 initial count: the count of images before process start. use only with removals.
         """
@@ -288,7 +291,7 @@ class MonitoringTools:
             self.create_remove_report()
         self.add_imagepaths_to_html(image_dict)
 
-        self.add_summary_statistics(value_list)
+        self.add_summary_statistics(value_list, extra_terms=extra_terms)
 
         batch_size = len(image_dict)
 
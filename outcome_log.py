@@ -0,0 +1,101 @@
+"""Docstring: buffered, columnar per-file outcome log shared by the importers."""
+import csv
+import gzip
+import logging
+import os
+import shutil
+import threading
+import time
+
+# which rows are echoed to stdout as they are recorded
+PRINT_ALL = 'all'
+PRINT_REJECTED = 'rejected'
+PRINT_NONE = 'none'
+PRINT_MODES = (PRINT_ALL, PRINT_REJECTED, PRINT_NONE)
+
+DEFAULT_BUFFER_ROWS = 1000
+DEFAULT_FLUSH_SECONDS = 30
+
+
+class OutcomeLog:
+    """Tab separated log with one row per file, written in batches.
+
+    Rows are buffered and written when buffer_rows have collected, when flush_seconds have passed
+    since the last write, and on close(). With rotate_bytes set, a file that grows past it is
+    gzipped to `<path>.<n>.gz` and a new one started with the header, so a long run leaves a
+    series of compressed chunks instead of one huge file.
+    """
+
+    def __init__(self, path, columns, buffer_rows=DEFAULT_BUFFER_ROWS, flush_seconds=DEFAULT_FLUSH_SECONDS,
+                 rotate_bytes=0, print_mode=PRINT_ALL):
+        self.logger = logging.getLogger(f'Client.{self.__class__.__name__}')
+        if print_mode not in PRINT_MODES:
+            raise ValueError(f"print_mode must be one of {PRINT_MODES}, not {print_mode!r}")
+        self.path = path
+        self.columns = tuple(columns)
+        self.buffer_rows = max(1, buffer_rows)
+        self.flush_seconds = flush_seconds
+        self.rotate_bytes = rotate_bytes
+        self.print_mode = print_mode
+        self.rows = []
+        self.last_flush = time.monotonic()
+        self.lock = threading.Lock()
+        self.stream = None
+        self.writer = None
+        self._open()
+
+    @classmethod
+    def from_config(cls, config, path, columns):
+        """an OutcomeLog tuned by the OUTCOME_LOG_* settings of a collection config"""
+        return cls(path, columns,
+                   buffer_rows=getattr(config, 'OUTCOME_LOG_BUFFER_ROWS', DEFAULT_BUFFER_ROWS),
+                   flush_seconds=getattr(config, 'OUTCOME_LOG_FLUSH_SECONDS', DEFAULT_FLUSH_SECONDS),
+                   rotate_bytes=int(getattr(config, 'OUTCOME_LOG_ROTATE_MB', 0) or 0) * 1024 * 1024,
+                   print_mode=getattr(config, 'OUTCOME_LOG_PRINT', PRINT_ALL))
+
+    def _open(self):
+        self.stream = open(self.path, "w", newline="")
+        self.writer = csv.writer(self.stream, delimiter="\t", lineterminator="\n")
+        self.writer.writerow(self.columns)
+        self.stream.flush()
+
+    def record(self, row, rejected=False, message=None):
+        """queues one row (a sequence in column order); message is what gets printed, if anything"""
+        if message is not None and (self.print_mode == PRINT_ALL or
+                                    (self.print_mode == PRINT_REJECTED and rejected)):
+            print(message)
+        with self.lock:
+            self.rows.append(row)
+            due = len(self.rows) >= self.buffer_rows or \
+                time.monotonic() - self.last_flush >= self.flush_seconds
+        if due:
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            if self.stream is None:
+                return
+            rows, self.rows = self.rows, []
+            self.writer.writerows(rows)
+            self.stream.flush()
+            self.last_flush = time.monotonic()
+            if self.rotate_bytes and self.stream.tell() >= self.rotate_bytes:
+                self._rotate()
+
+    def _rotate(self):
+        self.stream.close()
+        number = 1
+        while os.path.exists(f"{self.path}.{number}.gz"):
+            number += 1
+        rotated_path = f"{self.path}.{number}.gz"
+        with open(self.path, "rb") as source, gzip.open(rotated_path, "wb") as target:
+            shutil.copyfileobj(source, target)
+        self.logger.info(f"Rotated outcome log to {rotated_path}")
+        self._open()
+
+    def close(self):
+        self.flush()
+        with self.lock:
+            if self.stream is not None:
+                self.stream.close()
+                self.stream = None
@@ -5,6 +5,7 @@
 import atexit
 import os.path
 import shutil
+from collections import defaultdict
 from uuid import uuid4
 from gen_import_utils import *
 import logging
@@ -20,6 +21,34 @@ from taxon_importer import TaxonomyImporter
 
 starting_time_stamp = datetime.now()
 
+DEFAULT_BULK_RECORD_CHUNK_SIZE = 200
+
+# tables written by upload_records_bulk, parents before the tables referencing them
+BULK_TABLE_ORDER = ['agent', 'locality', 'localitydetail', 'collectingevent', 'collectionobject',
+                    'determination', 'collector']
+
+# tables whose new rows are referenced by GUID later in the chunk, and their id column
+BULK_GUID_ID_COLUMNS = {'agent': 'AgentID',
+                        'locality': 'LocalityID',
+                        'collectingevent': 'CollectingEventID',
+                        'collectionobject': 'CollectionObjectID'}
+
+
+class GuidRef:
+    """placeholder for the id of a record staged in the same bulk chunk, filled in once its GUID is resolved"""
+    __slots__ = ('table', 'guid')
+
+    def __init__(self, table, guid):
+        self.table = table
+        self.guid = str(guid)
+
+
+def collector_name_key(name_dict):
+    """identifies a new agent by name within a bulk chunk"""
+    return (name_dict['collector_first_name'], name_dict['collector_last_name'],
+            name_dict['collector_middle_initial'], name_dict['collector_title'])
+
+
 class PicturaeImporter(Importer):
     """Picturae_Importer:
            A class with methods designed to wrangle, verify,
@@ -119,8 +148,9 @@ class PicturaeImporter(Importer):
 
         # full collector list is for populating existing and missing agents into collector table
         # new_collector_list is only for adding new agents to agent table.
-        empty_lists = ['barcode_list', 'image_list', 'full_collector_list', 'new_collector_list',
-                       'taxon_list', 'parent_list', 'new_taxa']
+        # failed_image_list holds images of rolled back bulk chunks; they stay hidden from the attachment upload
+        empty_lists = ['barcode_list', 'image_list', 'failed_image_list', 'full_collector_list',
+                       'new_collector_list', 'taxon_list', 'parent_list', 'new_taxa']
 
         for empty_list in empty_lists:
             setattr(self, empty_list, [])
@@ -441,11 +471,11 @@ class PicturaeImporter(Importer):
                                                             key_col='FullName', match=self.geography_string)
 
 
-    def create_locality_record(self):
-        """create_locality_record:
-               defines column and value list , runs them as args
-               through create_sql_string and create_table record
-               in order to add new locality record to database
+    def locality_row(self):
+        """locality_row:
+               column and value lists for this row's new locality record, with na values removed
+           returns:
+                column_list, value_list
         """
         if self.locality == '' or pd.isna(self.locality):
             self.locality=["[unspecified]"]
@@ -494,11 +524,59 @@ class PicturaeImporter(Importer):
         # removing na values from both lists
         value_list, column_list = remove_two_index(value_list, column_list)
 
+        return column_list, value_list
+
+    def create_locality_record(self):
+        """create_locality_record:
+               defines column and value list , runs them as args
+               through create_sql_string and create_table record
+               in order to add new locality record to database
+        """
+        column_list, value_list = self.locality_row()
+
         sql_statement = self.sql_csv_tools.create_insert_statement(tab_name='locality', col_list=column_list,
                                                          val_list=value_list)
 
         self.sql_csv_tools.insert_table_record(sql_statement.sql, sql_statement.params)
 
+    def locality_detail_row(self, locality_id):
+        """locality_detail_row:
+               column and value lists for this row's localitydetail record,
+               None when the row has no utm coordinates.
+           args:
+                locality_id: LocalityID of the row's locality, or a GuidRef to it
+        """
+        if self.utm_northing == '' or pd.isna(self.utm_northing):
+            return None
+
+        column_list = ['TimestampCreated',
+                   'TimestampModified',
+                   'Version',
+                   'UtmNorthing',
+                   'UtmEasting',
+                   'UtmZone',
+                   'UtmDatum',
+                   'LocalityID',
+                   'ModifiedByAgentID',
+                   'CreatedByAgentID'
+                   ]
+
+        value_list = [f'{time_utils.get_pst_time_now_string()}',
+                  f'{time_utils.get_pst_time_now_string()}',
+                  0,
+                  f'{self.utm_northing}',
+                  f'{self.utm_easting}',
+                  f'{self.utm_zone}',
+                  f'{self.utm_datum}',
+                  locality_id,
+                  f'{self.created_by_agent}',
+                  f'{self.created_by_agent}'
+                  ]
+
+        value_list, column_list = remove_two_index(value_list, column_list)
+
+        return column_list, value_list
+
     def create_locality_detail_record(self):
         """  defines column and value list , runs them as args
              through create_sql_string and create_table record
@@ -511,37 +589,56 @@ class PicturaeImporter(Importer):
                                                                 id_col='LocalityID',
                                                                 key_col='GUID',
                                                                 match=self.locality_guid)
-            column_list = ['TimestampCreated',
-                       'TimestampModified',
-                       'Version',
-                       'UtmNorthing',
-                       'UtmEasting',
-                       'UtmZone',
-                       'UtmDatum',
-                       'LocalityID',
-                       'ModifiedByAgentID',
-                       'CreatedByAgentID'
-                       ]
 
-            value_list = [f'{time_utils.get_pst_time_now_string()}',
-                      f'{time_utils.get_pst_time_now_string()}',
-                      0,
-                      f'{self.utm_northing}',
-                      f'{self.utm_easting}',
-                      f'{self.utm_zone}',
-                      f'{self.utm_datum}',
-                      f'{self.locality_id}',
-                      f'{self.created_by_agent}',
-                      f'{self.created_by_agent}'
-                      ]
-
-            value_list, column_list = remove_two_index(value_list, column_list)
+            column_list, value_list = self.locality_detail_row(f'{self.locality_id}')
 
             sql_statement = self.sql_csv_tools.create_insert_statement(tab_name='localitydetail', col_list=column_list,
                                                                        val_list=value_list)
 
             self.sql_csv_tools.insert_table_record(sql_statement.sql, sql_statement.params)
 
+    def agent_row(self, name_dict, agent_guid):
+        """agent_row:
+               column and value lists for a new agent record.
+           args:
+                name_dict: collector name dict from new_collector_list
+                agent_guid: GUID for the new agent
+        """
+        columns = ['TimestampCreated',
+                   'TimestampModified',
+                   'Version',
+                   'AgentType',
+                   'DateOfBirthPrecision',
+                   'DateOfDeathPrecision',
+                   'FirstName',
+                   'LastName',
+                   'MiddleInitial',
+                   'Title',
+                   'DivisionID',
+                   'GUID',
+                   'ModifiedByAgentID',
+                   'CreatedByAgentID']
+
+        values = [f'{time_utils.get_pst_time_now_string()}',
+                  f'{time_utils.get_pst_time_now_string()}',
+                  1,
+                  1,
+                  1,
+                  1,
+                  f"{name_dict['collector_first_name']}",
+                  f"{name_dict['collector_last_name']}",
+                  f"{name_dict['collector_middle_initial']}",
+                  f"{name_dict['collector_title']}",
+                  2,
+                  f'{agent_guid}',
+                  f'{self.created_by_agent}',
+                  f'{self.created_by_agent}'
+                  ]
+        # removing na values from both lists
+        values, columns = remove_two_index(values, columns)
+
+        return columns, values
+
     def create_agent_id(self):
         """create_agent_id:
                 defines column and value list , runs them as
@@ -552,58 +649,19 @@ class PicturaeImporter(Importer):
         for name_dict in self.new_collector_list:
             self.agent_guid = uuid4()
 
-            columns = ['TimestampCreated',
-                       'TimestampModified',
-                       'Version',
-                       'AgentType',
-                       'DateOfBirthPrecision',
-                       'DateOfDeathPrecision',
-                       'FirstName',
-                       'LastName',
-                       'MiddleInitial',
-                       'Title',
-                       'DivisionID',
-                       'GUID',
-                       'ModifiedByAgentID',
-                       'CreatedByAgentID']
-
-            values = [f'{time_utils.get_pst_time_now_string()}',
-                      f'{time_utils.get_pst_time_now_string()}',
-                      1,
-                      1,
-                      1,
-                      1,
-                      f"{name_dict['collector_first_name']}",
-                      f"{name_dict['collector_last_name']}",
-                      f"{name_dict['collector_middle_initial']}",
-                      f"{name_dict['collector_title']}",
-                      2,
-                      f'{self.agent_guid}',
-                      f'{self.created_by_agent}',
-                      f'{self.created_by_agent}'
-                      ]
-            # removing na values from both lists
-            values, columns = remove_two_index(values, columns)
+            columns, values = self.agent_row(name_dict, self.agent_guid)
 
             sql_statement = self.sql_csv_tools.create_insert_statement(tab_name='agent', col_list=columns,
                                                                        val_list=values)
 
             self.sql_csv_tools.insert_table_record(sql_statement.sql, sql_statement.params)
 
-
-    def create_collecting_event(self):
-        """create_collectingevent:
-                defines column and value list , runs them as
-                args through create_sql_string and create_table record
-                in order to add new collectingevent record to database.
-         """
-
-        # re-pulling locality id to reflect update
-
-        self.locality_id = self.sql_csv_tools.get_one_match(tab_name='locality',
-                                                            id_col='LocalityID',
-                                                            key_col='GUID', match=self.locality_guid)
-
+    def collecting_event_row(self, locality_id):
+        """collecting_event_row:
+               column and value lists for this row's collectingevent record.
+           args:
+                locality_id: LocalityID of the row's locality, or a GuidRef to it
+        """
         column_list = ['TimestampCreated',
                        'TimestampModified',
                        'Version',
@@ -629,7 +687,7 @@ class PicturaeImporter(Importer):
                       f'{self.verbatim_date}',
                       f'{self.start_date}',
                       f'{self.end_date}',
-                      f'{self.locality_id}',
+                      locality_id,
                       f'{self.created_by_agent}',
                       f'{self.created_by_agent}',
                       f'{self.label_data}',
@@ -639,17 +697,30 @@ class PicturaeImporter(Importer):
         # removing na values from both lists
         value_list, column_list = remove_two_index(value_list, column_list)
 
+        return column_list, value_list
+
+    def create_collecting_event(self):
+        """create_collectingevent:
+                defines column and value list , runs them as
+                args through create_sql_string and create_table record
+                in order to add new collectingevent record to database.
+         """
+
+        # re-pulling locality id to reflect update
+
+        self.locality_id = self.sql_csv_tools.get_one_match(tab_name='locality',
+                                                            id_col='LocalityID',
+                                                            key_col='GUID', match=self.locality_guid)
+
+        column_list, value_list = self.collecting_event_row(f'{self.locality_id}')
+
         sql_statement = self.sql_csv_tools.create_insert_statement(tab_name='collectingevent', col_list=column_list,
                                                                    val_list=value_list)
 
         self.sql_csv_tools.insert_table_record(sql_statement.sql, sql_statement.params)
 
-    def create_collection_object(self):
-        """create_collection_object:
-                defines column and value list , runs them as
-                args through create_sql_string and create_table record
-                in order to add new collectionobject record to database.
-        """
+    def resolve_collection_object_taxon(self):
+        """re-pulls taxon_id for taxa created during this batch, and checks whether the taxon is redacted"""
         if self.full_name == "missing taxon in row":
             search_taxon = self.family_name
         else:
@@ -658,14 +729,15 @@ class PicturaeImporter(Importer):
             self.taxon_id = self.sql_csv_tools.get_one_match(tab_name='taxon', id_col='TaxonID',
                                                              key_col='FullName', match=search_taxon)
 
-
-        self.collecting_event_id = self.sql_csv_tools.get_one_match(tab_name='collectingevent',
-                                                                    id_col='CollectingEventID',
-                                                                    key_col='GUID', match=self.collecting_event_guid)
-
         if self.redacted is False:
             self.redacted = self.sql_csv_tools.get_is_taxon_id_redacted(taxon_id=self.taxon_id)
 
+    def collection_object_row(self, collecting_event_id):
+        """collection_object_row:
+               column and value lists for this row's collectionobject record.
+           args:
+                collecting_event_id: CollectingEventID of the row's collecting event, or a GuidRef to it
+        """
         if self.sheet_notes or self.tax_notes:
             notes = f"{self.sheet_notes + ' ' + self.tax_notes}"
         else:
@@ -699,7 +771,7 @@ class PicturaeImporter(Importer):
 
         value_list = [f"{time_utils.get_pst_time_now_string()}",
                       f"{time_utils.get_pst_time_now_string()}",
-                      f"{self.collecting_event_id}",
+                      collecting_event_id,
                       0,
                       4,
                       f"{self.barcode}",
@@ -722,11 +794,69 @@ class PicturaeImporter(Importer):
         # removing na values from both lists
         value_list, column_list = remove_two_index(value_list, column_list)
 
+        return column_list, value_list
+
+    def create_collection_object(self):
+        """create_collection_object:
+                defines column and value list , runs them as
+                args through create_sql_string and create_table record
+                in order to add new collectionobject record to database.
+        """
+        self.collecting_event_id = self.sql_csv_tools.get_one_match(tab_name='collectingevent',
+                                                                    id_col='CollectingEventID',
+                                                                    key_col='GUID', match=self.collecting_event_guid)
+
+        self.resolve_collection_object_taxon()
+
+        column_list, value_list = self.collection_object_row(f"{self.collecting_event_id}")
+
         sql_statement = self.sql_csv_tools.create_insert_statement(tab_name='collectionobject', col_list=column_list,
                                                          val_list=value_list)
 
         self.sql_csv_tools.insert_table_record(sql_statement.sql, sql_statement.params)
 
+    def determination_row(self, collection_ob_id):
+        """determination_row:
+               column and value lists for this row's determination record, None without a taxon.
+           args:
+                collection_ob_id: CollectionObjectID of the row's collection object, or a GuidRef to it
+        """
+        if self.taxon_id is None:
+            return None
+
+        column_list = ['TimestampCreated',
+                       'TimestampModified',
+                       'Version',
+                       'CollectionMemberID',
+                       'DeterminedDatePrecision',
+                       'IsCurrent',
+                       'Qualifier',
+                       'GUID',
+                       'TaxonID',
+                       'CollectionObjectID',
+                       'ModifiedByAgentID',
+                       'CreatedByAgentID',
+                       'PreferredTaxonID'
+                       ]
+        value_list = [f"{time_utils.get_pst_time_now_string()}",
+                      f"{time_utils.get_pst_time_now_string()}",
+                      1,
+                      4,
+                      1,
+                      True,
+                      f"{self.qualifier}",
+                      f"{self.determination_guid}",
+                      f"{self.taxon_id}",
+                      collection_ob_id,
+                      f"{self.created_by_agent}",
+                      f"{self.created_by_agent}",
+                      f"{self.taxon_id}"
+                      ]
+
+        # removing na values from both lists
+        value_list, column_list = remove_two_index(value_list, column_list)
+
+        return column_list, value_list
 
     def create_determination(self):
         """create_determination:
@@ -740,39 +870,9 @@ class PicturaeImporter(Importer):
         self.collection_ob_id = self.sql_csv_tools.get_one_match(tab_name='collectionobject',
                                                                  id_col='CollectionObjectID',
                                                                  key_col='GUID', match=self.collection_ob_guid)
-        if self.taxon_id is not None:
-
-            column_list = ['TimestampCreated',
-                           'TimestampModified',
-                           'Version',
-                           'CollectionMemberID',
-                           'DeterminedDatePrecision',
-                           'IsCurrent',
-                           'Qualifier',
-                           'GUID',
-                           'TaxonID',
-                           'CollectionObjectID',
-                           'ModifiedByAgentID',
-                           'CreatedByAgentID',
-                           'PreferredTaxonID'
-                           ]
-            value_list = [f"{time_utils.get_pst_time_now_string()}",
-                          f"{time_utils.get_pst_time_now_string()}",
-                          1,
-                          4,
-                          1,
-                          True,
-                          f"{self.qualifier}",
-                          f"{self.determination_guid}",
-                          f"{self.taxon_id}",
-                          f"{self.collection_ob_id}",
-                          f"{self.created_by_agent}",
-                          f"{self.created_by_agent}",
-                          f"{self.taxon_id}"
-                          ]
-
-            # removing na values from both lists
-            value_list, column_list = remove_two_index(value_list, column_list)
+        determination = self.determination_row(f"{self.collection_ob_id}")
+        if determination is not None:
+            column_list, value_list = determination
 
             sql_statement = self.sql_csv_tools.create_insert_statement(tab_name='determination', col_list=column_list,
                                                              val_list=value_list)
@@ -782,6 +882,44 @@ class PicturaeImporter(Importer):
         else:
             self.logger.error(f"failed to add determination , missing taxon for {self.full_name}")
 
+    def collector_row(self, index, agent_id, collecting_event_id):
+        """collector_row:
+               column and value lists for one collector record.
+           args:
+                index: position of the collector in full_collector_list, the first is primary
+                agent_id: AgentID of the collector, or a GuidRef to a new agent
+                collecting_event_id: CollectingEventID of the row's collecting event, or a GuidRef to it
+        """
+        is_primary = True if index == 0 else False
+        order_number = index  # auto-increment by index
+
+        column_list = ['TimestampCreated',
+                       'TimestampModified',
+                       'Version',
+                       'IsPrimary',
+                       'OrderNumber',
+                       'ModifiedByAgentID',
+                       'CreatedByAgentID',
+                       'CollectingEventID',
+                       'DivisionID',
+                       'AgentID']
+
+        value_list = [f"{time_utils.get_pst_time_now_string()}",
+                      f"{time_utils.get_pst_time_now_string()}",
+                      1,
+                      is_primary,
+                      order_number,
+                      f"{self.created_by_agent}",
+                      f"{self.created_by_agent}",
+                      collecting_event_id,
+                      2,
+                      agent_id]
+
+        # removing na values from both lists
+
+        value_list, column_list = remove_two_index(value_list, column_list)
+
+        return column_list, value_list
 
     def create_collector(self):
         """create_collector:
@@ -795,9 +933,6 @@ class PicturaeImporter(Importer):
 
         for index, agent_dict in enumerate(self.full_collector_list):
 
-            is_primary = True if index == 0 else False
-            order_number = index  # auto-increment by index
-
             agent_id = agent_dict['agent_id']
 
             if agent_id != '' and pd.notna(agent_id):
@@ -809,31 +944,7 @@ class PicturaeImporter(Importer):
                                                               middle_initial=agent_dict["collector_middle_initial"],
                                                               title=agent_dict["collector_title"])
 
-            column_list = ['TimestampCreated',
-                           'TimestampModified',
-                           'Version',
-                           'IsPrimary',
-                           'OrderNumber',
-                           'ModifiedByAgentID',
-                           'CreatedByAgentID',
-                           'CollectingEventID',
-                           'DivisionID',
-                           'AgentID']
-
-            value_list = [f"{time_utils.get_pst_time_now_string()}",
-                          f"{time_utils.get_pst_time_now_string()}",
-                          1,
-                          is_primary,
-                          order_number,
-                          f"{self.created_by_agent}",
-                          f"{self.created_by_agent}",
-                          f"{self.collecting_event_id}",
-                          2,
-                          f"{agent_id}"]
-
-            # removing na values from both lists
-
-            value_list, column_list = remove_two_index(value_list, column_list)
+            column_list, value_list = self.collector_row(index, f"{agent_id}", f"{self.collecting_event_id}")
 
             sql_statement = self.sql_csv_tools.create_insert_statement(tab_name='collector', col_list=column_list,
                                                                        val_list=value_list)
@@ -852,7 +963,7 @@ class PicturaeImporter(Importer):
                 none
         """
         lower_list = [image_path.lower() for image_path in self.image_list]
-        folder_paths = set([os.path.dirname(img_path) for img_path in self.image_list])
+        folder_paths = self.image_folders()
         for folder_path in folder_paths:
             for file_name in os.listdir(folder_path):
                 file_path = os.path.join(folder_path, file_name)
@@ -861,6 +972,13 @@ class PicturaeImporter(Importer):
                     new_file_path = os.path.join(folder_path, new_file_name)
                     os.rename(file_path, new_file_path)
 
+    def image_folders(self):
+        """image_folders:
+                folders of the images to upload, and of images dropped with a rolled back chunk,
+                so those folders still get hidden and unhidden
+        """
+        return set([os.path.dirname(img_path) for img_path in self.image_list + self.failed_image_list])
+
     def unhide_files(self):
         """unhide_files:
                 Will directly undo the result of hide_unwanted_files.
@@ -870,7 +988,7 @@ class PicturaeImporter(Importer):
            returns:
                 none
         """
-        folder_paths = set([os.path.dirname(img_path) for img_path in self.image_list])
+        folder_paths = self.image_folders()
 
         for folder_path in folder_paths:
             prefix = ".hidden_"
@@ -884,10 +1002,37 @@ class PicturaeImporter(Importer):
                     # Rename the file
                     os.rename(old_file_path, new_file_path)
 
+    def prepare_row(self, row):
+        """prepare_row:
+               row level set-up shared by both upload modes: populates the row fields,
+               marks the barcode present, builds the collector lists and resolves (or creates) the taxon.
+           args:
+                row: a row from the record_full dataframe
+        """
+        self.populate_fields(row)
+
+        # updating barcode present
+        self.record_full.loc[self.record_full['CatalogNumber'] == self.raw_barcode, 'barcode_present'] = True
+
+        self.create_agent_list(row)
+
+        if not self.taxon_id or pd.isna(self.taxon_id):
+            # Drive TaxonomyImporter off the current row
+            self.tax_importer.populate_fields(row)
+
+            if not self.tax_importer.taxon_id or pd.isna(self.tax_importer.taxon_id):
+                self.tax_importer.populate_taxon()
+                if self.tax_importer.taxon_list:
+                    self.tax_importer.create_taxon()
+
+            self.taxon_id = self.tax_importer.taxon_id
+            self.new_taxa.extend(self.tax_importer.new_taxa)
+
     def upload_records(self):
         """upload_records:
                an ensemble function made up of all row level, and database functions,
-               loops through each row of the csv, updates the global values, and creates new table records
+               loops through each row of the csv, updates the global values, and creates new table records.
+               With BULK_RECORD_UPLOAD set in the config, rows are loaded in chunks by upload_records_bulk.
            args:
                 none
             returns:
@@ -897,28 +1042,14 @@ class PicturaeImporter(Importer):
 
         self.record_full = self.record_full.drop_duplicates(subset=['CatalogNumber'])
 
+        if getattr(self.picturae_config, 'BULK_RECORD_UPLOAD', False):
+            self.upload_records_bulk()
+            return
+
         for row in self.record_full.itertuples(index=False):
             if row.CatalogNumber in self.barcode_list:
 
-                self.populate_fields(row)
-
-                # updating barcode present
-                self.record_full.loc[self.record_full['CatalogNumber'] == self.raw_barcode, 'barcode_present'] = True
-
-                self.create_agent_list(row)
-
-                if not self.taxon_id or pd.isna(self.taxon_id):
-                    # Drive TaxonomyImporter off the current row
-                    self.tax_importer.populate_fields(row)
-
-                    if not self.tax_importer.taxon_id or pd.isna(self.tax_importer.taxon_id):
-                        self.tax_importer.populate_taxon()
-                        if self.tax_importer.taxon_list:
-                            self.tax_importer.create_taxon()
-
-                    self.taxon_id = self.tax_importer.taxon_id
-                    self.new_taxa.extend(self.tax_importer.new_taxa)
-
+                self.prepare_row(row)
 
                 self.create_locality_record()
 
@@ -937,6 +1068,153 @@ class PicturaeImporter(Importer):
             else:
                 pass
 
+    def upload_records_bulk(self):
+        """upload_records_bulk:
+               set based version of the upload_records loop. Rows are prepared one at a time as before,
+               but their records are staged per table and written a chunk of BULK_RECORD_CHUNK_SIZE
+               sheets at a time by upload_chunk. New taxa are created by TaxonomyImporter on its own
+               connection while a chunk is staged, so they are outside the chunk's rollback: a rolled
+               back chunk leaves its taxa in the tree, and only drops them from new_taxa.
+        """
+        chunk_size = max(1, getattr(self.picturae_config, 'BULK_RECORD_CHUNK_SIZE', DEFAULT_BULK_RECORD_CHUNK_SIZE))
+
+        rows = [row for row in self.record_full.itertuples(index=False) if row.CatalogNumber in self.barcode_list]
+
+        for start in range(0, len(rows), chunk_size):
+            chunk = rows[start:start + chunk_size]
+            taxa_before = set(self.new_taxa)
+            try:
+                self.upload_chunk(chunk)
+            except Exception as e:
+                barcodes = [row.CatalogNumber for row in chunk]
+                self.logger.error(f"chunk of {len(chunk)} records starting at {barcodes[0]} rolled back: {e}")
+                self.drop_rolled_back_barcodes(barcodes, new_taxa=set(self.new_taxa) - taxa_before)
+
+    def drop_rolled_back_barcodes(self, barcodes, new_taxa=()):
+        """drop_rolled_back_barcodes:
+               takes the sheets of a rolled back chunk out of the batch. Their images leave image_list,
+               so upload_attachments hides them rather than letting BotanyImporter create skeleton
+               records for collection objects that were never written. The taxa created while staging
+               the chunk were committed already and stay in the tree, but are no longer counted as
+               new taxa of the batch.
+           args:
+                barcodes: catalog numbers of the rolled back chunk
+                new_taxa: names of the taxa created while staging it
+        """
+        failed_rows = self.record_full['CatalogNumber'].isin(barcodes)
+        self.record_full.loc[failed_rows, 'barcode_present'] = False
+        failed_images = set(self.record_full.loc[failed_rows, 'image_path'].astype(str))
+        failed_barcodes = set(barcodes)
+        self.barcode_list = [barcode for barcode in self.barcode_list if barcode not in failed_barcodes]
+        self.image_list = [image_path for image_path in self.image_list if image_path not in failed_images]
+        self.failed_image_list.extend(sorted(failed_images))
+        if new_taxa:
+            self.new_taxa = [name for name in self.new_taxa if name not in new_taxa]
+            self.logger.warning(f"taxa created for the rolled back records stay in the tree: {sorted(new_taxa)}")
+        self.logger.warning(f"{len(failed_images)} images of the rolled back records will not be uploaded")
+
+    def stage_chunk(self, rows):
+        """stage_chunk:
+               prepares each row and collects its records as {table: [(column_list, value_list), ...]}.
+               Foreign keys to records created in the same chunk are GuidRef placeholders;
+               a new agent named in several rows is staged once.
+           args:
+                rows: record_full rows to stage
+        """
+        staged = defaultdict(list)
+        new_agent_guids = {}
+
+        for row in rows:
+            self.prepare_row(row)
+            self.resolve_collection_object_taxon()
+
+            for name_dict in self.new_collector_list:
+                name_key = collector_name_key(name_dict)
+                if name_key not in new_agent_guids:
+                    new_agent_guids[name_key] = str(uuid4())
+                    staged['agent'].append(self.agent_row(name_dict, new_agent_guids[name_key]))
+
+            locality_ref = GuidRef('locality', self.locality_guid)
+            collecting_event_ref = GuidRef('collectingevent', self.collecting_event_guid)
+
+            staged['locality'].append(self.locality_row())
+
+            locality_detail = self.locality_detail_row(locality_ref)
+            if locality_detail is not None:
+                staged['localitydetail'].append(locality_detail)
+
+            staged['collectingevent'].append(self.collecting_event_row(locality_ref))
+
+            staged['collectionobject'].append(self.collection_object_row(collecting_event_ref))
+
+            determination = self.determination_row(GuidRef('collectionobject', self.collection_ob_guid))
+            if determination is not None:
+                staged['determination'].append(determination)
+            else:
+                self.logger.error(f"failed to add determination , missing taxon for {self.full_name}")
+
+            for index, agent_dict in enumerate(self.full_collector_list):
+                agent_id = agent_dict['agent_id']
+                if agent_id == '' or pd.isna(agent_id):
+                    name_key = collector_name_key(agent_dict)
+                    if name_key in new_agent_guids:
+                        agent_id = GuidRef('agent', new_agent_guids[name_key])
+                    else:
+                        agent_id = self.sql_csv_tools.check_agent_name_sql(
+                            first_name=agent_dict["collector_first_name"],
+                            last_name=agent_dict["collector_last_name"],
+                            middle_initial=agent_dict["collector_middle_initial"],
+                            title=agent_dict["collector_title"])
+                staged['collector'].append(self.collector_row(index, agent_id, collecting_event_ref))
+
+        return staged
+
+    def upload_chunk(self, rows):
+        """upload_chunk:
+               stages rows, then inserts every table with executemany in dependency order inside one
+               transaction. After each referenced table is written its GUIDs are mapped to IDs with one
+               query, and the GuidRef placeholders of later tables are filled in from that map.
+               Any failure rolls back the whole chunk.
+           args:
+                rows: record_full rows to upload
+        """
+        staged = self.stage_chunk(rows)
+        resolved_ids = {}
+
+        with self.sql_csv_tools.transaction():
+            for tab_name in BULK_TABLE_ORDER:
+                self.insert_staged(tab_name, staged.get(tab_name, []), resolved_ids)
+
+                id_col = BULK_GUID_ID_COLUMNS.get(tab_name)
+                if id_col is None or not staged.get(tab_name):
+                    continue
+                guids = [values[columns.index('GUID')] for columns, values in staged[tab_name]]
+                resolved_ids[tab_name] = self.sql_csv_tools.get_ids_by_guid(tab_name=tab_name, id_col=id_col,
+                                                                            guids=guids)
+                missing = len(set(guids)) - len(resolved_ids[tab_name])
+                if missing:
+                    raise ValueError(f"{missing} new {tab_name} records not found by GUID")
+
+        self.logger.info(f"uploaded {len(rows)} records in bulk")
+
+    def insert_staged(self, tab_name, staged_rows, resolved_ids):
+        """insert_staged:
+               fills GuidRef placeholders from resolved_ids and inserts the rows of one table,
+               one executemany per distinct column list (na values are dropped per row, so rows can differ).
+           args:
+                tab_name: table to insert into
+                staged_rows: list of (column_list, value_list)
+                resolved_ids: {table: {guid: id}} for tables already written in this chunk
+        """
+        grouped = defaultdict(list)
+        for column_list, value_list in staged_rows:
+            values = [resolved_ids[value.table][value.guid] if isinstance(value, GuidRef) else value
+                      for value in value_list]
+            grouped[tuple(column_list)].append(values)
+
+        for column_list, rows in grouped.items():
+            self.sql_csv_tools.insert_many(tab_name=tab_name, col_list=list(column_list), rows=rows)
+
     def upload_attachments(self):
         """upload_attachments:
                 this function runs Botany importer
@@ -996,11 +1274,16 @@ class PicturaeImporter(Importer):
 
         os.remove(self.file_path)
 
+        lookup_cache_stats = self.sql_csv_tools.lookup_cache_stats()
+        if lookup_cache_stats:
+            self.logger.info(f"lookup cache: {lookup_cache_stats}")
+
         if self.picturae_config.MAILING_LIST:
             image_dict = self.botany_importer.image_client.imported_files
             value_list = [len(self.new_taxa)]
             self.image_client.monitoring_tools.send_monitoring_report(subject=f"PIC_Batch{time_utils.get_pst_time_now_string()}",
                                                                       image_dict=image_dict,
-                                                                      value_list=value_list)
+                                                                      value_list=value_list,
+                                                                      extra_terms=lookup_cache_stats)
 
         self.logger.info("process finished")
\ No newline at end of file
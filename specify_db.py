@@ -1,4 +1,4 @@
-from db_utils import DbUtils
+from db_utils import DbUtils, DEFAULT_POOL_SIZE
 import logging
 
 class SpecifyDb(DbUtils):
@@ -10,4 +10,5 @@ class SpecifyDb(DbUtils):
             db_config_class.PASSWORD,
             db_config_class.SPECIFY_DATABASE_PORT,
             db_config_class.SPECIFY_DATABASE_HOST,
-            db_config_class.SPECIFY_DATABASE)
+            db_config_class.SPECIFY_DATABASE,
+            pool_size=getattr(db_config_class, 'DB_POOL_SIZE', DEFAULT_POOL_SIZE))
@@ -1,3 +1,4 @@
+import re
 import traceback
 import logging
 from dataclasses import dataclass
@@ -7,9 +8,14 @@ from typing import Union, Optional, List, Sequence, Any
 import pandas as pd
 from specify_db import SpecifyDb
 from gen_import_utils import remove_two_index
+from lookup_cache import LookupCache, MISSING
 import time_utils
 import string_utils
 
+# table written by an INSERT/UPDATE/DELETE statement, for lookup cache invalidation
+WRITTEN_TABLE_REGEX = re.compile(r"^\s*(?:INSERT\s+(?:IGNORE\s+)?INTO|REPLACE\s+INTO|UPDATE|DELETE\s+FROM)\s+`?(\w+)`?",
+                                 re.IGNORECASE)
+
 
 class DatabaseConnectionError(Exception):
     pass
@@ -27,6 +33,15 @@ class SqlCsvTools:
         self.specify_db_connection = SpecifyDb(db_config_class=self.config)
         self.logger = logging.getLogger(f"Client.{self.__class__.__name__}")
         self.logger.setLevel(logging_level)
+        # opt-in: LOOKUP_CACHE_SIZE > 0 caches get_one_match results, shared by instances on the same database
+        cache_size = getattr(self.config, 'LOOKUP_CACHE_SIZE', 0) or 0
+        if cache_size > 0:
+            database_key = (getattr(self.config, 'SPECIFY_DATABASE_HOST', None),
+                            getattr(self.config, 'SPECIFY_DATABASE_PORT', None),
+                            getattr(self.config, 'SPECIFY_DATABASE', None))
+            self.lookup_cache = LookupCache.shared(database_key, cache_size)
+        else:
+            self.lookup_cache = None
         self.check_db_connection()
 
     def check_db_connection(self):
@@ -250,10 +265,35 @@ class SqlCsvTools:
                         key_col: column on which to match values
                         match: value with which to match key_col
         """
+        cache_key = (tab_name, id_col, key_col, match)
+        if self.lookup_cache is not None:
+            result = self.lookup_cache.get(cache_key)
+            if result is not MISSING:
+                return result
+
         sql = f"SELECT {id_col} FROM {tab_name} WHERE `{key_col}` = %s;"
         result = self.get_record(sql, params=(match,))
+
+        if self.lookup_cache is not None:
+            self.lookup_cache.put(cache_key, result)
         return result
 
+    def invalidate_lookups(self, tab_name=None):
+        """drops cached get_one_match results for tab_name, or all of them without one"""
+        if self.lookup_cache is not None:
+            self.lookup_cache.invalidate(tab_name)
+
+    def _invalidate_written_table(self, sql):
+        """invalidates the lookups for the table an insert/update/delete statement writes to"""
+        if self.lookup_cache is None:
+            return
+        written = WRITTEN_TABLE_REGEX.match(sql)
+        self.invalidate_lookups(written.group(1) if written else None)
+
+    def lookup_cache_stats(self):
+        """hit/miss counters of the lookup cache, empty when it is off"""
+        return self.lookup_cache.stats() if self.lookup_cache is not None else {}
+
     def create_insert_statement(self, col_list: list, val_list: list, tab_name: str):
         """create_sql_string:
                creates a new sql insert statement given a list of db columns,
@@ -277,7 +317,10 @@ class SqlCsvTools:
                    args:
                        sql: the verbatim sql string, or multi sql query string to send to database
                        params: params to pass to sql command
+                   returns:
+                       the new row's auto-increment id (cursor.lastrowid), None if the insert failed
         """
+        self._invalidate_written_table(sql)
         cursor = self.get_cursor()
         try:
             if params is not None:
@@ -288,11 +331,46 @@ class SqlCsvTools:
                 cursor.execute(sql)
 
             self.commit()
+            return cursor.lastrowid
         except Exception:
             self.logger.error(traceback.format_exc())
+            return None
         finally:
             cursor.close()
 
+    def transaction(self):
+        """block whose inserts commit together or roll back together, see DbUtils.transaction"""
+        return self.specify_db_connection.transaction()
+
+    def insert_many(self, tab_name: str, col_list: list, rows: list):
+        """inserts rows (value lists in col_list order) with one executemany.
+           Unlike insert_table_record errors are raised, so an enclosing transaction rolls back.
+        """
+        if not rows:
+            return
+        sql = self.create_insert_statement(col_list=col_list, val_list=col_list, tab_name=tab_name).sql
+        self.logger.debug(f"running query - {sql} for {len(rows)} rows")
+        self.invalidate_lookups(tab_name)
+        cursor = self.get_cursor()
+        try:
+            cursor.executemany(sql, [tuple(row) for row in rows])
+            self.commit()
+        finally:
+            cursor.close()
+
+    def get_ids_by_guid(self, tab_name: str, id_col: str, guids, chunk_size=500):
+        """maps each GUID to its row's id_col with one query per chunk_size GUIDs;
+           GUIDs not found are left out"""
+        guids = list(dict.fromkeys(str(guid) for guid in guids))
+        ids = {}
+        for start in range(0, len(guids), chunk_size):
+            chunk = guids[start:start + chunk_size]
+            placeholders = ", ".join(["%s"] * len(chunk))
+            sql = f"SELECT GUID, {id_col} FROM {tab_name} WHERE GUID IN ({placeholders});"
+            for guid, record_id in self.get_records(sql, params=chunk):
+                ids[guid] = record_id
+        return ids
+
     def create_batch_record(
         self,
         start_time: datetime,
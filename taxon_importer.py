@@ -1,14 +1,16 @@
 import pandas as pd
 import numpy as np
-from taxon_parse_utils import remove_qualifiers
+from taxon_parse_utils import remove_qualifiers, remove_qualifiers_series
 from string_utils import str_to_bool
 import logging
 from sql_csv_utils import SqlCsvTools
+from taxon_index import TaxonIndex
 from get_configs import get_config
 import argparse
 import sys
 from datetime import datetime
 from taxon_tools.BOT_TNRS import process_taxon_resolve
+from taxon_tools.tnrs_client import TnrsClient
 from gen_import_utils import unique_ordered_list, remove_two_index
 import time_utils
 from uuid import uuid4
@@ -43,6 +45,38 @@ class TaxonomyImporter:
         self.sql_csv_tools = SqlCsvTools(config=self.config, logging_level=self.logger.getEffectiveLevel())
         self.tnrs_ignore = tnrs_ignore
 
+        # loaded on first use when PRELOAD_TAXON_INDEX is set, see get_taxon_index
+        self.taxon_index = None
+
+        # created on first use from the TNRS_* settings, see get_tnrs_client
+        self.tnrs_client = None
+
+    def get_tnrs_client(self):
+        """the TnrsClient shared by batch resolution and author lookups"""
+        if self.tnrs_client is None:
+            self.tnrs_client = TnrsClient.from_config(self.config)
+        return self.tnrs_client
+
+    def get_taxon_index(self):
+        """the preloaded TaxonIndex, or None when PRELOAD_TAXON_INDEX is off"""
+        if self.taxon_index is None and getattr(self.config, 'PRELOAD_TAXON_INDEX', False):
+            self.taxon_index = TaxonIndex.from_database(self.sql_csv_tools)
+        return self.taxon_index
+
+    def taxon_get(self, name, hybrid=False, taxname=None):
+        """SqlCsvTools.taxon_get, answered from the taxon index when it is on"""
+        taxon_index = self.get_taxon_index()
+        if taxon_index is not None:
+            return taxon_index.taxon_get(name=name, hybrid=hybrid, taxname=taxname)
+        return self.sql_csv_tools.taxon_get(name=name, hybrid=hybrid, taxname=taxname)
+
+    def is_taxon_redacted(self, taxon_id):
+        """SqlCsvTools.get_is_taxon_id_redacted, answered from the taxon index when it is on"""
+        taxon_index = self.get_taxon_index()
+        if taxon_index is not None:
+            return taxon_index.is_redacted(taxon_id)
+        return self.sql_csv_tools.get_is_taxon_id_redacted(taxon_id=taxon_id)
+
 
     def normalize_schema(self):
         """
@@ -183,6 +217,76 @@ class TaxonomyImporter:
 
         return str(gen_spec), str(full_name), str(first_intra), str(tax_name), str(hybrid_base)
 
+    def taxon_concat_columns(self):
+        """taxon_concat_columns:
+                taxon_concat for the whole of record_full at once, built from pandas string ops and
+                masks instead of a python call per row. Gives the same gen_spec, fullname, first_intra,
+                taxname and hybrid_base strings; rows with no genus, species or epithet get
+                'missing taxon in row' in all five, as the row-wise ValueError did once expanded.
+            returns:
+                dataframe with the columns gen_spec, fullname, first_intra, taxname, hybrid_base
+        """
+        frame = self.record_full
+        empty = pd.Series('', index=frame.index, dtype=object)
+
+        present = {}
+        text = {}
+        for column in ['Genus', 'Species', 'Rank 1', 'Epithet 1', 'Rank 2', 'Epithet 2']:
+            values = frame[column]
+            present[column] = (values.notna() & (values != '')).fillna(False).astype(bool)
+            text[column] = values.astype(object).where(present[column], '').astype(str)
+
+        def concat(columns, base):
+            for column in columns:
+                base = base + (' ' + text[column]).where(present[column], '')
+            return base
+
+        gen_spec_raw = concat(['Genus', 'Species'], empty)
+        first_intra_raw = concat(['Rank 1', 'Epithet 1'], gen_spec_raw)
+        full_name_raw = concat(['Rank 2', 'Epithet 2'], first_intra_raw)
+
+        gen_spec = gen_spec_raw.str.strip()
+        first_intra = first_intra_raw.str.strip()
+        full_name = full_name_raw.str.strip()
+
+        # taxname is the lowest rank present, without qualifiers
+        tax_name = empty
+        for column in ['Genus', 'Species', 'Epithet 1', 'Epithet 2']:
+            tax_name = text[column].where(present[column], tax_name)
+        tax_name = remove_qualifiers_series(tax_name)
+        missing_taxon = ~(present['Genus'] | present['Species'] | present['Epithet 1'] | present['Epithet 2'])
+
+        hybrid_base = empty
+        is_hybrid = frame['Hybrid'].eq(True) & ~missing_taxon
+        if is_hybrid.any():
+            taxon_strings = remove_qualifiers_series(full_name).str.split()
+            has_rank = (full_name.str.contains("var.", regex=False) | full_name.str.contains("subsp.", regex=False) |
+                        full_name.str.contains(" f.", regex=False) | full_name.str.contains("subf.", regex=False))
+            genus = text['Genus']
+            same_length = first_intra.str.len() == full_name.str.len()
+
+            whole_name = is_hybrid & (first_intra == full_name)
+            rank_base = whole_name & has_rank
+            species_base = whole_name & ~has_rank & (full_name != genus) & (full_name == gen_spec)
+            genus_base = whole_name & ~has_rank & ~species_base & (full_name == genus)
+            not_found = whole_name & ~(rank_base | species_base | genus_base)
+            intra_base = is_hybrid & ~same_length & has_rank
+
+            new_full_name = full_name.copy()
+            new_full_name[rank_base] = taxon_strings[rank_base].str[:2].str.join(" ")
+            new_full_name[species_base] = taxon_strings[species_base].str[0]
+            new_full_name[intra_base] = taxon_strings[intra_base].str[:4].str.join(" ")
+            hybrid_base = full_name.where(rank_base | species_base | genus_base | intra_base, '')
+            full_name = new_full_name
+
+            for _ in range(int(not_found.sum())):
+                self.logger.error('hybrid base not found')
+
+        result = pd.DataFrame({'gen_spec': gen_spec, 'fullname': full_name, 'first_intra': first_intra,
+                               'taxname': tax_name, 'hybrid_base': hybrid_base}, index=frame.index)
+        result.loc[missing_taxon, :] = 'missing taxon in row'
+        return result
+
     def missing_data_masks(self):
         """
         Taxonomy-only masks (subset of original):
@@ -225,15 +329,18 @@ class TaxonomyImporter:
         """parses and cleans dataframe columns until ready for upload.
             runs dependent function taxon concat
         """
-        # converting hybrid column to true boolean
-        self.record_full['Hybrid'] = self.record_full['Hybrid'].apply(str_to_bool)
+        # converting hybrid column to true boolean, as str_to_bool does per value
+        self.record_full['Hybrid'] = self.record_full['Hybrid'].astype(str).str.lower().isin(['true', 't'])
 
         # removing leading and trailing space from taxa
         tax_cols = ['Genus', 'Species', 'Rank 1', 'Epithet 1', 'Rank 2', 'Epithet 2', 'Author', 'Family']
         existing_tax_cols = [c for c in tax_cols if c in self.record_full.columns]
-        self.record_full[existing_tax_cols] = self.record_full[existing_tax_cols].map(
-            lambda x: x.strip() if isinstance(x, str) else x
-        )
+        for column in existing_tax_cols:
+            values = self.record_full[column]
+            if isinstance(values.dtype, pd.StringDtype):
+                self.record_full[column] = values.str.strip()
+            else:
+                self.record_full[column] = values.map(lambda x: x.strip() if isinstance(x, str) else x)
 
         # filling in missing subtaxa ranks for first infraspecific rank
         self.record_full['missing_rank'] = (pd.isna(self.record_full[f'Rank 1']) & pd.notna(
@@ -251,8 +358,7 @@ class TaxonomyImporter:
         # parsing taxon columns into derived strings
         self.record_full[['gen_spec', 'fullname',
                           'first_intra',
-                          'taxname', 'hybrid_base']] = self.record_full.apply(self.taxon_concat,
-                                                                              axis=1, result_type='expand')
+                          'taxname', 'hybrid_base']] = self.taxon_concat_columns()
 
         # Keep strings for taxonomy columns; avoid global dtype casting to prevent side-effects
         for col in ['gen_spec', 'fullname', 'first_intra', 'taxname', 'hybrid_base']:
@@ -261,7 +367,7 @@ class TaxonomyImporter:
 
     def taxon_process_row(self, row):
         """applies taxon_get to a row of the picturae python dataframe"""
-        taxon_id = self.sql_csv_tools.taxon_get(
+        taxon_id = self.taxon_get(
                         name=row['fulltaxon'],
                         hybrid=str_to_bool(row['Hybrid']),
                         taxname=row['taxname']
@@ -269,7 +375,7 @@ class TaxonomyImporter:
         # Check for new genus to verify family assignment
         new_genus = False
         if taxon_id is None:
-            genus_id = self.sql_csv_tools.taxon_get(
+            genus_id = self.taxon_get(
                 name=row['Genus'],
                 hybrid=str_to_bool(row['Hybrid']),
                 taxname=row['taxname']
@@ -291,19 +397,16 @@ class TaxonomyImporter:
         """
         col_list = ['Genus', 'Species', 'Rank 1', 'Epithet 1', 'Rank 2', 'Epithet 2']
 
-        # Build fulltaxon
-        self.record_full['fulltaxon'] = (
-            self.record_full[col_list].fillna('')
-            .apply(lambda x: ' '.join(x[x != '']), axis=1)
-            .str.strip()
-        )
+        # Build fulltaxon: the non-empty taxon columns joined by spaces
+        fulltaxon = pd.Series('', index=self.record_full.index, dtype=object)
+        for col in col_list:
+            values = self.record_full[col].fillna('').astype(str)
+            fulltaxon = fulltaxon + (' ' + values).where(values != '', '')
+        fulltaxon = fulltaxon.str.strip()
 
         # If empty or "missing taxon", fall back to Family
-        self.record_full['fulltaxon'] = self.record_full.apply(
-            lambda row: row['Family'] if (not row['fulltaxon'] or 'missing taxon' in row['fulltaxon'])
-            else row['fulltaxon'],
-            axis=1
-        )
+        use_family = (fulltaxon == '') | fulltaxon.str.contains('missing taxon', regex=False)
+        self.record_full['fulltaxon'] = fulltaxon.where(~use_family, self.record_full['Family'])
 
         # take the first occurrence of Hybrid/taxname/Genus per fulltaxon
         key_df = (
@@ -358,7 +461,7 @@ class TaxonomyImporter:
 
         elif len(bar_tax) >= 1:
             bar_tax = bar_tax[['CatalogNumber', 'fullname']]
-            resolved_taxon = iterate_taxon_resolve(bar_tax)
+            resolved_taxon = iterate_taxon_resolve(bar_tax, client=self.get_tnrs_client())
             resolved_taxon.fillna({'overall_score': 0}, inplace=True)
             resolved_taxon = resolved_taxon.drop(columns=["fullname", "unmatched_terms"])
 
@@ -410,7 +513,7 @@ class TaxonomyImporter:
 
         # pulling new tax IDs for corrected missing ranks
         self.record_full.loc[rank_mask, 'taxon_id'] = self.record_full.loc[rank_mask, 'fullname'].apply(
-            self.sql_csv_tools.taxon_get)
+            self.taxon_get)
 
         if self.tnrs_ignore is False:
             self.flag_tnrs_rows()
@@ -508,7 +611,7 @@ class TaxonomyImporter:
 
         # running taxonomic names through TNRS
 
-        resolved_taxon = process_taxon_resolve(taxon_frame)
+        resolved_taxon = process_taxon_resolve(taxon_frame, client=self.get_tnrs_client())
 
         taxon_list = list(resolved_taxon['matched_name_author'])
 
@@ -558,16 +661,16 @@ class TaxonomyImporter:
         self.taxon_list = []
 
         if self.is_hybrid is False and self.full_name == "missing taxon in row":
-            self.taxon_id = self.sql_csv_tools.taxon_get(name=self.family_name)
+            self.taxon_id = self.taxon_get(name=self.family_name)
             # will need to add a condition for project V2 to extract name for order or division
             if not self.taxon_id or pd.isna(self.taxon_id):
                 raise ValueError(f"Family {self.family_name} not present in taxon tree")
                 # self.taxon_list.append(self.family_name)
 
         elif not self.is_hybrid and self.full_name != "missing taxon in row":
-            self.taxon_id = self.sql_csv_tools.taxon_get(name=self.full_name)
+            self.taxon_id = self.taxon_get(name=self.full_name)
         else:
-            self.taxon_id = self.sql_csv_tools.taxon_get(name=self.full_name,
+            self.taxon_id = self.taxon_get(name=self.full_name,
                                                          taxname=self.tax_name, hybrid=True)
 
         # append taxon full name
@@ -577,12 +680,12 @@ class TaxonomyImporter:
 
             # check base name if base name differs e.g. if var. or subsp.
             if self.full_name != self.first_intra and self.first_intra != self.gen_spec:
-                self.first_intra_id = self.sql_csv_tools.taxon_get(name=self.first_intra)
+                self.first_intra_id = self.taxon_get(name=self.first_intra)
                 if not self.first_intra_id or pd.isna(self.first_intra):
                     self.taxon_list.append(self.first_intra)
 
             if self.full_name != self.gen_spec and self.gen_spec != self.genus:
-                self.gen_spec_id = self.sql_csv_tools.taxon_get(name=self.gen_spec)
+                self.gen_spec_id = self.taxon_get(name=self.gen_spec)
                 # check high taxa gen_spec for author
                 self.taxa_author_tnrs(taxon_name=self.gen_spec, barcode=self.barcode)
                 # adding base name to taxon_list
@@ -592,7 +695,7 @@ class TaxonomyImporter:
                 # base value for gen spec id is set as None so will work either way.
                 # checking for genus id
             if self.full_name != self.genus:
-                self.genus_id = self.sql_csv_tools.taxon_get(name=self.genus)
+                self.genus_id = self.taxon_get(name=self.genus)
                 # adding genus name if missing
                 if not self.genus_id or pd.isna(self.genus_id):
                     self.taxon_list.append(self.genus)
@@ -610,7 +713,7 @@ class TaxonomyImporter:
                        iterrated through from highest to lowest rank"""
         taxon_guid = uuid4()
         rank_name = taxon
-        parent_id = self.sql_csv_tools.taxon_get(name=self.parent_list[index + 1])
+        parent_id = self.taxon_get(name=self.parent_list[index + 1])
         if taxon == self.full_name:
             rank_end = self.tax_name
         else:
@@ -655,7 +758,8 @@ class TaxonomyImporter:
             author_insert, tree_item_id, rank_end, \
                 parent_id, taxon_guid, rank_id = self.generate_taxon_fields(index=index, taxon=taxon)
 
-            if self.sql_csv_tools.get_is_taxon_id_redacted(taxon_id=parent_id):
+            parent_redacted = self.is_taxon_redacted(taxon_id=parent_id)
+            if parent_redacted:
                 self.redacted = True
 
             column_list = ['TimestampCreated',
@@ -698,7 +802,15 @@ class TaxonomyImporter:
             sql_statement = self.sql_csv_tools.create_insert_statement(tab_name="taxon", col_list=column_list,
                                                                        val_list=value_list)
 
-            self.sql_csv_tools.insert_table_record(sql=sql_statement.sql, params=sql_statement.params)
+            new_taxon_id = self.sql_csv_tools.insert_table_record(sql=sql_statement.sql, params=sql_statement.params)
+
+            if self.taxon_index is not None:
+                if not new_taxon_id:
+                    new_taxon_id = self.sql_csv_tools.get_one_match(tab_name='taxon', id_col='TaxonID',
+                                                                    key_col='GUID', match=f"{taxon_guid}")
+                if new_taxon_id:
+                    self.taxon_index.add(taxon_id=new_taxon_id, full_name=taxon, parent_id=parent_id,
+                                         rank_id=rank_id, redacted=parent_redacted)
 
             logging.info(f"taxon: {taxon} created")
 
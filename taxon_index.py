@@ -0,0 +1,118 @@
+"""Docstring: in-memory index of the Specify taxon tree for TaxonomyImporter lookups."""
+import logging
+from array import array
+
+DEFAULT_FETCH_SIZE = 10000
+
+# stored for a missing ParentID/RankID; Specify ids start at 1
+NO_ID = 0
+
+
+class TaxonIndex:
+    """taxon (TaxonID, FullName, ParentID, RankID) and vtaxon2.RedactLocality, loaded once.
+
+    Ids, parent ids and rank ids are kept in parallel arrays; names map lowercased FullName to
+    the row position, the way the case-insensitive `FullName = %s` lookup matches. When a name
+    occurs more than once, the first row loaded wins. taxon_get() answers like
+    SqlCsvTools.taxon_get, including the subsp./var. swap and the hybrid LIKE match, and add()
+    keeps the index current as TaxonomyImporter creates taxa.
+    """
+
+    def __init__(self):
+        self.logger = logging.getLogger(f'Client.{self.__class__.__name__}')
+        self.taxon_ids = array('q')
+        self.parent_ids = array('q')
+        self.rank_ids = array('q')
+        self.full_names = []
+        self.name_positions = {}
+        self.id_positions = {}
+        self.redacted_ids = set()
+        self.hybrid_matches = {}
+
+    @classmethod
+    def from_database(cls, sql_tools, fetch_size=DEFAULT_FETCH_SIZE):
+        """streams both tables through an unbuffered cursor, fetch_size rows at a time"""
+        index = cls()
+        cursor = sql_tools.get_cursor(buffered=False)
+        try:
+            cursor.execute("SELECT TaxonID, FullName, ParentID, RankID FROM taxon;")
+            while rows := cursor.fetchmany(fetch_size):
+                for taxon_id, full_name, parent_id, rank_id in rows:
+                    index.add(taxon_id, full_name, parent_id, rank_id)
+
+            cursor.execute("SELECT taxonid, RedactLocality FROM vtaxon2;")
+            while rows := cursor.fetchmany(fetch_size):
+                for taxon_id, redacted in rows:
+                    if redacted is True or redacted == 1 or redacted == b"\x01":
+                        index.redacted_ids.add(taxon_id)
+        finally:
+            cursor.close()
+        index.logger.info(f"loaded {len(index.taxon_ids)} taxa, {len(index.redacted_ids)} redacted")
+        return index
+
+    def add(self, taxon_id, full_name, parent_id=None, rank_id=None, redacted=False):
+        position = len(self.taxon_ids)
+        self.taxon_ids.append(taxon_id)
+        self.parent_ids.append(parent_id or NO_ID)
+        self.rank_ids.append(rank_id or NO_ID)
+        full_name = (full_name or '').lower()
+        self.full_names.append(full_name)
+        self.name_positions.setdefault(full_name, position)
+        self.id_positions.setdefault(taxon_id, position)
+        if redacted:
+            self.redacted_ids.add(taxon_id)
+        # a new name can change any hybrid match
+        self.hybrid_matches.clear()
+
+    def get_one_match(self, name):
+        """TaxonID for FullName, else None"""
+        position = self.name_positions.get(str(name).lower())
+        return self.taxon_ids[position] if position is not None else None
+
+    def parent_id(self, taxon_id):
+        position = self.id_positions.get(taxon_id)
+        if position is None or self.parent_ids[position] == NO_ID:
+            return None
+        return self.parent_ids[position]
+
+    def rank_id(self, taxon_id):
+        position = self.id_positions.get(taxon_id)
+        if position is None or self.rank_ids[position] == NO_ID:
+            return None
+        return self.rank_ids[position]
+
+    def is_redacted(self, taxon_id):
+        """vtaxon2.RedactLocality as SqlCsvTools.get_is_taxon_id_redacted reads it"""
+        return taxon_id in self.redacted_ids
+
+    def get_one_hybrid(self, match, fullname):
+        """SqlCsvTools.get_one_hybrid: every term of a 3 term hybrid, and the genus, anywhere in the name"""
+        parts = match.split()
+        if len(parts) == 3:
+            terms = tuple(part.lower() for part in parts) + (fullname.split()[0].lower(),)
+            if terms not in self.hybrid_matches:
+                self.hybrid_matches[terms] = next(
+                    (self.taxon_ids[position] for position, name in enumerate(self.full_names)
+                     if all(term in name for term in terms)), None)
+            return self.hybrid_matches[terms]
+        elif len(parts) < 3:
+            return self.get_one_match(fullname)
+        else:
+            self.logger.error("hybrid tax name has more than 3 terms")
+            return None
+
+    def taxon_get(self, name, hybrid=False, taxname=None):
+        """SqlCsvTools.taxon_get answered from the index"""
+        name = name.lower()
+
+        if hybrid is False:
+            result_id = self.get_one_match(name)
+            if result_id is None and ("subsp." in name or "var." in name):
+                if "subsp." in name:
+                    name = name.replace(" subsp. ", " var. ")
+                elif "var." in name:
+                    name = name.replace(" var. ", " subsp. ")
+                result_id = self.get_one_match(name)
+            return result_id
+
+        return self.get_one_hybrid(match=taxname, fullname=name)
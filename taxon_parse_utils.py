@@ -33,6 +33,10 @@ def separate_qualifiers(tax_frame: pd.DataFrame, tax_col: str):
     return tax_frame
 
 
+# works better when entries space + qual ordered first, vel aff before aff
+QUALIFIER_STRINGS = [" cf.", "cf.", " vel aff.", "vel aff.", " aff.",  "aff.", " sec.", "sec."]
+
+
 def remove_qualifiers(tax_string: str):
     """remove_qualifiers: removes qualifiers such as cf. or aff. from any taxon string.
         args:
@@ -40,14 +44,34 @@ def remove_qualifiers(tax_string: str):
         returns:
             tax_string: a string without qualifier substrings present.
     """
-    # works better when entries space + qual ordered first, vel aff before aff
-    qual_list = [" cf.", "cf.", " vel aff.", "vel aff.", " aff.",  "aff.", " sec.", "sec."]
-    for qual_str in qual_list:
+    for qual_str in QUALIFIER_STRINGS:
         tax_string = tax_string.replace(qual_str, "")
 
     return tax_string
 
 
+def remove_qualifiers_series(tax_series: pd.Series):
+    """remove_qualifiers_series: remove_qualifiers for a whole column of strings at once.
+        args:
+            tax_series: series of taxon name strings
+        returns:
+            tax_series: the series without qualifier substrings present.
+    """
+    # every qualifier string contains one of these, so other rows are left alone
+    has_qualifier = (tax_series.str.contains("cf.", regex=False) | tax_series.str.contains("aff.", regex=False) |
+                     tax_series.str.contains("sec.", regex=False)).fillna(False).astype(bool)
+    if not has_qualifier.any():
+        return tax_series
+
+    stripped = tax_series[has_qualifier]
+    for qual_str in QUALIFIER_STRINGS:
+        stripped = stripped.str.replace(qual_str, "", regex=False)
+
+    tax_series = tax_series.copy()
+    tax_series[has_qualifier] = stripped
+    return tax_series
+
+
 def extract_after_subtax(text):
     """extract_after_subtax: will take any substring after a subtaxa/intrataxa rank pattern,
         and stores it in a variable. Useful for parsing taxon names
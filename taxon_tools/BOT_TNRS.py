@@ -1,12 +1,26 @@
-import requests
 import pandas as pd
-import json
+from taxon_tools.tnrs_client import TnrsClient
 
-def iterate_taxon_resolve(taxon_frame):
+# columns read from a TNRS result, so a batch with nothing resolved still has them
+TNRS_RESULT_COLUMNS = ['Name_submitted', 'Overall_score', 'Name_matched', 'Taxonomic_status', 'Accepted_name',
+                       'Unmatched_terms', 'Canonical_author', 'Accepted_name_author']
+
+# used when callers don't pass a client: caches in memory for the life of the process
+_default_client = None
+
+
+def get_default_client():
+    global _default_client
+    if _default_client is None:
+        _default_client = TnrsClient()
+    return _default_client
+
+
+def iterate_taxon_resolve(taxon_frame, client=None):
     """iterate_taxon_resolve: uses process taxon resolve, to take taxonomic names with missing
         infraspecific rank, and re-process them with placeholder infraspecific rank var. and subsp."""
 
-    results = process_taxon_resolve(taxon_frame)
+    results = process_taxon_resolve(taxon_frame, client=client)
 
     failed_results = results[results['overall_score'] <= .99].copy()
 
@@ -17,7 +31,7 @@ def iterate_taxon_resolve(taxon_frame):
 
         failed_results = failed_results[['CatalogNumber', 'fullname']]
 
-        failed_results = process_taxon_resolve(failed_results)
+        failed_results = process_taxon_resolve(failed_results, client=client)
 
         results = pd.concat([results, failed_results], ignore_index=True)
 
@@ -31,48 +45,28 @@ def iterate_taxon_resolve(taxon_frame):
 
     return results
 
-def process_taxon_resolve(taxon_frame):
+def process_taxon_resolve(taxon_frame, client=None):
     """process_taxon_resolve: uses TNRS or the taxonomic name resolution service
         to process, batches of taxonomic names, correct for spelling mistakes,
         and flag unrecognized or new taxa.
         args:
             taxon_frame: a dataframe of taxonomic names with barcodes, or unique numeric identifier
+            client: the TnrsClient to resolve through; names it has already resolved are not re-sent.
+                    Defaults to a process-wide client without an on-disk cache.
         returns:
             a dataframe containing spelling corrected taxonomic names, matched names ,and taxonomic authors.
             contains accuracy score from TNRS, for filtering based on quality of match.
     """
+    client = client or get_default_client()
 
-    url_tn = "https://tnrsapi.xyz/tnrs_api.php"
-
-    unique_taxon = taxon_frame.drop_duplicates(subset='fullname', keep='first')
-
-    headers = {
-        'Accept': 'application/json',
-        'Content-Type': 'application/json',
-        'charset': 'UTF-8'
-    }
-
-    data_json = unique_taxon.to_json(orient='records')
-
-    sources = "wfo,wcvp"
-    class_val = "wfo"
-    mode = "resolve"
-    match = "best"
-
-    opts = {
-        "sources": sources,
-        "class": class_val,
-        "mode": mode,
-        "matches": match
-    }
-
-    input_json = json.dumps({"opts": opts, "data": json.loads(data_json)})
+    unique_names = [name for name in taxon_frame['fullname'].drop_duplicates() if isinstance(name, str)]
 
-    results_json = requests.post(url_tn, headers=headers, data=input_json.encode('utf-8'))
+    resolved = client.resolve(unique_names)
 
-    results_raw = results_json.json()
+    results = pd.DataFrame(list(resolved.values())) if resolved else pd.DataFrame(columns=TNRS_RESULT_COLUMNS)
 
-    results = pd.DataFrame(results_raw)
+    # TNRS may normalise Name_submitted; join on the name as it was sent
+    results['Name_submitted'] = list(resolved.keys())
 
     # Replacing empty strings with NaN
     results['Overall_score'] = results['Overall_score'].replace('', 0)
@@ -0,0 +1,178 @@
+"""Docstring: client for the Taxonomic Name Resolution Service with a persistent per-name cache,
+   used by BOT_TNRS.
+"""
+import json
+import logging
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import requests
+
+TNRS_URL = "https://tnrsapi.xyz/tnrs_api.php"
+
+DEFAULT_SOURCES = "wfo,wcvp"
+DEFAULT_CLASS = "wfo"
+DEFAULT_MODE = "resolve"
+DEFAULT_MATCHES = "best"
+
+DEFAULT_CHUNK_SIZE = 200
+DEFAULT_WORKERS = 4
+DEFAULT_TIMEOUT = 60
+DEFAULT_RETRIES = 3
+RETRY_DELAY_SECONDS = 2
+
+HEADERS = {
+    'Accept': 'application/json',
+    'Content-Type': 'application/json',
+    'charset': 'UTF-8'
+}
+
+
+class TnrsClient:
+    """Resolves taxon names through TNRS, each name at most once.
+
+    Results are cached per (name, sources, mode): in memory for the run, and in a sqlite file
+    at cache_path when one is given, so later batches and single-name author lookups reuse them.
+    Uncached names are posted in chunks of chunk_size, up to workers at a time, each request with
+    a timeout and up to retries attempts. In offline mode nothing is posted and names missing from
+    the cache come back unresolved.
+    """
+
+    def __init__(self, cache_path=None, sources=DEFAULT_SOURCES, mode=DEFAULT_MODE, chunk_size=DEFAULT_CHUNK_SIZE,
+                 workers=DEFAULT_WORKERS, timeout=DEFAULT_TIMEOUT, retries=DEFAULT_RETRIES, offline=False,
+                 url=TNRS_URL):
+        self.logger = logging.getLogger(f'Client.{self.__class__.__name__}')
+        self.sources = sources
+        self.mode = mode
+        self.chunk_size = max(1, chunk_size)
+        self.workers = max(1, workers)
+        self.timeout = timeout
+        self.retries = max(1, retries)
+        self.offline = offline
+        self.url = url
+        self.memory = {}
+        self.lock = threading.Lock()
+        self.cache_hits = 0
+        self.names_posted = 0
+        self.cnx = None
+        if cache_path:
+            self.cnx = sqlite3.connect(cache_path, check_same_thread=False)
+            self.cnx.execute("""CREATE TABLE IF NOT EXISTS tnrs (
+                                    name TEXT NOT NULL,
+                                    sources TEXT NOT NULL,
+                                    mode TEXT NOT NULL,
+                                    result TEXT NOT NULL,
+                                    resolved REAL NOT NULL,
+                                    PRIMARY KEY (name, sources, mode))""")
+            self.cnx.commit()
+
+    @classmethod
+    def from_config(cls, config):
+        """a TnrsClient set up by the TNRS_* settings of a collection config"""
+        return cls(cache_path=getattr(config, 'TNRS_CACHE_PATH', None),
+                   chunk_size=getattr(config, 'TNRS_CHUNK_SIZE', DEFAULT_CHUNK_SIZE),
+                   workers=getattr(config, 'TNRS_WORKERS', DEFAULT_WORKERS),
+                   timeout=getattr(config, 'TNRS_TIMEOUT', DEFAULT_TIMEOUT),
+                   retries=getattr(config, 'TNRS_RETRIES', DEFAULT_RETRIES),
+                   offline=getattr(config, 'TNRS_OFFLINE', False))
+
+    def _cached(self, name):
+        with self.lock:
+            if name in self.memory:
+                return self.memory[name]
+            if self.cnx is None:
+                return None
+            row = self.cnx.execute("SELECT result FROM tnrs WHERE name = ? AND sources = ? AND mode = ?",
+                                   (name, self.sources, self.mode)).fetchone()
+            if row is None:
+                return None
+            record = json.loads(row[0])
+            self.memory[name] = record
+            return record
+
+    def _store(self, resolved):
+        """caches {submitted name: TNRS result record}"""
+        with self.lock:
+            self.memory.update(resolved)
+            if self.cnx is not None and resolved:
+                now = time.time()
+                self.cnx.executemany("INSERT OR REPLACE INTO tnrs (name, sources, mode, result, resolved) "
+                                     "VALUES (?, ?, ?, ?, ?)",
+                                     [(name, self.sources, self.mode, json.dumps(record), now)
+                                      for name, record in resolved.items()])
+                self.cnx.commit()
+
+    @staticmethod
+    def _by_submitted_name(names, records):
+        """{name as it was posted: record}. TNRS echoes each row's id back as ID, while its
+           Name_submitted may be normalised (case, whitespace), so the id is matched first."""
+        resolved = {}
+        for record in records:
+            try:
+                name = names[int(record.get('ID'))]
+            except (TypeError, ValueError, IndexError):
+                name = record.get('Name_submitted')
+            if name is not None:
+                resolved[name] = record
+        return resolved
+
+    def _post(self, names):
+        """one TNRS request for names, retried on network errors, timeouts and bad responses"""
+        opts = {
+            "sources": self.sources,
+            "class": DEFAULT_CLASS,
+            "mode": self.mode,
+            "matches": DEFAULT_MATCHES
+        }
+        # TNRS reads each data row as (id, name), so the id has to come first
+        data = [{"CatalogNumber": str(index), "fullname": name} for index, name in enumerate(names)]
+        input_json = json.dumps({"opts": opts, "data": data})
+        for attempt in range(1, self.retries + 1):
+            try:
+                response = requests.post(self.url, headers=HEADERS, data=input_json.encode('utf-8'),
+                                         timeout=self.timeout)
+                response.raise_for_status()
+                return response.json()
+            except (requests.RequestException, ValueError) as e:
+                if attempt == self.retries:
+                    raise
+                self.logger.warning(f"TNRS request for {len(names)} names failed ({e}), "
+                                    f"attempt {attempt} of {self.retries}")
+                time.sleep(RETRY_DELAY_SECONDS * attempt)
+
+    def resolve(self, names):
+        """{name: TNRS result record} for the names TNRS (or the cache) resolved"""
+        names = list(dict.fromkeys(names))
+        results = {}
+        uncached = []
+        for name in names:
+            record = self._cached(name)
+            if record is None:
+                uncached.append(name)
+            else:
+                results[name] = record
+        self.cache_hits += len(results)
+
+        if uncached and self.offline:
+            self.logger.warning(f"TNRS offline: {len(uncached)} names not in the cache left unresolved")
+            return results
+        if not uncached:
+            return results
+
+        chunks = [uncached[start:start + self.chunk_size] for start in range(0, len(uncached), self.chunk_size)]
+        self.logger.info(f"resolving {len(uncached)} names through TNRS in {len(chunks)} requests, "
+                         f"{len(results)} from the cache")
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(chunks))) as executor:
+            futures = {executor.submit(self._post, chunk): chunk for chunk in chunks}
+            for future in as_completed(futures):
+                resolved = self._by_submitted_name(futures[future], future.result())
+                self._store(resolved)
+                results.update(resolved)
+        self.names_posted += len(uncached)
+        return results
+
+    def close(self):
+        if self.cnx is not None:
+            self.cnx.close()
+            self.cnx = None
@@ -0,0 +1,84 @@
+"""
+IzImporter
+└── _build_filename_map
+    └── _is_file_already_processed
+        └──X _prefetch_already_processed (bulk Specify / image db lookups per folder)
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from iz_importer_tests import TestIzImporterBase
+
+
+@patch('importer.SpecifyDb')
+class TestIzAlreadyProcessed(TestIzImporterBase):
+
+    def setUp(self):
+        super().setUp()
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        for name in ["casiz 1.jpg", "casiz 2.jpg", "casiz 3.jpg"]:
+            open(os.path.join(self.tmp_dir, name), 'w').close()
+        self.paths = [os.path.join(self.tmp_dir, f"casiz {i}.jpg") for i in (1, 2, 3)]
+
+    def test_one_bulk_lookup_per_folder(self, mock_specify_db):
+        self._getImporter(mock_specify_db)
+        image_client = self.importer.image_client
+        image_client.check_image_db_if_filenames_imported.return_value = {self.paths[1]}
+        with patch('importer.AttachmentUtils.get_attachmentids_from_filepaths',
+                   return_value={self.paths[0]: 11}) as bulk_lookup, \
+                patch('importer.AttachmentUtils.get_attachmentid_from_filepath') as single_lookup:
+            results = [self.importer._is_file_already_processed(path, path) for path in self.paths]
+
+        self.assertEqual(results, [True, True, False])
+        bulk_lookup.assert_called_once()
+        self.assertEqual(sorted(bulk_lookup.call_args[0][0]), self.paths)
+        image_client.check_image_db_if_filenames_imported.assert_called_once()
+        single_lookup.assert_not_called()
+        image_client.check_image_db_if_filename_imported.assert_not_called()
+        self.assertEqual(self.importer.unattached_paths, {self.paths[2]})
+
+    def test_unlisted_file_is_checked_alone(self, mock_specify_db):
+        self._getImporter(mock_specify_db, image_db_result=True)
+        self.importer.image_client.check_image_db_if_filenames_imported.return_value = set()
+        late_path = os.path.join(self.tmp_dir, "casiz 4.jpg")
+        with patch('importer.AttachmentUtils.get_attachmentids_from_filepaths', return_value={}), \
+                patch('importer.AttachmentUtils.get_attachmentid_from_filepath', return_value=None) as single_lookup:
+            self.assertFalse(self.importer._is_file_already_processed(self.paths[0], self.paths[0]))
+            self.assertTrue(self.importer._is_file_already_processed(late_path, late_path))
+        single_lookup.assert_called_once_with(late_path)
+
+    def test_manifest_unchanged_files_are_not_looked_up(self, mock_specify_db):
+        self._getImporter(mock_specify_db)
+        self.importer.image_client.check_image_db_if_filenames_imported.return_value = set()
+        with patch.object(self.importer, 'is_unchanged_in_manifest', side_effect=lambda path: path != self.paths[2]), \
+                patch('importer.AttachmentUtils.get_attachmentids_from_filepaths', return_value={}) as bulk_lookup:
+            self.assertFalse(self.importer._is_file_already_processed(self.paths[2], self.paths[2]))
+
+        self.assertEqual(bulk_lookup.call_args[0][0], [self.paths[2]])
+        self.assertEqual(self.importer.image_client.check_image_db_if_filenames_imported.call_args[0][1],
+                         [self.paths[2]])
+
+    def test_image_db_checked_lazily_without_bulk_route(self, mock_specify_db):
+        self._getImporter(mock_specify_db)
+        image_client = self.importer.image_client
+        image_client.bulk_lookup_supported = False
+        with patch('importer.AttachmentUtils.get_attachmentids_from_filepaths',
+                   return_value={self.paths[0]: 11}):
+            results = [self.importer._is_file_already_processed(path, path) for path in self.paths]
+
+        self.assertEqual(results, [True, False, False])
+        image_client.check_image_db_if_filenames_imported.assert_not_called()
+        # only the files Specify doesn't already have
+        self.assertEqual([call.args[1] for call in image_client.check_image_db_if_filename_imported.call_args_list],
+                         self.paths[1:])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -15,6 +15,7 @@ IzImporter.__init__
 """
 
 import os
+import re
 import sys
 import unittest
 from unittest.mock import patch
@@ -72,6 +73,32 @@ class TestIzImporterCasiz(TestIzImporterBase):
                 self.assertEqual(self.importer.casiz_numbers, expected, f"Failed to extract {expected} from '{input_str}'")
                 self.importer.casiz_numbers = []
 
+    def test_extract_casiz_with_izacc(self, mock_specify_db):
+        self._getImporter(mock_specify_db)
+        casiz_regex = self.importer.iz_importer_config.CASIZ_NUMBER_REGEX
+        test_cases = ["izacc 12345", "izacc_2023 cas123", "IZACC 123 casiz 4567.jpg", "izacc only",
+                      "izacc 20230115", "izacc 1234567890123456", "casiz   12 izacc", "izacc #99999_"]
+        for input_str in test_cases:
+            self.importer.casiz_numbers = []
+            result = self.importer.extract_casiz_from_string(input_str)
+            # the original check: izacc, and no casiz number in any proper prefix of the string
+            has_izacc = re.search(r'(?i)\bizacc\b', input_str) is not None
+            in_prefix = any(casiz_regex.search(input_str, pos=0, endpos=m) for m in range(len(input_str)))
+            if has_izacc and not in_prefix:
+                self.assertEqual(result, [], f"Expected [] for '{input_str}'")
+            else:
+                self.assertIsInstance(result, bool, f"Expected True/False for '{input_str}'")
+
+    def test_attempt_directory_match_is_memoized(self, mock_specify_db):
+        self._getImporter(mock_specify_db)
+        with patch.object(self.importer, '_casiz_numbers_from_string',
+                          wraps=self.importer._casiz_numbers_from_string) as extract:
+            self.assertTrue(self.importer.attempt_directory_match('root/casiz 12345/a.jpg'))
+            calls = extract.call_count
+            self.assertTrue(self.importer.attempt_directory_match('root/casiz 12345/b.jpg'))
+            self.assertEqual(extract.call_count, calls)
+        self.assertEqual(self.importer.casiz_numbers, [12345])
+
     def test_attempt_filename_match(self, mock_specify_db):
         self._getImporter(mock_specify_db)
         
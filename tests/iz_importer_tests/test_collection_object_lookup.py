@@ -0,0 +1,38 @@
+"""
+Importer
+└── get_collection_object_ids
+"""
+
+import os
+import sys
+import unittest
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from iz_importer_tests import TestIzImporterBase
+
+
+@patch('importer.SpecifyDb')
+class TestCollectionObjectLookup(TestIzImporterBase):
+
+    def test_chunks_and_reports_missing(self, mock_specify_db):
+        self._getImporter(mock_specify_db)
+        records = {"CAS0001": 11, "cas0002": 12, "CAS0004": 14}
+        queries = []
+
+        def fake_get_records(sql, params):
+            queries.append(list(params))
+            return [(number, records[number]) for number in records
+                    if number.upper() in [p.upper() for p in params]]
+
+        self.importer.specify_db_connection.get_records.side_effect = fake_get_records
+        resolved = self.importer.get_collection_object_ids(
+            ["CAS0001", "CAS0002", "CAS0003", "CAS0001", "CAS0004", None], chunk_size=2)
+
+        self.assertEqual(queries, [["CAS0001", "CAS0002"], ["CAS0003", "CAS0004"]])
+        self.assertEqual(resolved, {"CAS0001": 11, "CAS0002": 12, "CAS0003": None, "CAS0004": 14})
+        self.assertIn("IN (%s, %s)", self.importer.specify_db_connection.get_records.call_args[0][0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+"""
+Importer.import_prepared
+├── upload_candidates
+├── prefetch_conversions
+└── import_to_imagedb_and_specify
+    └── import_single_file_to_image_db_and_specify
+        └── discard_conversions
+"""
+
+import os
+import sys
+import unittest
+from unittest.mock import patch, MagicMock
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from iz_importer_tests import TestIzImporterBase
+
+
+@patch('importer.SpecifyDb')
+class TestConversionPrefetch(TestIzImporterBase):
+
+    def test_batch_is_queued_ahead_and_unused_conversions_dropped(self, mock_specify_db):
+        self._getImporter(mock_specify_db)
+        self.importer.import_workers = 1
+        stage = MagicMock()
+        self.importer.conversion_stage = stage
+        submitted_before_import = []
+
+        def fake_import(cur_filepath, *args):
+            if not submitted_before_import:
+                submitted_before_import.extend(call.args[0] for call in stage.submit.call_args_list)
+            if cur_filepath == "/bot/2_a.tif":
+                raise ValueError("skipped before upload")
+
+        prepared = [dict(filepath_list=[f"/bot/{co_id}_a.tif", f"/bot/{co_id}_b.jpg"],
+                         collection_object_id=co_id, agent_id=1, id=co_id) for co_id in range(3)]
+        with patch.object(self.importer, '_import_single_file', side_effect=fake_import):
+            self.importer.import_prepared(prepared)
+
+        # every object's tiffs were queued before the first upload, jpgs need no conversion
+        self.assertEqual(submitted_before_import, ["/bot/0_a.tif", "/bot/1_a.tif", "/bot/2_a.tif"])
+        # the stage, not the importer, creates a conversion's folder once it starts
+        self.assertFalse(os.path.exists(os.path.dirname(stage.submit.call_args.args[1])))
+        # a file is dropped from the stage however its import ended
+        discarded = [call.args[0] for call in stage.discard.call_args_list]
+        self.assertEqual(discarded, [path for import_args in prepared for path in import_args['filepath_list']])
+
+    def test_md5_duplicates_are_not_queued(self, mock_specify_db):
+        self._getImporter(mock_specify_db)
+        self.importer.dedupe_by_md5 = True
+        hashes = {"/bot/1.tif": "aaa", "/bot/2.tif": "aaa", "/bot/3.tif": "bbb", "/bot/4.tif": "ccc"}
+        with patch.object(self.importer, 'hash_files', return_value=hashes), \
+                patch.object(self.importer.image_client, 'check_image_db_if_filenames_imported',
+                             return_value={"bbb"}):
+            self.assertEqual(self.importer.upload_candidates(list(hashes)), ["/bot/1.tif", "/bot/4.tif"])
+
+
+if __name__ == '__main__':
+    unittest.main()
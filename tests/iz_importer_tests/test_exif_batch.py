@@ -0,0 +1,70 @@
+"""
+IzImporter
+└── build_filename_map
+    └──X _read_exif_metadata (ExifService folder batches)
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch, MagicMock
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from iz_importer_tests import TestIzImporterBase
+
+
+@patch('importer.SpecifyDb')
+class TestIzExifBatch(TestIzImporterBase):
+
+    def setUp(self):
+        super().setUp()
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        for name in ["casiz 1.jpg", "casiz 2.jpg", ".hidden.jpg", "notes.txt"]:
+            open(os.path.join(self.tmp_dir, name), 'w').close()
+
+    def test_reads_folder_once(self, mock_specify_db):
+        self._getImporter(mock_specify_db)
+        first = os.path.join(self.tmp_dir, "casiz 1.jpg")
+        second = os.path.join(self.tmp_dir, "casiz 2.jpg")
+        service = MagicMock()
+        service.read_tags_batch.return_value = {first: {'EXIF:Artist': 'a'}, second: {'EXIF:Artist': 'b'}}
+        self.importer.exif_service = service
+
+        self.assertEqual(self.importer._read_exif_metadata(first), {'EXIF:Artist': 'a'})
+        self.assertEqual(self.importer._read_exif_metadata(second), {'EXIF:Artist': 'b'})
+
+        service.read_tags_batch.assert_called_once()
+        self.assertEqual(sorted(service.read_tags_batch.call_args[0][0]), [first, second])
+        service.read_tags.assert_not_called()
+
+    def test_falls_back_to_single_read(self, mock_specify_db):
+        self._getImporter(mock_specify_db)
+        path = os.path.join(self.tmp_dir, "casiz 1.jpg")
+        service = MagicMock()
+        service.read_tags_batch.return_value = {}
+        service.read_tags.return_value = {'EXIF:Artist': 'c'}
+        self.importer.exif_service = service
+
+        self.assertEqual(self.importer._read_exif_metadata(path), {'EXIF:Artist': 'c'})
+        service.read_tags.assert_called_once_with(path)
+
+    def test_failed_batch_falls_back_to_single_reads(self, mock_specify_db):
+        self._getImporter(mock_specify_db)
+        first = os.path.join(self.tmp_dir, "casiz 1.jpg")
+        second = os.path.join(self.tmp_dir, "casiz 2.jpg")
+        service = MagicMock()
+        service.read_tags_batch.side_effect = TimeoutError("slow share")
+        service.read_tags.side_effect = lambda path: {'File:FileName': os.path.basename(path)}
+        self.importer.exif_service = service
+
+        self.assertEqual(self.importer._read_exif_metadata(first), {'File:FileName': 'casiz 1.jpg'})
+        self.assertEqual(self.importer._read_exif_metadata(second), {'File:FileName': 'casiz 2.jpg'})
+        service.read_tags_batch.assert_called_once()
+        self.assertEqual(service.read_tags.call_count, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
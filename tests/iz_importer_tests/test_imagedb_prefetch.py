@@ -0,0 +1,64 @@
+"""
+Importer
+├── prefetch_imagedb_imported_filenames
+└── remove_imagedb_imported_filenames_from_list
+"""
+
+import os
+import sys
+import unittest
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from iz_importer_tests import TestIzImporterBase
+
+
+@patch('importer.SpecifyDb')
+class TestImagedbPrefetch(TestIzImporterBase):
+
+    def test_prefetch_covers_every_collection_object(self, mock_specify_db):
+        self._getImporter(mock_specify_db)
+        requests = []
+
+        def fake_bulk_check(collection, names, exact=True, per_file_fallback=True):
+            requests.append(list(names))
+            return {name for name in names if name in ("CAS0001.jpg", "CAS0003.jpg")}
+
+        with patch.object(self.importer.image_client, 'check_image_db_if_filenames_imported',
+                          side_effect=fake_bulk_check):
+            self.importer.prefetch_imagedb_imported_filenames(
+                ["/bot/CAS0001.tif", "/bot/CAS0002.jpg", "/bot/CAS0003.jpg", "/bot/bad.name.jpg"])
+            self.assertEqual(requests, [["CAS0001.jpg", "CAS0002.jpg", "CAS0003.jpg"]])
+
+            self.assertEqual(self.importer.remove_imagedb_imported_filenames_from_list(
+                ["/bot/CAS0001.tif", "/bot/CAS0002.jpg"]), ["/bot/CAS0002.jpg"])
+            self.assertEqual(self.importer.remove_imagedb_imported_filenames_from_list(
+                ["/bot/CAS0003.jpg"]), [])
+            self.assertEqual(len(requests), 1)
+
+            # files the prefetch didn't see are still checked
+            self.assertEqual(self.importer.remove_imagedb_imported_filenames_from_list(
+                ["/bot/CAS0004.jpg"]), ["/bot/CAS0004.jpg"])
+            self.assertEqual(requests[1:], [["CAS0004.jpg"]])
+
+    def test_no_prefetch_without_bulk_route(self, mock_specify_db):
+        self._getImporter(mock_specify_db)
+        requests = []
+
+        def fake_check(collection, names, exact=True, per_file_fallback=True):
+            requests.append(list(names))
+            if not per_file_fallback:
+                return None
+            return {name for name in names if name == "CAS0001.jpg"}
+
+        with patch.object(self.importer.image_client, 'check_image_db_if_filenames_imported',
+                          side_effect=fake_check):
+            self.importer.prefetch_imagedb_imported_filenames(["/bot/CAS0001.jpg", "/bot/CAS0002.jpg"])
+            # only the list that comes up is checked, one file at a time
+            self.assertEqual(self.importer.remove_imagedb_imported_filenames_from_list(
+                ["/bot/CAS0001.jpg"]), [])
+        self.assertEqual(requests, [["CAS0001.jpg", "CAS0002.jpg"], ["CAS0001.jpg"]])
+
+
+if __name__ == '__main__':
+    unittest.main()
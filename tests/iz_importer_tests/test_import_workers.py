@@ -0,0 +1,67 @@
+"""
+Importer.import_to_imagedb_and_specify
+└── worker pool mode (IMPORT_WORKERS > 1)
+    ├── _import_filepath_list
+    │   └──X import_single_file_to_image_db_and_specify
+    └── wait_for_pending_imports
+"""
+
+import os
+import sys
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from iz_importer_tests import TestIzImporterBase
+
+
+@patch('importer.SpecifyDb')
+class TestImportWorkers(TestIzImporterBase):
+
+    def test_pool_keeps_per_object_file_order(self, mock_specify_db):
+        self._getImporter(mock_specify_db)
+        self.importer.import_workers = 3
+        calls = []
+        lock = threading.Lock()
+
+        def fake_import(cur_filepath, collection_object_id, *args):
+            time.sleep(0.01)
+            with lock:
+                calls.append((collection_object_id, cur_filepath))
+            return cur_filepath
+
+        with patch.object(self.importer, 'import_single_file_to_image_db_and_specify', side_effect=fake_import):
+            for co_id in range(6):
+                self.importer.import_to_imagedb_and_specify(
+                    filepath_list=[f"{co_id}_a.jpg", f"{co_id}_b.jpg", f"{co_id}_c.jpg"],
+                    collection_object_id=co_id, agent_id=1, id=co_id)
+            self.importer.wait_for_pending_imports()
+
+        self.assertEqual(len(calls), 18)
+        for co_id in range(6):
+            ordered = [path for cur_id, path in calls if cur_id == co_id]
+            self.assertEqual(ordered, [f"{co_id}_a.jpg", f"{co_id}_b.jpg", f"{co_id}_c.jpg"])
+        self.assertEqual(self.importer.pending_imports, [])
+
+    def test_pool_logs_and_continues_on_failure(self, mock_specify_db):
+        self._getImporter(mock_specify_db)
+        self.importer.import_workers = 2
+        seen = []
+
+        def fake_import(cur_filepath, *args):
+            seen.append(cur_filepath)
+            if cur_filepath == "bad.jpg":
+                raise ValueError("boom")
+
+        with patch.object(self.importer, 'import_single_file_to_image_db_and_specify', side_effect=fake_import):
+            self.importer.import_to_imagedb_and_specify(filepath_list=["bad.jpg", "good.jpg"],
+                                                        collection_object_id=1, agent_id=1)
+            self.importer.wait_for_pending_imports()
+
+        self.assertEqual(seen, ["bad.jpg", "good.jpg"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+"""
+IzImporter
+└── build_filename_map
+    └──X manifest skip of unchanged files
+remove_file_from_database
+    └──X manifest entry forgotten
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from iz_importer_tests import TestIzImporterBase
+from iz_importer import FILENAME_BUILD_STATUS
+from file_manifest import FileManifest, IMPORTED
+
+
+@patch('importer.SpecifyDb')
+class TestIzManifest(TestIzImporterBase):
+
+    def setUp(self):
+        super().setUp()
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+
+    def test_rejected_file_skipped_until_changed(self, mock_specify_db):
+        self._getImporter(mock_specify_db)
+        self.importer.manifest = FileManifest(os.path.join(self.tmp_dir, "manifest.sqlite"))
+        self.addCleanup(self.importer.manifest.close)
+        full_path = os.path.join(self.tmp_dir, "notes.txt")
+        with open(full_path, 'w') as f:
+            f.write("not an image")
+
+        status, _ = self.importer.build_filename_map(full_path)
+        self.assertEqual(status, FILENAME_BUILD_STATUS.INVALID_PATH)
+
+        with patch.object(self.importer, '_build_filename_map') as build:
+            status, _ = self.importer.build_filename_map(full_path)
+            build.assert_not_called()
+        self.assertEqual(status, FILENAME_BUILD_STATUS.UNCHANGED)
+
+        with open(full_path, 'a') as f:
+            f.write(" any more")
+        status, _ = self.importer.build_filename_map(full_path)
+        self.assertEqual(status, FILENAME_BUILD_STATUS.INVALID_PATH)
+
+    def test_reject_rule_change_rechecks_rejected_file(self, mock_specify_db):
+        self._getImporter(mock_specify_db)
+        self.importer.manifest = FileManifest(os.path.join(self.tmp_dir, "manifest.sqlite"))
+        self.addCleanup(self.importer.manifest.close)
+        full_path = os.path.join(self.tmp_dir, "notes.txt")
+        with open(full_path, 'w') as f:
+            f.write("not an image")
+        status, _ = self.importer.build_filename_map(full_path)
+        self.assertEqual(status, FILENAME_BUILD_STATUS.INVALID_PATH)
+
+        # e.g. IMAGE_SUFFIX now accepts .txt
+        self.importer.manifest_rules = "changed"
+        with patch.object(self.importer, '_build_filename_map',
+                          return_value=(FILENAME_BUILD_STATUS.INVALID_PATH, False)) as build:
+            self.importer.build_filename_map(full_path)
+            build.assert_called_once()
+
+    def test_removed_file_is_forgotten(self, mock_specify_db):
+        self._getImporter(mock_specify_db)
+        self.importer.manifest = FileManifest(os.path.join(self.tmp_dir, "manifest.sqlite"))
+        self.addCleanup(self.importer.manifest.close)
+        full_path = os.path.join(self.tmp_dir, "casiz 1.jpg")
+        open(full_path, 'w').close()
+        self.importer.record_manifest_outcome(full_path, IMPORTED)
+        self.importer.specify_db_connection.get_one_record.return_value = 1
+        self.importer.image_client.get_internal_filename.return_value = "abc.jpg"
+
+        with patch.object(self.importer.attachment_utils, 'get_attachmentid_from_filepath', return_value=7):
+            self.assertTrue(self.importer.remove_file_from_database(full_path))
+        self.assertFalse(self.importer.is_unchanged_in_manifest(full_path))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+"""
+Importer
+├── upload_candidates (shares the md5 lookup)
+└── link_md5_duplicates
+    ├── hash_files (manifest md5 cache)
+    ├──X image_client.check_image_db_if_filenames_imported (search_type md5)
+    └──X connect_existing_attachment_to_collection_object_id
+"""
+
+import hashlib
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from iz_importer_tests import TestIzImporterBase
+from file_manifest import FileManifest
+
+
+@patch('importer.SpecifyDb')
+class TestMd5Dedupe(TestIzImporterBase):
+
+    def setUp(self):
+        super().setUp()
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        self.paths = {}
+        for name, content in [("old.jpg", b"scanned before"), ("new.jpg", b"never seen"),
+                              ("copy.jpg", b"never seen")]:
+            path = os.path.join(self.tmp_dir, name)
+            with open(path, 'wb') as f:
+                f.write(content)
+            self.paths[name] = path
+        self.old_md5 = hashlib.md5(b"scanned before").hexdigest()
+
+    def test_links_known_content_instead_of_uploading(self, mock_specify_db):
+        self._getImporter(mock_specify_db)
+        self.importer.dedupe_by_md5 = True
+        image_client = self.importer.image_client
+        image_client.check_image_db_if_filenames_imported.return_value = {self.old_md5}
+        image_client.get_internal_filename.return_value = "uuid-1.jpg"
+        filepaths = [self.paths["old.jpg"], self.paths["new.jpg"], self.paths["copy.jpg"]]
+
+        with patch('importer.AttachmentUtils.get_attachmentid_from_attachment_location', return_value=55), \
+                patch('importer.AttachmentUtils.is_attachment_linked', return_value=False), \
+                patch('iz_importer.IzImporter.connect_existing_attachment_to_collection_object_id') as connect:
+            remaining = self.importer.link_md5_duplicates(filepaths, 7, 99)
+
+        self.assertEqual(remaining, [self.paths["new.jpg"]])
+        connect.assert_called_once_with(55, 7, 99)
+        self.assertEqual(image_client.check_image_db_if_filenames_imported.call_args[1]['search_type'], 'md5')
+        image_client.get_internal_filename.assert_called_once_with(self.old_md5, self.importer.collection_name,
+                                                                   search_type='md5')
+
+    def test_batch_lookup_is_reused_per_collection_object(self, mock_specify_db):
+        self._getImporter(mock_specify_db)
+        self.importer.dedupe_by_md5 = True
+        image_client = self.importer.image_client
+        image_client.check_image_db_if_filenames_imported.return_value = {self.old_md5}
+        filepaths = [self.paths["old.jpg"], self.paths["new.jpg"]]
+
+        self.assertEqual(self.importer.upload_candidates(filepaths), [self.paths["new.jpg"]])
+        with patch.object(self.importer, '_link_existing_md5', return_value=True):
+            self.assertEqual(self.importer.link_md5_duplicates(filepaths, 7, 99), [self.paths["new.jpg"]])
+        image_client.check_image_db_if_filenames_imported.assert_called_once()
+
+    def test_hashes_come_from_manifest_for_unchanged_files(self, mock_specify_db):
+        self._getImporter(mock_specify_db)
+        self.importer.manifest = FileManifest(os.path.join(self.tmp_dir, "manifest.sqlite"))
+        self.addCleanup(self.importer.manifest.close)
+        path = self.paths["old.jpg"]
+        self.assertEqual(self.importer.hash_files([path]), {path: self.old_md5})
+
+        self.importer.file_md5s = {}
+        with patch('importer.Importer.get_file_md5') as get_file_md5:
+            self.assertEqual(self.importer.hash_files([path]), {path: self.old_md5})
+        get_file_md5.assert_not_called()
+
+    def test_disabled_by_default(self, mock_specify_db):
+        self._getImporter(mock_specify_db)
+        filepaths = list(self.paths.values())
+        self.assertIs(self.importer.link_md5_duplicates(filepaths, 7, 99), filepaths)
+        self.importer.image_client.check_image_db_if_filenames_imported.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
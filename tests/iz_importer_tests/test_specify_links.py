@@ -0,0 +1,57 @@
+"""
+Importer
+├── prefetch_specify_linked_filepaths
+│   └── get_specify_linked_filepaths
+└── remove_specify_imported_and_id_linked_from_path
+"""
+
+import os
+import sys
+import unittest
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from iz_importer_tests import TestIzImporterBase
+
+
+@patch('importer.SpecifyDb')
+class TestSpecifyLinkedFilepaths(TestIzImporterBase):
+
+    def _fake_links(self, links):
+        queries = []
+
+        def fake_get_records(sql, params):
+            queries.append((sql, list(params)))
+            paths = [p.casefold() for p in params if isinstance(p, str)]
+            return [(path, coid) for path, coid in links
+                    if path.casefold() in paths and ("CollectionObjectID = %s" not in sql or coid == params[-1])]
+
+        self.importer.attachment_utils.db_utils.get_records.side_effect = fake_get_records
+        return queries
+
+    def test_one_query_per_collection_object(self, mock_specify_db):
+        self._getImporter(mock_specify_db)
+        queries = self._fake_links([("/iz/A.jpg", 1), ("/iz/b.jpg", 2)])
+        filepaths = ["/iz/a.jpg", "/iz/b.jpg", "/iz/c.jpg", None]
+
+        kept = self.importer.remove_specify_imported_and_id_linked_from_path(filepaths, 1)
+
+        self.assertEqual(kept, ["/iz/b.jpg", "/iz/c.jpg", None])
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(queries[0][1], ["/iz/a.jpg", "/iz/b.jpg", "/iz/c.jpg", 1])
+
+    def test_prefetch_covers_every_collection_object(self, mock_specify_db):
+        self._getImporter(mock_specify_db)
+        queries = self._fake_links([("/iz/a.jpg", 1), ("/iz/b.jpg", 2)])
+        self.importer.prefetch_specify_linked_filepaths(["/iz/a.jpg", "/iz/b.jpg", "/iz/c.jpg"])
+        self.assertEqual(len(queries), 1)
+
+        self.assertEqual(self.importer.remove_specify_imported_and_id_linked_from_path(
+            ["/iz/a.jpg", "/iz/c.jpg"], 1), ["/iz/c.jpg"])
+        self.assertEqual(self.importer.remove_specify_imported_and_id_linked_from_path(
+            ["/iz/a.jpg", "/iz/b.jpg"], 2), ["/iz/a.jpg"])
+        self.assertEqual(len(queries), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+"""unit tests for the agent name index in agent_index.py"""
+import difflib
+import random
+import string
+import unittest
+from agent_index import AgentIndex, NameIndex
+
+
+def reference_find_agent_id(input_string, agents):
+    """the original IzImporter.find_agent_id_from_string matching, for comparison"""
+    def fuzzy_match(query, choices, cutoff=0.8):
+        matches = difflib.get_close_matches(query, choices, n=1, cutoff=cutoff)
+        return matches[0] if matches else None
+
+    names = input_string.strip().split()
+    if len(names) < 2:
+        return None
+    agent_names = [(agent[0], agent[1].lower() if agent[1] else '', agent[2].lower() if agent[2] else '')
+                   for agent in agents]
+    matched_firstname = fuzzy_match(names[0].lower(), [agent[1] for agent in agent_names])
+    matched_lastname = fuzzy_match(names[-1].lower(), [agent[2] for agent in agent_names])
+    if matched_firstname and matched_lastname:
+        for agent_id, fname, lname in agent_names:
+            if fname == matched_firstname and lname == matched_lastname:
+                return agent_id
+    return None
+
+
+class TestAgentIndex(unittest.TestCase):
+    def setUp(self):
+        self.rng = random.Random(7)
+
+    def random_name(self, max_length=9):
+        return ''.join(self.rng.choice("abcdeilnorst") for _ in range(self.rng.randint(1, max_length)))
+
+    def mutate(self, name):
+        chars = list(name)
+        for _ in range(self.rng.randint(0, 2)):
+            position = self.rng.randrange(len(chars) + 1)
+            if self.rng.random() < 0.5 or not chars:
+                chars.insert(position, self.rng.choice(string.ascii_lowercase))
+            else:
+                del chars[min(position, len(chars) - 1)]
+        return ''.join(chars) or "x"
+
+    def test_name_index_matches_difflib(self):
+        names = [self.random_name() for _ in range(400)] + ["abcdef", "abxcdyef", "al", "la"]
+        index = NameIndex(names)
+        for query in [self.mutate(self.rng.choice(names)) for _ in range(400)] + ["abxcdyef", "abcdef", "a"]:
+            expected = difflib.get_close_matches(query, names, n=1, cutoff=0.8)
+            self.assertEqual(index.best_match(query), expected[0] if expected else None, query)
+
+    def test_agent_lookup_matches_original(self):
+        agents = [(i, self.random_name().title() if i % 17 else None, self.random_name(12).title())
+                  for i in range(300)]
+        agents.append((999, "Jane", "Doe"))
+        index = AgentIndex(agents)
+        queries = ["Jane Doe", "jane q. doe", "Jayne Doe", "Doe", "  "]
+        for _ in range(200):
+            agent = self.rng.choice(agents)
+            queries.append(f"{self.mutate((agent[1] or 'x').lower())} {self.mutate(agent[2].lower())}")
+        for query in queries:
+            self.assertEqual(index.find_agent_id(query), reference_find_agent_id(query, agents), query)
+        self.assertEqual(index.find_agent_id("Jane Doe"), 999)
+        self.assertIn("Jane Doe", index.memo)
+
+
+if __name__ == '__main__':
+    unittest.main()
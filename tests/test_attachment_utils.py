@@ -0,0 +1,68 @@
+"""unit tests for attachment creation and bulk lookups in attachment_utils.py"""
+import datetime
+import unittest
+from unittest.mock import MagicMock
+from attachment_utils import AttachmentUtils
+
+
+class TestCreateAttachmentForCollectionObject(unittest.TestCase):
+    def setUp(self):
+        self.db_utils = MagicMock()
+        self.cursor = self.db_utils.get_cursor.return_value
+        self.cursor.lastrowid = 4242
+        self.attachment_utils = AttachmentUtils(self.db_utils)
+
+    def create(self):
+        return self.attachment_utils.create_attachment_for_collection_object(
+            collection_object_id=77,
+            attachment_location="abc.jpg",
+            original_filename="/images/CAS0001.jpg",
+            file_created_datetime=datetime.datetime(2024, 1, 2),
+            guid="guid",
+            image_type="image/jpeg",
+            agent_id=5,
+            properties={})
+
+    def test_uses_insert_id_in_one_transaction(self):
+        attachment_id = self.create()
+
+        self.assertEqual(attachment_id, 4242)
+        self.assertEqual(self.cursor.execute.call_count, 2)
+        link_sql, link_params = self.cursor.execute.call_args_list[1][0]
+        self.assertIn("COALESCE(MAX(ordinal) + 1, 0)", link_sql)
+        self.assertEqual(link_params[2:], (4242, 77, 5, 77))
+        self.db_utils.transaction.assert_called_once()
+        self.db_utils.transaction.return_value.__exit__.assert_called_once_with(None, None, None)
+        self.db_utils.commit.assert_not_called()
+        self.db_utils.get_one_record.assert_not_called()
+
+    def test_link_failure_propagates_to_transaction(self):
+        self.cursor.execute.side_effect = [None, RuntimeError("link failed")]
+
+        with self.assertRaises(RuntimeError):
+            self.create()
+
+        exit_args = self.db_utils.transaction.return_value.__exit__.call_args[0]
+        self.assertIs(exit_args[0], RuntimeError)
+        self.cursor.close.assert_called_once()
+
+
+class TestGetAttachmentIdsFromFilepaths(unittest.TestCase):
+    def test_chunks_and_maps_back_case_insensitively(self):
+        db_utils = MagicMock()
+        db_utils.get_records.side_effect = [[("/images/cas0001.jpg", 1)], [("/images/CAS0003.JPG", 3)]]
+        attachment_utils = AttachmentUtils(db_utils)
+
+        found = attachment_utils.get_attachmentids_from_filepaths(
+            ["/images/CAS0001.jpg", "/images/cas0002.jpg", "/images/cas0003.jpg", "/images/CAS0001.jpg"],
+            chunk_size=2)
+
+        self.assertEqual(found, {"/images/CAS0001.jpg": 1, "/images/cas0003.jpg": 3})
+        self.assertEqual(db_utils.get_records.call_count, 2)
+        sql, params = db_utils.get_records.call_args_list[0][0]
+        self.assertIn("IN (%s, %s)", sql)
+        self.assertEqual(params, ["/images/CAS0001.jpg", "/images/cas0002.jpg"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+"""unit tests for the pooled transaction scopes in db_utils.py"""
+import threading
+import unittest
+from unittest.mock import MagicMock, patch
+import mysql.connector
+from mysql.connector import errorcode
+from db_utils import DbUtils, run_in_transaction
+
+
+class TestDbUtilsTransaction(unittest.TestCase):
+    def setUp(self):
+        patcher = patch('db_utils.pooling.MySQLConnectionPool')
+        self.pool_class = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.connections = []
+
+        def get_connection():
+            cnx = MagicMock()
+            self.connections.append(cnx)
+            return cnx
+
+        self.pool_class.return_value.get_connection.side_effect = get_connection
+        self.db = DbUtils("user", "pw", 3306, "host", "casiz", pool_size=2)
+        self.db.cnx = MagicMock()
+
+    def test_commits_once_on_pooled_connection(self):
+        with self.db.transaction():
+            self.assertTrue(self.db.in_transaction())
+            self.db.execute("insert into a values (%s)", (1,))
+            self.db.execute("insert into b values (%s)", (2,))
+            self.db.commit()
+
+        self.assertFalse(self.db.in_transaction())
+        self.assertEqual(len(self.connections), 1)
+        cnx = self.connections[0]
+        self.assertEqual(cnx.cursor.return_value.execute.call_count, 2)
+        cnx.commit.assert_called_once()
+        cnx.rollback.assert_not_called()
+        cnx.close.assert_called_once()
+        self.db.cnx.commit.assert_not_called()
+
+    def test_rolls_back_and_reraises(self):
+        with self.assertRaises(ValueError):
+            with self.db.transaction():
+                self.db.execute("insert into a values (1)")
+                raise ValueError("boom")
+
+        cnx = self.connections[0]
+        cnx.rollback.assert_called_once()
+        cnx.commit.assert_not_called()
+        cnx.close.assert_called_once()
+
+    def test_nested_transaction_joins_outer(self):
+        with self.db.transaction():
+            with self.db.transaction():
+                self.db.execute("insert into a values (1)")
+
+        self.assertEqual(len(self.connections), 1)
+        self.connections[0].commit.assert_called_once()
+
+    def test_threads_get_their_own_connection(self):
+        barrier = threading.Barrier(2)
+        seen = []
+
+        def work():
+            with self.db.transaction():
+                seen.append(self.db.thread_state.transaction_cnx)
+                barrier.wait(timeout=5)
+
+        threads = [threading.Thread(target=work) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(seen), 2)
+        self.assertIsNot(seen[0], seen[1])
+        self.pool_class.assert_called_once()
+
+    @patch('db_utils.time.sleep')
+    def test_deadlocked_transaction_is_run_again(self, sleep):
+        calls = []
+
+        def link():
+            calls.append(self.db.thread_state.transaction_cnx)
+            self.db.execute("insert into collectionobjectattachment select ...")
+            if len(calls) == 1:
+                raise mysql.connector.Error("Deadlock found", errno=errorcode.ER_LOCK_DEADLOCK)
+            return 42
+
+        self.assertEqual(run_in_transaction(self.db, link), 42)
+        self.assertEqual(len(calls), 2)
+        self.connections[0].rollback.assert_called_once()
+        self.connections[1].commit.assert_called_once()
+
+    def test_other_errors_are_not_retried(self):
+        def link():
+            raise mysql.connector.Error("Duplicate entry", errno=errorcode.ER_DUP_ENTRY)
+
+        with self.assertRaises(mysql.connector.Error):
+            run_in_transaction(self.db, link)
+        self.assertEqual(len(self.connections), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,45 @@
+"""unit tests for the threaded scandir walker in dir_walker.py"""
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from contextlib import closing
+from dir_walker import ParallelWalker
+
+
+class TestParallelWalker(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        for d in range(20):
+            nested = os.path.join(self.tmp_dir, f"batch{d % 4}", f"folder{d}")
+            os.makedirs(nested)
+            for f in range(5):
+                open(os.path.join(nested, f"CAS{d:03d}{f}.jpg"), 'w').close()
+
+    def os_walk_files(self):
+        return sorted(os.path.join(root, name) for root, _, names in os.walk(self.tmp_dir) for name in names)
+
+    def test_matches_os_walk(self):
+        walker = ParallelWalker(workers=4, queue_size=2)
+        seen = sorted(os.path.join(root, name) for root, _, names in walker.walk(self.tmp_dir) for name in names)
+        self.assertEqual(seen, self.os_walk_files())
+
+    def test_stopping_early_releases_listers(self):
+        threads_before = threading.active_count()
+        walker = ParallelWalker(workers=4, queue_size=1)
+        with closing(walker.walk([self.tmp_dir])) as listings:
+            next(listings)
+        self.assertEqual(threading.active_count(), threads_before)
+
+    def test_unreadable_root_is_skipped(self):
+        walker = ParallelWalker(workers=2)
+        missing = os.path.join(self.tmp_dir, "missing")
+        with self.assertLogs('Client.ParallelWalker', level='WARNING'):
+            listings = list(walker.walk([missing, os.path.join(self.tmp_dir, "batch0")]))
+        self.assertEqual(sum(len(names) for _, _, names in listings), 25)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+"""unit tests for the path index in directory_tree.py"""
+import os
+import shutil
+import tempfile
+import unittest
+from directory_tree import DirectoryTree
+
+
+class TestDirectoryTree(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        self.core = os.path.join(self.tmp_dir, "core")
+        self.labels = os.path.join(self.tmp_dir, "labels")
+        for rel_path in ["a.jpg", "sub/b.jpg", "sub/decoder_ring.tsv", "sub/deeper/c.tif", "empty/"]:
+            self.touch(os.path.join(self.core, rel_path))
+        self.touch(os.path.join(self.labels, "d.jpg"))
+        self.tree = DirectoryTree([self.core, self.labels])
+
+    @staticmethod
+    def touch(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if not path.endswith("/"):
+            open(path, 'w').close()
+
+    def test_process_files_visits_every_file_under_each_root(self):
+        seen = []
+        self.tree.process_files(seen.append)
+
+        self.assertEqual(sorted(seen), sorted([
+            f"{self.core}/a.jpg",
+            f"{self.core}/sub/b.jpg",
+            f"{self.core}/sub/decoder_ring.tsv",
+            f"{self.core}/sub/deeper/c.tif",
+            f"{self.labels}/d.jpg",
+        ]))
+
+    def test_node_lookup_round_trips(self):
+        for full_path in [f"{self.core}/sub/deeper/c.tif", f"{self.labels}/d.jpg", f"{self.core}/empty"]:
+            node = self.tree.get_node_from_path(full_path)
+            self.assertIsNotNone(node)
+            self.assertEqual(self.tree.get_node_path(node), full_path)
+
+        node = self.tree.get_node_from_path(f"{self.core}/sub/deeper/c.tif")
+        self.assertTrue(node.is_leaf)
+        self.assertEqual(node.parent.name, "deeper")
+        self.assertIsNone(self.tree.get_node_from_path(f"{self.core}/sub/missing.jpg"))
+        self.assertIsNone(self.tree.get_node_from_path(os.path.join(self.tmp_dir, "elsewhere", "a.jpg")))
+
+    def test_on_file_streams_while_building(self):
+        streamed = []
+        tree = DirectoryTree([self.core], on_file=streamed.append, scan_workers=2, scan_queue_size=1)
+
+        self.assertEqual(sorted(streamed), sorted(tree.iter_file_paths()))
+        self.assertEqual(len(streamed), 4)
+
+    def test_find_closest_decoder_ring(self):
+        self.assertEqual(self.tree.find_closest_decoder_ring(f"{self.core}/sub/deeper/c.tif"),
+                         f"{self.core}/sub/decoder_ring.tsv")
+        self.assertIsNone(self.tree.find_closest_decoder_ring(f"{self.core}/a.jpg"))
+
+
+if __name__ == '__main__':
+    unittest.main()
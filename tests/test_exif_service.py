@@ -0,0 +1,129 @@
+"""unit tests for the persistent exiftool pool in exif_service.py, run against a stand-in exiftool"""
+import os
+import shutil
+import stat
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+from exif_service import ExifService, parse_exiftool_output, BATCH_TIMEOUT_PER_FILE
+
+# speaks the -stay_open protocol: reads report File:FileName/FileSize, writes append to <file>.tags
+FAKE_EXIFTOOL = r'''#!PYTHON
+import os, sys
+args = []
+while True:
+    line = sys.stdin.readline()
+    if not line:
+        break
+    line = line.rstrip("\n")
+    if args and args[-1] == "-stay_open" and line == "False":
+        break
+    if not line.startswith("-execute"):
+        args.append(line)
+        continue
+    files, echo, writes, i = [], "", [], 0
+    while i < len(args):
+        if args[i] in ("-charset", "-echo4"):
+            echo = args[i + 1] if args[i] == "-echo4" else echo
+            i += 2
+            continue
+        if args[i].startswith("-") and "=" in args[i]:
+            writes.append(args[i][1:])
+        elif not args[i].startswith("-"):
+            files.append(args[i])
+        i += 1
+    for path in files:
+        if not os.path.exists(path):
+            sys.stderr.write(f"Error: File not found - {path}\n")
+        elif writes:
+            with open(path + ".tags", "a") as f:
+                f.write("\n".join(writes) + "\n")
+        else:
+            if len(files) > 1:
+                sys.stdout.write(f"======== {path}\n")
+            sys.stdout.write(f"[File]          File Name                       : {os.path.basename(path)}\n")
+            sys.stdout.write(f"[File]          File Size                       : {os.path.getsize(path)} bytes\n")
+    sys.stdout.write(f"{{ready{line[len('-execute'):]}}}\n")
+    sys.stdout.flush()
+    sys.stderr.write(echo + "\n")
+    sys.stderr.flush()
+    args = []
+'''
+
+
+class TestExifService(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        bin_dir = os.path.join(self.tmp_dir, "bin")
+        os.mkdir(bin_dir)
+        exiftool = os.path.join(bin_dir, "exiftool")
+        with open(exiftool, 'w') as f:
+            f.write(FAKE_EXIFTOOL.replace("PYTHON", sys.executable, 1))
+        os.chmod(exiftool, os.stat(exiftool).st_mode | stat.S_IEXEC)
+        path_patcher = patch.dict(os.environ, {'PATH': bin_dir + os.pathsep + os.environ.get('PATH', '')})
+        path_patcher.start()
+        self.addCleanup(path_patcher.stop)
+
+        self.images = []
+        for i in range(5):
+            path = os.path.join(self.tmp_dir, f"CASIZ {i}.jpg")
+            with open(path, 'wb') as f:
+                f.write(b"x" * (i + 1))
+            self.images.append(path)
+        self.service = ExifService(workers=2, batch_size=2)
+        self.addCleanup(self.service.close)
+
+    def test_read_reuses_process(self):
+        first = self.service.read_tags(self.images[0])
+        second = self.service.read_tags(self.images[1])
+
+        self.assertEqual(first, {'File:FileName': 'CASIZ 0.jpg', 'File:FileSize': '1 bytes'})
+        self.assertEqual(second['File:FileSize'], '2 bytes')
+        self.assertEqual(self.service.started, 1)
+
+    def test_batch_read_chunks_and_skips_unreadable(self):
+        missing = os.path.join(self.tmp_dir, "missing.jpg")
+        results = self.service.read_tags_batch(self.images + [missing])
+
+        self.assertEqual(set(results), set(self.images))
+        self.assertEqual(results[self.images[4]]['File:FileSize'], '5 bytes')
+        with self.assertRaises(ValueError):
+            self.service.read_tags(missing)
+
+    def test_batch_timeout_grows_with_the_chunk(self):
+        with patch.object(self.service, '_execute', return_value=("", "")) as execute:
+            self.service.read_tags_batch(self.images)
+        self.assertEqual([c.kwargs['timeout'] for c in execute.call_args_list],
+                         [self.service.timeout + 2 * BATCH_TIMEOUT_PER_FILE] * 2
+                         + [self.service.timeout + BATCH_TIMEOUT_PER_FILE])
+
+    def test_write_tags(self):
+        self.service.write_tags(self.images[0], {'EXIF:Artist': 'Jane Doe', 'EXIF:Copyright': None},
+                                overwrite_blank=True)
+        with open(self.images[0] + ".tags") as f:
+            self.assertEqual(f.read().splitlines(), ['EXIF:Artist=Jane Doe', 'EXIF:Copyright= '])
+        with self.assertRaises(ValueError):
+            self.service.write_tags(self.images[0], {'Not:ATag': 'x'})
+
+    def test_multi_line_values_are_escaped(self):
+        self.service.write_tags(self.images[1], {'EXIF:Artist': 'Jane Doe', 'EXIF:Copyright': 'line one\r\nA & B'})
+        with open(self.images[1] + ".tags") as f:
+            self.assertEqual(f.read().splitlines(),
+                             ['EXIF:Artist=Jane Doe', 'EXIF:Copyright=line one&#xd;&#xa;A &amp; B'])
+        # and nothing else was taken for a file name
+        self.assertEqual(sorted(os.listdir(self.tmp_dir)),
+                         sorted(['bin', 'CASIZ 1.jpg.tags'] + [os.path.basename(p) for p in self.images]))
+
+
+class TestParseExiftoolOutput(unittest.TestCase):
+    def test_multi_file_sections(self):
+        text = ("======== a.jpg\n[EXIF]  Artist  : Jane\n"
+                "======== b.jpg\n[IPTC]  Keywords  : casiz 123\n    2 image files read\n")
+        self.assertEqual(parse_exiftool_output(text),
+                         {'a.jpg': {'EXIF:Artist': 'Jane'}, 'b.jpg': {'IPTC:Keywords': 'casiz 123'}})
+
+
+if __name__ == '__main__':
+    unittest.main()
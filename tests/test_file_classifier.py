@@ -0,0 +1,55 @@
+"""unit tests for the shared file classifier in file_classifier.py"""
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+from file_classifier import FileClassifier, FileClass
+
+IZ_SUFFIX = r'[a-z\-\(\)0-9 ©_,.]*(\.(jpg|jpeg|tiff|tif|png|dng))$'
+BOTANY_SUFFIX = "(CAS|cas)[0-9]*([-_])*[0-9a-zA-Z]?.(JPG|jpg|jpeg|TIFF|tif)"
+
+
+class TestFileClassifier(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+
+    def write(self, name, content):
+        path = os.path.join(self.tmp_dir, name)
+        with open(path, 'wb') as f:
+            f.write(content)
+        return path
+
+    def test_mime_type_from_extension(self):
+        classifier = FileClassifier()
+        self.assertEqual(classifier.mime_type("/a/B.JPEG"), 'image/jpeg')
+        self.assertEqual(classifier.mime_type("/a/b.tif"), 'image/tiff')
+        self.assertEqual(classifier.mime_type("/a.d/b.pdf"), 'application/pdf')
+        self.assertIsNone(classifier.mime_type("/a.d/b"))
+        self.assertIsNone(classifier.mime_type("/a/b.dng"))
+
+    def test_headers_sniffed_only_for_untrusted_extensions(self):
+        classifier = FileClassifier(trusted_extensions=['tif', 'tiff'])
+        png = self.write("real.png", b"\x89PNG\r\n\x1a\n" + b"\0" * 32)
+        fake = self.write("fake.jpg", b"not an image")
+        tiff = self.write("odd.TIF", b"not recognised")
+        with patch('file_classifier.filetype.is_image', wraps=__import__('filetype').is_image) as sniff:
+            self.assertEqual(classifier.classify(png), FileClass('png', 'image/png', True))
+            self.assertEqual(classifier.classify(fake), FileClass('jpg', 'image/jpeg', False))
+            self.assertEqual(classifier.classify(tiff), FileClass('tif', 'image/tiff', True))
+            self.assertFalse(classifier.classify(os.path.join(self.tmp_dir, "noextension")).valid)
+        self.assertEqual(sniff.call_count, 2)
+
+    def test_name_patterns(self):
+        iz = FileClassifier(name_pattern=IZ_SUFFIX, match_anywhere=True)
+        self.assertTrue(iz.matches_name("/images/casiz 1234.jpg"))
+        self.assertFalse(iz.matches_name("image.jpg.pdf"))
+        botany = FileClassifier(name_pattern=BOTANY_SUFFIX)
+        self.assertTrue(botany.matches_name("cas0001234.jpg"))
+        self.assertFalse(botany.matches_name("xcas0001234.jpg"))
+        self.assertTrue(FileClassifier().matches_name("anything"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+"""unit tests for the incremental scan manifest in file_manifest.py"""
+import os
+import shutil
+import tempfile
+import unittest
+from file_manifest import FileManifest, IMPORTED, REJECTED
+
+
+class TestFileManifest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        self.manifest_path = os.path.join(self.tmp_dir, "manifest.sqlite")
+        self.manifest = FileManifest(self.manifest_path)
+        self.addCleanup(self.manifest.close)
+        self.image_path = os.path.join(self.tmp_dir, "CAS0001.jpg")
+        self.write_image(b"original")
+
+    def write_image(self, content, mtime_ns=None):
+        with open(self.image_path, 'wb') as f:
+            f.write(content)
+        if mtime_ns is not None:
+            os.utime(self.image_path, ns=(mtime_ns, mtime_ns))
+
+    def test_skips_unchanged_final_outcomes(self):
+        self.assertFalse(self.manifest.should_skip(self.image_path))
+        self.manifest.record(self.image_path, IMPORTED)
+        self.assertTrue(self.manifest.should_skip(self.image_path))
+        self.manifest.record(self.image_path, REJECTED)
+        self.assertTrue(self.manifest.should_skip(self.image_path))
+        self.manifest.record(self.image_path, 'pending')
+        self.assertFalse(self.manifest.should_skip(self.image_path))
+
+    def test_change_in_file_or_context_invalidates(self):
+        self.manifest.record(self.image_path, IMPORTED, context="key.csv:1")
+        self.assertFalse(self.manifest.should_skip(self.image_path, context="key.csv:2"))
+        self.assertTrue(self.manifest.should_skip(self.image_path, context="key.csv:1"))
+
+        self.write_image(b"edited in place", mtime_ns=os.stat(self.image_path).st_mtime_ns + 1)
+        self.assertFalse(self.manifest.should_skip(self.image_path, context="key.csv:1"))
+
+    def test_survives_reopen(self):
+        self.manifest.record(self.image_path, IMPORTED)
+        self.manifest.close()
+
+        reopened = FileManifest(self.manifest_path)
+        self.addCleanup(reopened.close)
+        self.assertTrue(reopened.should_skip(self.image_path))
+
+    def test_verify_drops_stale_rows_and_rebuild_clears(self):
+        other_path = os.path.join(self.tmp_dir, "CAS0002.jpg")
+        with open(other_path, 'wb') as f:
+            f.write(b"other")
+        self.manifest.record(self.image_path, IMPORTED)
+        self.manifest.record(other_path, IMPORTED)
+        os.remove(other_path)
+
+        self.assertEqual(self.manifest.verify(), (2, 1))
+        self.assertTrue(self.manifest.should_skip(self.image_path))
+
+        self.assertEqual(self.manifest.rebuild(), 1)
+        self.assertFalse(self.manifest.should_skip(self.image_path))
+
+    def test_verify_drops_imported_rows_missing_on_the_server(self):
+        rejected_path = os.path.join(self.tmp_dir, "notes.txt")
+        with open(rejected_path, 'w') as f:
+            f.write("not an image")
+        self.manifest.record(self.image_path, IMPORTED)
+        self.manifest.record(rejected_path, REJECTED)
+        asked = []
+
+        def still_imported(paths):
+            asked.append(paths)
+            return []
+
+        self.assertEqual(self.manifest.verify(still_imported=still_imported), (2, 1))
+        self.assertEqual(asked, [[self.image_path]])
+        self.assertFalse(self.manifest.should_skip(self.image_path))
+        self.assertTrue(self.manifest.should_skip(rejected_path))
+
+    def test_md5_cached_until_file_changes(self):
+        self.assertIsNone(self.manifest.get_md5(self.image_path))
+        self.manifest.record_md5(self.image_path, "abc123")
+        self.assertEqual(self.manifest.get_md5(self.image_path), "abc123")
+        self.manifest.rebuild()
+        self.assertEqual(self.manifest.get_md5(self.image_path), "abc123")
+
+        self.write_image(b"edited content", mtime_ns=os.stat(self.image_path).st_mtime_ns + 10 ** 9)
+        self.assertIsNone(self.manifest.get_md5(self.image_path))
+
+
+if __name__ == '__main__':
+    unittest.main()
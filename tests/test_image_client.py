@@ -0,0 +1,71 @@
+"""unit tests for the bulk "already imported?" lookup in image_client.py"""
+import unittest
+from unittest.mock import patch, MagicMock
+from image_client import ImageClient
+
+
+class BulkConfig:
+    MAILING_LIST = []
+    BULK_LOOKUP_CHUNK_SIZE = 2
+
+
+def make_response(status_code, body=None):
+    response = MagicMock()
+    response.status_code = status_code
+    response.json.return_value = body
+    return response
+
+
+@patch('image_client.server_time_delta', 0, create=True)
+@patch('image_client.ImageClient.update_time_delta')
+class TestBulkLookup(unittest.TestCase):
+
+    def test_bulk_route_chunks_and_maps_names(self, mock_time_delta):
+        client = ImageClient(config=BulkConfig())
+        responses = [make_response(200, ["CAS0001.jpg"]), make_response(200, ["CAS%20003.jpg"])]
+        with patch.object(client, 'request_with_retries', side_effect=responses) as mock_request, \
+                patch.object(client, 'check_image_db_if_filename_imported') as mock_single:
+            imported = client.check_image_db_if_filenames_imported(
+                "Botany", ["CAS0001.jpg", "CAS0002.jpg", "CAS 003.jpg", "CAS0001.jpg"])
+
+        self.assertEqual(imported, {"CAS0001.jpg", "CAS 003.jpg"})
+        self.assertEqual(mock_request.call_count, 2)
+        mock_single.assert_not_called()
+
+    def test_falls_back_per_file_without_bulk_route(self, mock_time_delta):
+        client = ImageClient(config=BulkConfig())
+        with patch.object(client, 'request_with_retries', return_value=make_response(404)) as mock_request, \
+                patch.object(client, 'check_image_db_if_filename_imported',
+                             side_effect=lambda coll, name, exact: name == "CAS0003.jpg") as mock_single:
+            imported = client.check_image_db_if_filenames_imported(
+                "Botany", ["CAS0001.jpg", "CAS0002.jpg", "CAS0003.jpg"])
+
+        self.assertEqual(imported, {"CAS0003.jpg"})
+        self.assertFalse(client.bulk_lookup_supported)
+        # the missing route is only probed once
+        self.assertEqual(mock_request.call_count, 1)
+        self.assertEqual(mock_single.call_count, 3)
+
+    def test_json_404_means_nothing_imported(self, mock_time_delta):
+        client = ImageClient(config=BulkConfig())
+        with patch.object(client, 'request_with_retries', return_value=make_response(404, [])) as mock_request, \
+                patch.object(client, 'check_image_db_if_filename_imported') as mock_single:
+            imported = client.check_image_db_if_filenames_imported(
+                "Botany", ["CAS0001.jpg", "CAS0002.jpg", "CAS0003.jpg"])
+
+        self.assertEqual(imported, set())
+        self.assertTrue(client.bulk_lookup_supported)
+        self.assertEqual(mock_request.call_count, 2)
+        mock_single.assert_not_called()
+
+    def test_no_per_file_fallback_when_asked(self, mock_time_delta):
+        client = ImageClient(config=BulkConfig())
+        with patch.object(client, 'request_with_retries', return_value=make_response(405)), \
+                patch.object(client, 'check_image_db_if_filename_imported') as mock_single:
+            self.assertIsNone(client.check_image_db_if_filenames_imported(
+                "IZ", ["/iz/a.jpg", "/iz/b.jpg", "/iz/c.jpg"], per_file_fallback=False))
+        mock_single.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
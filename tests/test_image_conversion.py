@@ -0,0 +1,158 @@
+"""unit tests for the Pillow conversion backend in image_conversion.py"""
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from PIL import Image, IptcImagePlugin
+from image_conversion import PillowConversionBackend, ImageConverter, ConversionStage, ConvertException, \
+    unlimited_image_pixels
+
+
+class TestPillowConversion(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.backend = PillowConversionBackend()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_multipage_tiff_keeps_largest_frame(self):
+        tiff_path = os.path.join(self.tmp_dir, "CAS0001.tif")
+        small = Image.new('RGB', (40, 30), 'red')
+        large = Image.new('RGB', (400, 300), 'blue')
+        medium = Image.new('RGB', (200, 150), 'green')
+        small.save(tiff_path, save_all=True, append_images=[large, medium])
+
+        jpg_dest = os.path.join(self.tmp_dir, "CAS0001.jpg")
+        self.backend.convert(tiff_path, jpg_dest)
+
+        with Image.open(jpg_dest) as jpg:
+            self.assertEqual(jpg.format, 'JPEG')
+            self.assertEqual(jpg.size, (400, 300))
+            self.assertGreater(jpg.getpixel((200, 150))[2], 200)
+
+    def test_16bit_and_alpha_modes_are_flattened(self):
+        for mode, color in (('I;16', 40000), ('RGBA', (0, 0, 0, 0))):
+            tiff_path = os.path.join(self.tmp_dir, f"alpha_{mode.replace(';', '')}.tif")
+            Image.new(mode, (50, 50), color).save(tiff_path)
+            jpg_dest = os.path.join(self.tmp_dir, f"alpha_{mode.replace(';', '')}.jpg")
+            self.backend.convert(tiff_path, jpg_dest)
+            with Image.open(jpg_dest) as jpg:
+                self.assertIn(jpg.mode, ('L', 'RGB'))
+                if mode == 'RGBA':
+                    # transparent pixels flatten to a white background
+                    self.assertEqual(jpg.getpixel((25, 25)), (255, 255, 255))
+
+    def test_metadata_and_orientation_carry_over(self):
+        tiff_path = os.path.join(self.tmp_dir, "CAS0002.tif")
+        exif = Image.Exif()
+        exif[0x0112] = 6
+        exif[0x013B] = "Jane Doe"
+        exif[700] = b'<x:xmpmeta xmlns:x="adobe:ns:meta/"/>'
+        exif[33723] = b"\x1c\x02\x05\x00\x04test"
+        image = Image.new('RGB', (60, 40), 'blue')
+        image.paste((255, 0, 0), (0, 0, 10, 10))
+        image.save(tiff_path, exif=exif)
+
+        jpg_dest = os.path.join(self.tmp_dir, "CAS0002.jpg")
+        self.backend.convert(tiff_path, jpg_dest)
+
+        with Image.open(jpg_dest) as jpg:
+            # stored as in the tiff, with the tag that turns it upright, as `convert` writes it
+            self.assertEqual(jpg.size, (60, 40))
+            self.assertGreater(jpg.getpixel((2, 2))[0], 200)
+            self.assertEqual(jpg.getexif()[0x0112], 6)
+            self.assertEqual(jpg.getexif()[0x013B], "Jane Doe")
+            self.assertNotIn(273, jpg.getexif())
+            self.assertEqual(jpg.info['xmp'], b'<x:xmpmeta xmlns:x="adobe:ns:meta/"/>')
+            self.assertEqual(IptcImagePlugin.getiptcinfo(jpg), {(2, 5): b"test"})
+
+    def test_pixel_limit_only_lifted_during_conversion(self):
+        limit = Image.MAX_IMAGE_PIXELS
+        self.assertIsNotNone(limit)
+        with unlimited_image_pixels():
+            self.assertIsNone(Image.MAX_IMAGE_PIXELS)
+        self.assertEqual(Image.MAX_IMAGE_PIXELS, limit)
+
+    def test_unreadable_file_raises_convert_exception(self):
+        bad_path = os.path.join(self.tmp_dir, "bad.tif")
+        with open(bad_path, 'wb') as f:
+            f.write(b"not a tiff")
+        converter = ImageConverter('pillow')
+        converter.fallback = None
+        with self.assertRaises(ConvertException):
+            converter.convert(bad_path, os.path.join(self.tmp_dir, "bad.jpg"), 'tif')
+
+
+if __name__ == '__main__':
+    unittest.main()
+
+
+class TestConversionStage(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def make_tiff(self, name, size=(300, 200)):
+        path = os.path.join(self.tmp_dir, name)
+        Image.effect_noise(size, 50).convert('RGB').save(path)
+        return path
+
+    def test_budget_limits_conversions_in_flight(self):
+        tiffs = [self.make_tiff(f"CAS000{i}.tif") for i in range(3)]
+        tiff_size = os.path.getsize(tiffs[0])
+        # room for one source file at a time
+        stage = ConversionStage('pillow', workers=2, budget_bytes=int(tiff_size * 1.5))
+        try:
+            for i, tiff in enumerate(tiffs):
+                os.mkdir(os.path.join(self.tmp_dir, f"work{i}"))
+                stage.submit(tiff, os.path.join(self.tmp_dir, f"work{i}", f"CAS000{i}.jpg"), 'tif')
+            self.assertEqual(len(stage.running), 1)
+            self.assertEqual(len(stage.queued), 2)
+            # a file still waiting on budget is handed back for inline conversion
+            self.assertIsNone(stage.result(tiffs[2]))
+            self.assertNotIn(tiffs[2], stage.queued)
+
+            jpg_path, _ = stage.result(tiffs[0])
+            self.assertTrue(os.path.exists(jpg_path))
+            os.remove(jpg_path)
+            stage.release(tiffs[0])
+
+            # the freed budget lets the next queued file start
+            self.assertIn(tiffs[1], stage.running)
+            jpg_path, _ = stage.result(tiffs[1])
+            self.assertTrue(os.path.exists(jpg_path))
+            stage.release(tiffs[1])
+            self.assertEqual(stage.reserved_bytes, 0)
+        finally:
+            stage.shutdown()
+
+    def test_discard_frees_budget_and_work_dir(self):
+        tiffs = [self.make_tiff(f"CAS001{i}.tif") for i in range(2)]
+        stage = ConversionStage('pillow', workers=1, budget_bytes=int(os.path.getsize(tiffs[0]) * 1.5))
+        work_dirs = [os.path.join(self.tmp_dir, f"work{i}") for i in range(2)]
+        try:
+            for tiff, work_dir in zip(tiffs, work_dirs):
+                stage.submit(tiff, os.path.join(work_dir, os.path.basename(tiff)[:-4] + ".jpg"), 'tif')
+            # a queued file has no folder yet
+            self.assertTrue(os.path.isdir(work_dirs[0]))
+            self.assertFalse(os.path.exists(work_dirs[1]))
+
+            # a file that won't be uploaded hands its budget on and leaves nothing behind
+            stage.discard(tiffs[0])
+            deadline = time.time() + 30
+            while tiffs[1] not in stage.running and time.time() < deadline:
+                time.sleep(0.05)
+            self.assertIsNotNone(stage.result(tiffs[1]))
+            self.assertNotIn(tiffs[0], stage.running)
+            self.assertFalse(os.path.exists(work_dirs[0]))
+
+            stage.discard(tiffs[1])
+            self.assertEqual(stage.running, {})
+            self.assertEqual(stage.reserved_bytes, 0)
+            self.assertFalse(os.path.exists(work_dirs[1]))
+        finally:
+            stage.shutdown()
@@ -0,0 +1,53 @@
+"""unit tests for the key.csv cache in key_file_cache.py"""
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+from key_file_cache import KeyFileCache
+
+
+class TestKeyFileCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        self.keyed = os.path.join(self.tmp_dir, "keyed")
+        os.makedirs(os.path.join(self.keyed, "a", "b"))
+        os.makedirs(os.path.join(self.keyed, "a", "c"))
+        self.key_path = os.path.join(self.keyed, "key.csv")
+        with open(self.key_path, 'w') as f:
+            f.write("credit,first\n")
+        self.cache = KeyFileCache(recheck_seconds=0)
+
+    def test_find_checks_each_folder_once(self):
+        with patch('key_file_cache.os.path.isfile', wraps=os.path.isfile) as isfile:
+            self.assertEqual(self.cache.find(os.path.join(self.keyed, "a", "b")), self.key_path)
+            self.assertEqual(isfile.call_count, 3)
+            self.assertEqual(self.cache.find(os.path.join(self.keyed, "a", "c")), self.key_path)
+            self.assertEqual(self.cache.find(os.path.join(self.keyed, "a", "b")), self.key_path)
+            self.assertEqual(isfile.call_count, 4)
+
+    def test_find_without_key(self):
+        self.assertIsNone(self.cache.find(self.tmp_dir))
+        self.assertIsNone(self.cache.find('/'))
+
+    def test_read_reparses_only_on_mtime_change(self):
+        def parse(path):
+            with open(path) as f:
+                return {'credit': f.read().split(",")[1].strip()}
+
+        first = self.cache.read(self.key_path, parse)
+        first['credit'] = 'mutated by caller'
+        self.assertEqual(self.cache.read(self.key_path, parse), {'credit': 'first'})
+        self.assertEqual(self.cache.parses, 1)
+
+        with open(self.key_path, 'w') as f:
+            f.write("credit,second\n")
+        mtime_ns = os.stat(self.key_path).st_mtime_ns + 1_000_000
+        os.utime(self.key_path, ns=(mtime_ns, mtime_ns))
+        self.assertEqual(self.cache.read(self.key_path, parse), {'credit': 'second'})
+        self.assertEqual(self.cache.parses, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+"""unit tests for the LRU lookup cache in lookup_cache.py and its use in sql_csv_utils.py"""
+import logging
+import unittest
+from unittest.mock import MagicMock
+from lookup_cache import LookupCache, MISSING
+from sql_csv_utils import SqlCsvTools
+
+
+class TestLookupCache(unittest.TestCase):
+    def test_evicts_least_recently_used(self):
+        cache = LookupCache(max_entries=2)
+        cache.put(('taxon', 'TaxonID', 'FullName', 'a'), 1)
+        cache.put(('taxon', 'TaxonID', 'FullName', 'b'), 2)
+        cache.get(('taxon', 'TaxonID', 'FullName', 'a'))
+        cache.put(('taxon', 'TaxonID', 'FullName', 'c'), 3)
+
+        self.assertIs(cache.get(('taxon', 'TaxonID', 'FullName', 'b')), MISSING)
+        self.assertEqual(cache.get(('taxon', 'TaxonID', 'FullName', 'a')), 1)
+        self.assertEqual(cache.evictions, 1)
+
+    def test_invalidate_drops_one_table(self):
+        cache = LookupCache(max_entries=10)
+        cache.put(('agent', 'AgentID', 'LastName', 'unspecified'), 5)
+        cache.put(('geography', 'GeographyID', 'FullName', 'Marin County'), None)
+        cache.invalidate('AGENT')
+
+        self.assertIs(cache.get(('agent', 'AgentID', 'LastName', 'unspecified')), MISSING)
+        self.assertIsNone(cache.get(('geography', 'GeographyID', 'FullName', 'Marin County')))
+
+
+class TestCachedGetOneMatch(unittest.TestCase):
+    def setUp(self):
+        self.sql_tools = SqlCsvTools.__new__(SqlCsvTools)
+        self.sql_tools.logger = logging.getLogger("TestCachedGetOneMatch")
+        self.sql_tools.lookup_cache = LookupCache(max_entries=10)
+        self.sql_tools.specify_db_connection = MagicMock()
+        self.sql_tools.specify_db_connection.get_one_record.side_effect = [None, 42]
+
+    def test_no_match_is_cached_until_table_written(self):
+        args = dict(tab_name='taxon', id_col='TaxonID', key_col='FullName', match='castilleja miniata')
+        self.assertIsNone(self.sql_tools.get_one_match(**args))
+        self.assertIsNone(self.sql_tools.get_one_match(**args))
+        self.assertEqual(self.sql_tools.specify_db_connection.get_one_record.call_count, 1)
+
+        self.sql_tools.insert_table_record("INSERT INTO taxon (FullName) VALUES (%s);", ('castilleja miniata',))
+        self.assertEqual(self.sql_tools.get_one_match(**args), 42)
+        self.assertEqual(self.sql_tools.lookup_cache_stats()['lookup cache hits'], 1)
+        self.assertEqual(self.sql_tools.lookup_cache_stats()['lookup cache misses'], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
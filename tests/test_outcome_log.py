@@ -0,0 +1,61 @@
+"""unit tests for the buffered outcome log in outcome_log.py"""
+import csv
+import gzip
+import io
+import os
+import shutil
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from outcome_log import OutcomeLog, PRINT_REJECTED
+
+COLUMNS = ('outcome', 'filename', 'path')
+
+
+class TestOutcomeLog(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        self.path = os.path.join(self.tmp_dir, "outcomes.tsv")
+
+    def read_rows(self, path=None):
+        with open(path or self.path, newline="") as f:
+            return list(csv.reader(f, delimiter="\t"))
+
+    def test_rows_are_buffered_until_batch_is_full(self):
+        log = OutcomeLog(self.path, COLUMNS, buffer_rows=3, flush_seconds=3600, print_mode='none')
+        log.record(('imported', 'a.jpg', '/x/a.jpg'))
+        log.record(('rejected', 'b\tc.jpg', '/x/b\tc.jpg'), rejected=True)
+        self.assertEqual(self.read_rows(), [list(COLUMNS)])
+
+        log.record(('imported', 'd.jpg', '/x/d.jpg'))
+        rows = self.read_rows()
+        self.assertEqual(len(rows), 4)
+        self.assertEqual(rows[2], ['rejected', 'b\tc.jpg', '/x/b\tc.jpg'])
+        log.close()
+
+    def test_rotates_to_gzip(self):
+        log = OutcomeLog(self.path, COLUMNS, buffer_rows=1, rotate_bytes=50, print_mode='none')
+        for i in range(4):
+            log.record(('imported', f'{i}.jpg', f'/some/long/folder/name/{i}.jpg'))
+        log.close()
+
+        with gzip.open(f"{self.path}.1.gz", "rt", newline="") as f:
+            rotated = list(csv.reader(f, delimiter="\t"))
+        self.assertEqual(rotated[0], list(COLUMNS))
+        self.assertEqual(rotated[1][1], '0.jpg')
+        self.assertEqual(self.read_rows()[0], list(COLUMNS))
+
+    def test_print_mode_rejected(self):
+        log = OutcomeLog(self.path, COLUMNS, print_mode=PRINT_REJECTED)
+        out = io.StringIO()
+        with redirect_stdout(out):
+            log.record(('imported', 'a.jpg', '/x/a.jpg'), message="imported a")
+            log.record(('rejected', 'b.jpg', '/x/b.jpg'), rejected=True, message="rejected b")
+        log.close()
+        self.assertEqual(out.getvalue(), "rejected b\n")
+        self.assertEqual(len(self.read_rows()), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
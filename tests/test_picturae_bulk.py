@@ -0,0 +1,174 @@
+"""unit tests for the chunked bulk record upload in picturae_importer.py"""
+import itertools
+import logging
+import os
+import shutil
+import tempfile
+import unittest
+from contextlib import contextmanager
+from types import SimpleNamespace
+import pandas as pd
+from picturae_importer import PicturaeImporter, GuidRef
+
+
+class FakeSqlTools:
+    """stands in for SqlCsvTools: keeps inserted rows per table and hands out ids per GUID"""
+
+    def __init__(self, fail_table=None, fail_catalog_number=None):
+        self.fail_table = fail_table
+        self.fail_catalog_number = fail_catalog_number
+        self.tables = {}
+        self.ids = {}
+        self.next_id = itertools.count(100)
+        self.executemany_calls = 0
+        self.guid_queries = 0
+        self.committed = None
+
+    @contextmanager
+    def transaction(self):
+        pending = {table: list(rows) for table, rows in self.tables.items()}
+        try:
+            yield self
+            self.committed = True
+        except BaseException:
+            self.tables = pending
+            self.committed = False
+            raise
+
+    def insert_many(self, tab_name, col_list, rows):
+        if tab_name == self.fail_table:
+            raise RuntimeError(f"insert into {tab_name} failed")
+        if self.fail_catalog_number is not None and tab_name == 'collectionobject' and \
+                self.fail_catalog_number in [dict(zip(col_list, row)).get('CatalogNumber') for row in rows]:
+            raise RuntimeError(f"insert of {self.fail_catalog_number} failed")
+        self.executemany_calls += 1
+        for row in rows:
+            record = dict(zip(col_list, row))
+            self.tables.setdefault(tab_name, []).append(record)
+            if 'GUID' in record:
+                self.ids[record['GUID']] = next(self.next_id)
+
+    def get_ids_by_guid(self, tab_name, id_col, guids):
+        self.guid_queries += 1
+        return {guid: self.ids[guid] for guid in guids if guid in self.ids}
+
+    def get_is_taxon_id_redacted(self, taxon_id):
+        return False
+
+    def check_agent_name_sql(self, **kwargs):
+        raise AssertionError("new agents should be resolved from the chunk")
+
+
+class TestPicturaeBulkUpload(unittest.TestCase):
+    def setUp(self):
+        self.importer = PicturaeImporter.__new__(PicturaeImporter)
+        self.importer.logger = logging.getLogger("TestPicturaeBulkUpload")
+        self.importer.picturae_config = SimpleNamespace(PROJECT_NAME="project", BULK_RECORD_UPLOAD=True,
+                                                        BULK_RECORD_CHUNK_SIZE=2)
+        self.importer.created_by_agent = 1
+        self.importer.new_taxa = []
+        self.importer.sql_csv_tools = FakeSqlTools()
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        self.image_paths = [os.path.join(self.tmp_dir, f"CAS00000{n}.jpg") for n in '123']
+        for image_path in self.image_paths:
+            open(image_path, 'w').close()
+        self.importer.record_full = pd.DataFrame({'CatalogNumber': ['1', '2', '3'],
+                                                  'image_path': self.image_paths,
+                                                  'barcode_present': [False, False, False]})
+        self.importer.barcode_list = ['1', '2', '3']
+        self.importer.image_list = list(self.image_paths)
+        self.importer.failed_image_list = []
+        self.importer.prepare_row = self.fake_prepare_row
+
+    def fake_prepare_row(self, row):
+        """sets the fields populate_fields and create_agent_list would, for a sheet by one new collector"""
+        importer = self.importer
+        for field in ['accession', 'herb_code', 'min_elevation', 'max_elevation', 'elevation_unit',
+                      'verbatim_lat', 'verbatim_long', 'latitude', 'longitude', 'datum', 'utm_easting',
+                      'utm_zone', 'utm_datum', 'verbatim_date', 'start_date', 'end_date', 'habitat',
+                      'specimen_desc', 'qualifier']:
+            setattr(importer, field, None)
+        importer.barcode = row.CatalogNumber.zfill(9)
+        importer.locality = f"locality {row.CatalogNumber}"
+        importer.utm_northing = '4000' if row.CatalogNumber == '1' else ''
+        importer.coordinate_form = 0
+        importer.GeographyID = 5
+        importer.collector_number = row.CatalogNumber
+        importer.label_data = "label"
+        importer.sheet_notes = ""
+        importer.tax_notes = ""
+        importer.full_name = "Castilleja miniata"
+        importer.taxon_id = 7
+        importer.redacted = False
+        for guid_string in ['collecting_event_guid', 'collection_ob_guid', 'locality_guid', 'determination_guid']:
+            setattr(importer, guid_string, f"{guid_string}-{row.CatalogNumber}")
+        collector = {'collector_first_name': 'Ada', 'collector_middle_initial': '',
+                     'collector_last_name': 'Lovelace', 'collector_title': '', 'agent_id': ''}
+        importer.full_collector_list = [collector]
+        importer.new_collector_list = [dict(collector)]
+        importer.record_full.loc[importer.record_full['CatalogNumber'] == row.CatalogNumber,
+                                 'barcode_present'] = True
+
+    def test_chunks_link_records_by_resolved_guid(self):
+        self.importer.upload_records()
+        tables = self.importer.sql_csv_tools.tables
+        ids = self.importer.sql_csv_tools.ids
+
+        self.assertEqual(len(tables['collectionobject']), 3)
+        self.assertEqual(len(tables['localitydetail']), 1)
+        # the new collector is added once per chunk, not once per sheet
+        self.assertEqual(len(tables['agent']), 2)
+
+        for collecting_event in tables['collectingevent']:
+            number = collecting_event['StationFieldNumber']
+            self.assertEqual(collecting_event['LocalityID'], ids[f"locality_guid-{number}"])
+        for collector in tables['collector']:
+            self.assertIn(collector['AgentID'], [ids[agent['GUID']] for agent in tables['agent']])
+            self.assertNotIsInstance(collector['AgentID'], GuidRef)
+        determined = {determination['CollectionObjectID'] for determination in tables['determination']}
+        self.assertEqual(determined, {ids[f"collection_ob_guid-{n}"] for n in '123'})
+
+        # two chunks, each resolving agent, locality, collectingevent and collectionobject once
+        self.assertEqual(self.importer.sql_csv_tools.guid_queries, 8)
+
+    def test_failed_chunk_rolls_back(self):
+        self.importer.sql_csv_tools = FakeSqlTools(fail_table='determination')
+        self.importer.upload_records()
+
+        self.assertFalse(self.importer.sql_csv_tools.committed)
+        self.assertEqual(self.importer.sql_csv_tools.tables.get('collectionobject', []), [])
+        self.assertFalse(self.importer.record_full['barcode_present'].any())
+        self.assertEqual(self.importer.image_list, [])
+
+    def test_rolled_back_images_are_hidden_from_attachment_upload(self):
+        self.importer.sql_csv_tools = FakeSqlTools(fail_catalog_number='000000003')
+        self.importer.upload_records()
+
+        self.assertEqual(len(self.importer.sql_csv_tools.tables['collectionobject']), 2)
+        self.assertEqual(self.importer.barcode_list, ['1', '2'])
+        self.assertEqual(self.importer.image_list, self.image_paths[:2])
+        self.assertEqual(list(self.importer.record_full['barcode_present']), [True, True, False])
+
+        # so BotanyImporter never sees the sheet whose collection object was rolled back
+        self.importer.hide_unwanted_files()
+        self.assertEqual(sorted(os.listdir(self.tmp_dir)), ['.hidden_CAS000003.jpg', 'CAS000001.jpg', 'CAS000002.jpg'])
+        self.importer.unhide_files()
+        self.assertEqual(sorted(os.listdir(self.tmp_dir)), ['CAS000001.jpg', 'CAS000002.jpg', 'CAS000003.jpg'])
+
+    def test_rolled_back_taxa_leave_new_taxa(self):
+        self.importer.sql_csv_tools = FakeSqlTools(fail_catalog_number='000000003')
+
+        def prepare_row_creating_taxon(row):
+            self.fake_prepare_row(row)
+            # as prepare_row does after TaxonomyImporter.create_taxon()
+            self.importer.new_taxa.append(f"Castilleja nova{row.CatalogNumber}")
+
+        self.importer.prepare_row = prepare_row_creating_taxon
+        self.importer.upload_records()
+
+        self.assertEqual(self.importer.new_taxa, ["Castilleja nova1", "Castilleja nova2"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+"""unit tests for the vectorized taxon_concat_columns and col_clean in taxon_importer.py"""
+import logging
+import unittest
+import pandas as pd
+from taxon_importer import TaxonomyImporter
+
+# the test_taxontree.py fixture names, split back into their csv columns
+TAXON_ROWS = {'Genus': ['Castilleja', 'Castilleja', 'Rafflesia', 'Salix', '', 'Quercus'],
+              'Species': ['miniata', 'miniata', 'arnoldi', 'x ambigua', '', 'cf. robur'],
+              'Rank 1': ['', 'subsp.', 'var.', '', '', ''],
+              'Epithet 1': ['', 'fakus', 'summi', '', '', 'alba'],
+              'Rank 2': ['', 'var.', '', '', '', ''],
+              'Epithet 2': ['', 'fake x cool', '', '', '', ''],
+              'Hybrid': ['False', 'True', 'False', 'True', 'False', 'false'],
+              'Family': ['Orobanchaceae', 'Orobanchaceae', 'Rafflesiaceae', 'Salicaceae', 'Fagaceae', 'Fagaceae'],
+              'Author': [' Dougl. ex Hook. ', 'Erd.', 'Drew', 'Schleich. ex Ser', '', '']}
+
+DERIVED_COLUMNS = ['gen_spec', 'fullname', 'first_intra', 'taxname', 'hybrid_base']
+
+
+class TestTaxonConcat(unittest.TestCase):
+    def make_importer(self):
+        importer = TaxonomyImporter.__new__(TaxonomyImporter)
+        importer.logger = logging.getLogger("TestTaxonConcat")
+        importer.record_full = pd.DataFrame(TAXON_ROWS)
+        return importer
+
+    def test_matches_taxontree_fixtures(self):
+        importer = self.make_importer()
+        importer.col_clean()
+        record_full = importer.record_full
+
+        self.assertEqual(list(record_full['gen_spec'][:4]),
+                         ['Castilleja miniata', 'Castilleja miniata', 'Rafflesia arnoldi', 'Salix x ambigua'])
+        self.assertEqual(list(record_full['first_intra'][:4]),
+                         ['Castilleja miniata', 'Castilleja miniata subsp. fakus',
+                          'Rafflesia arnoldi var. summi', 'Salix x ambigua'])
+        self.assertEqual(list(record_full['taxname'][:4]), ['miniata', 'fake x cool', 'summi', 'x ambigua'])
+        # hybrids keep their full name in hybrid_base and search TNRS on the base name
+        self.assertEqual(list(record_full['fullname'][:4]),
+                         ['Castilleja miniata', 'Castilleja miniata subsp. fakus', 'Rafflesia arnoldi var. summi',
+                          'Salix'])
+        self.assertEqual(list(record_full['hybrid_base'][:4]),
+                         ['', 'Castilleja miniata subsp. fakus var. fake x cool', '', 'Salix x ambigua'])
+        self.assertEqual(list(record_full.loc[4, DERIVED_COLUMNS]), ['missing taxon in row'] * 5)
+        # qualifiers are dropped from taxname only
+        self.assertEqual(record_full.loc[5, 'fullname'], 'Quercus cf. robur subsp. alba')
+        self.assertEqual(record_full.loc[5, 'taxname'], 'alba')
+
+    def test_same_strings_as_row_wise_taxon_concat(self):
+        importer = self.make_importer()
+        importer.col_clean()
+        vectorized = importer.record_full[DERIVED_COLUMNS]
+
+        # the row-wise version, on the same cleaned columns
+        row_wise = importer.record_full.apply(importer.taxon_concat, axis=1, result_type='expand')
+        row_wise.columns = DERIVED_COLUMNS
+        row_wise = row_wise.astype(str).replace(['', None, 'nan'], '')
+
+        pd.testing.assert_frame_equal(vectorized, row_wise, check_dtype=False)
+
+
+if __name__ == '__main__':
+    unittest.main()
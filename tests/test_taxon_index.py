@@ -0,0 +1,92 @@
+"""unit tests for the preloaded taxon tree in taxon_index.py"""
+import logging
+import unittest
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+from taxon_index import TaxonIndex
+from taxon_importer import TaxonomyImporter
+
+TAXA = [(1, 'Orobanchaceae', None, 140),
+        (2, 'Castilleja', 1, 180),
+        (3, 'Castilleja miniata', 2, 220),
+        (4, 'Castilleja miniata var. dixonii', 3, 240),
+        (5, 'Quercus', None, 180),
+        (6, 'Quercus alba x rubra', 5, 220)]
+
+
+class FakeCursor:
+    def __init__(self):
+        self.results = {'taxon': list(TAXA), 'vtaxon2': [(2, b"\x01"), (3, None), (4, 0)]}
+        self.pending = []
+
+    def execute(self, sql):
+        self.pending = list(self.results['vtaxon2' if 'vtaxon2' in sql else 'taxon'])
+
+    def fetchmany(self, size):
+        rows, self.pending = self.pending[:size], self.pending[size:]
+        return rows
+
+    def close(self):
+        pass
+
+
+class TestTaxonIndex(unittest.TestCase):
+    def setUp(self):
+        sql_tools = MagicMock()
+        sql_tools.get_cursor.return_value = FakeCursor()
+        self.index = TaxonIndex.from_database(sql_tools, fetch_size=4)
+
+    def test_lookups_match_taxon_get(self):
+        self.assertEqual(self.index.taxon_get('castilleja MINIATA'), 3)
+        # subsp./var. swap retry
+        self.assertEqual(self.index.taxon_get('Castilleja miniata subsp. dixonii'), 4)
+        self.assertIsNone(self.index.taxon_get('Castilleja linariifolia'))
+        self.assertEqual(self.index.parent_id(4), 3)
+        self.assertIsNone(self.index.parent_id(1))
+        self.assertEqual(self.index.rank_id(2), 180)
+
+    def test_hybrid_terms_match_in_any_order(self):
+        self.assertEqual(self.index.taxon_get('Quercus rubra x alba', hybrid=True, taxname='rubra x alba'), 6)
+        self.assertEqual(self.index.taxon_get('Quercus', hybrid=True, taxname='Quercus'), 5)
+
+    def test_redacted_flags(self):
+        self.assertTrue(self.index.is_redacted(2))
+        self.assertFalse(self.index.is_redacted(3))
+        self.assertFalse(self.index.is_redacted(99))
+
+    def test_create_taxon_adds_new_nodes(self):
+        importer = TaxonomyImporter.__new__(TaxonomyImporter)
+        importer.logger = logging.getLogger("TestTaxonIndex")
+        importer.config = SimpleNamespace(PRELOAD_TAXON_INDEX=True)
+        importer.taxon_index = self.index
+        importer.sql_csv_tools = MagicMock()
+        importer.sql_csv_tools.insert_table_record.side_effect = [10, 11]
+        importer.created_by_agent = 1
+        importer.full_name = 'Castilleja rubra var. alba'
+        importer.first_intra = 'Castilleja rubra var. alba'
+        importer.gen_spec = 'Castilleja rubra'
+        importer.genus = 'Castilleja'
+        importer.family_name = 'Orobanchaceae'
+        importer.tax_name = 'alba'
+        importer.author = 'Author'
+        importer.parent_author = 'Parent'
+        importer.overall_score = 1.0
+        importer.is_hybrid = False
+        importer.redacted = None
+        importer.taxon_list = ['Castilleja rubra var. alba', 'Castilleja rubra']
+
+        importer.create_taxon()
+
+        # higher taxa are created first
+        self.assertEqual(self.index.taxon_get('castilleja rubra'), 10)
+        self.assertEqual(self.index.parent_id(11), 10)
+        self.assertEqual(self.index.parent_id(10), 2)
+        # the new nodes sit under a redacted genus
+        self.assertTrue(importer.redacted)
+        self.assertTrue(self.index.is_redacted(11))
+        importer.sql_csv_tools.taxon_get.assert_not_called()
+        importer.sql_csv_tools.get_is_taxon_id_redacted.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+"""unit tests for the cached, chunked TNRS client in taxon_tools/tnrs_client.py"""
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch, MagicMock
+import pandas as pd
+import requests
+from taxon_tools.tnrs_client import TnrsClient
+from taxon_tools.BOT_TNRS import process_taxon_resolve
+
+
+def tnrs_response(request_data, normalise=lambda name: name):
+    """answers a TNRS post: every name matched with itself, echoed back through normalise"""
+    rows = json.loads(request_data)['data']
+    response = MagicMock()
+    response.json.return_value = [{'ID': row['CatalogNumber'], 'Name_submitted': normalise(row['fullname']),
+                                   'Overall_score': '1', 'Name_matched': row['fullname'],
+                                   'Taxonomic_status': 'Accepted', 'Accepted_name': row['fullname'],
+                                   'Unmatched_terms': '', 'Canonical_author': 'L.', 'Accepted_name_author': 'L.'}
+                                  for row in rows]
+    return response
+
+
+class TestTnrsClient(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        self.cache_path = os.path.join(self.tmp_dir, "tnrs.sqlite")
+
+    @patch('taxon_tools.tnrs_client.requests.post')
+    def test_chunks_and_reuses_cache_across_runs(self, post):
+        post.side_effect = lambda url, headers, data, timeout: tnrs_response(data)
+        names = [f"Quercus species{i}" for i in range(5)]
+
+        client = TnrsClient(cache_path=self.cache_path, chunk_size=2, workers=2)
+        self.assertEqual(set(client.resolve(names + names[:1])), set(names))
+        self.assertEqual(post.call_count, 3)
+        self.assertEqual(post.call_args.kwargs['timeout'], client.timeout)
+        client.close()
+
+        later_run = TnrsClient(cache_path=self.cache_path, chunk_size=2)
+        resolved = later_run.resolve(names[:3] + ["Quercus alba"])
+        self.assertEqual(len(resolved), 4)
+        # only the new name is posted
+        self.assertEqual(post.call_count, 4)
+        later_run.close()
+
+    @patch('taxon_tools.tnrs_client.requests.post')
+    def test_offline_answers_from_cache_only(self, post):
+        post.side_effect = lambda url, headers, data, timeout: tnrs_response(data)
+        TnrsClient(cache_path=self.cache_path).resolve(["Salix alba"])
+
+        offline = TnrsClient(cache_path=self.cache_path, offline=True)
+        self.assertEqual(list(offline.resolve(["Salix alba", "Salix nigra"])), ["Salix alba"])
+        self.assertEqual(post.call_count, 1)
+
+    @patch('taxon_tools.tnrs_client.requests.post')
+    def test_results_keyed_by_the_name_sent(self, post):
+        post.side_effect = lambda url, headers, data, timeout: tnrs_response(
+            data, normalise=lambda name: " ".join(name.split()).capitalize())
+        names = ["quercus  alba", " Salix nigra"]
+
+        client = TnrsClient(cache_path=self.cache_path)
+        self.assertEqual(set(client.resolve(names)), set(names))
+        self.assertEqual(set(client.resolve(names)), set(names))
+        client.close()
+        self.assertEqual(set(TnrsClient(cache_path=self.cache_path, offline=True).resolve(names)), set(names))
+        self.assertEqual(post.call_count, 1)
+
+    @patch('taxon_tools.tnrs_client.time.sleep')
+    @patch('taxon_tools.tnrs_client.requests.post')
+    def test_retries_timeouts(self, post, sleep):
+        post.side_effect = [requests.Timeout("slow"),
+                            tnrs_response(json.dumps({'data': [{'CatalogNumber': '0', 'fullname': 'Abies alba'}]}))]
+        client = TnrsClient(retries=2)
+        self.assertIn("Abies alba", client.resolve(["Abies alba"]))
+        self.assertEqual(post.call_count, 2)
+
+    @patch('taxon_tools.tnrs_client.requests.post')
+    def test_author_lookups_reuse_batch_results(self, post):
+        post.side_effect = lambda url, headers, data, timeout: tnrs_response(data)
+        client = TnrsClient()
+        batch = pd.DataFrame({'CatalogNumber': ['1', '2', '3'],
+                              'fullname': ['Salix alba', 'Salix alba', 'Salix nigra']})
+        results = process_taxon_resolve(batch, client=client)
+        self.assertEqual(list(results['CatalogNumber']), ['1', '2', '3'])
+        self.assertEqual(list(results['overall_score']), [1.0, 1.0, 1.0])
+
+        author = process_taxon_resolve(pd.DataFrame({'CatalogNumber': ['9'], 'fullname': ['Salix nigra']}),
+                                       client=client)
+        self.assertEqual(author['matched_name_author'][0], 'L.')
+        self.assertEqual(post.call_count, 1)
+
+    @patch('taxon_tools.tnrs_client.requests.post')
+    def test_batch_merge_survives_normalised_names(self, post):
+        post.side_effect = lambda url, headers, data, timeout: tnrs_response(
+            data, normalise=lambda name: " ".join(name.split()).capitalize())
+        batch = pd.DataFrame({'CatalogNumber': ['1', '2'], 'fullname': ['salix  alba', 'Salix nigra']})
+
+        results = process_taxon_resolve(batch, client=TnrsClient())
+        self.assertEqual(list(results['fullname']), ['salix  alba', 'Salix nigra'])
+        self.assertEqual(list(results['name_matched']), ['salix  alba', 'Salix nigra'])
+
+
+if __name__ == '__main__':
+    unittest.main()